@@ -9,28 +9,40 @@ from fastapi import Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPAuthorizationCredentials
 from pathlib import Path
-from joblib import logger
 import json
 
-from sqlalchemy import update
+from sqlalchemy import insert, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import joinedload
 from sqlalchemy.orm import Session
 import shutil
+import anyio
 import os
 import logging
 from pydantic import BaseModel
-import pandas as pd
-import joblib
 import ml_utils
-from db_setup import get_db, create_databases
+from db_setup import get_db, create_databases, SessionLocal
+from services.scoring_jobs import ScoringJob, scoring_jobs
+from services.rescoring import rescore_submissions
+from services.scoring_cache import scoring_cache
+from services.prediction_cache import prediction_cache
+from services.shadow import shadow_evaluator
+from services.scoring_pool import score_batch_pool, scoring_pool
+from services.feature_store import feature_row, save_features
+from services.feedback_segments import feedback_generation, record_feedback
+from services.model_registry import model_registry
+from services.model_versions import grade_models
+from services.warm_up import warm_up
+from routers.predict import router as predict_router
+from routers.score import router as score_router
 from models import AI_Feedback, Message, Scoring_Criteria, User, Token
 from auth import create_database_token, generate_token, get_current_user, get_password_hash, token_expiry
 from passlib.context import CryptContext
 import crud
 import uvicorn
 from models import Homework_Submission
-from ml_service import ScoringService, scoring_service
-from ml_service import ScoringService, scoring_service
+from ml_service import scoring_service
 from models import AI_Score, AI_Model_Metrics
 from ml_utils import (
     calculate_steps_count,
@@ -69,7 +81,8 @@ from schemas import FileAttachmentBase,FileAttachmentCreate,FileAttachmentUpdate
 from schemas import HomeworkSubmissionCreate, HomeworkSubmissionResponse, HomeworkSubmissionUpdate
 from schemas import RoleBase ,MessageBase,MessageCreate,MessageUpdate, SubjectClassLevelOut
 from schemas import UserBase, UserIn, UserOut,GetUser, UpdateUser,RoleBase, RoleOut,RoleCreate,RoleUpdate,SchoolBase
-from schemas import FeedbackRequest, FeedbackResponse, SaveFeedbackRequest, ScoreRequest, ScoreResponse, AIScoreCreate
+from schemas import FeedbackRequest, FeedbackResponse, SaveFeedbackRequest, AIScoreCreate
+from schemas import ModelLoadRequest, RescoreRequest
 from ml_service import inference_service, feedback_service 
 from ml_service import FeedbackService
 from ml_service import get_model, get_topic_encoder, get_feature_order
@@ -95,7 +108,68 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-create_databases()
+
+# Sync endpoints (blocking DB and file I/O) run in this many worker threads
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+# Set to 0 when the schema is managed outside the API process
+CREATE_SCHEMA_ON_STARTUP = os.getenv("CREATE_SCHEMA_ON_STARTUP", "1") == "1"
+
+
+def _load_grade_model():
+    from ml_utils import get_grade_predictor
+
+    get_grade_predictor()
+
+
+@app.on_event("startup")
+def configure_workers():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    if CREATE_SCHEMA_ON_STARTUP:
+        create_databases()
+    # Jobs left queued or running by a process that stopped would otherwise poll as in progress forever
+    stale = scoring_jobs.fail_stale()
+    if stale:
+        logger.warning(f"⚠️ Marked {stale} scoring jobs of stopped processes as failed")
+    # Models and scoring workers load in the background; see /health/ready.
+    # The feedback index is only loaded by the scoring workers that search it.
+    warm_up.start({
+        "grade_model": _load_grade_model,
+        "scoring_pool": scoring_pool.start,
+        "heuristic_scorer": scoring_service.warm_up,
+    })
+
+
+@app.on_event("shutdown")
+def stop_workers():
+    scoring_pool.shutdown()
+    score_batch_pool.shutdown()
+    shadow_evaluator.stop()
+
+
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def readiness(response: Response):
+    """Models and scoring workers are loaded and the database answers."""
+    checks = {"warm_up": warm_up.status()}
+    ready = warm_up.ok
+    try:
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+        ready = False
+
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "not_ready", "checks": checks}
+
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
@@ -105,27 +179,9 @@ def verify_password(plain_password, hashed_password):
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 # ==========================================================
-# 🧠 Load Machine Learning Model and Encoders
+# 🧠 ML models, encoders and the teacher feedback model are loaded
+# lazily, once per process, by services/model_registry.py
 # ==========================================================
-MODEL_DIR = os.path.join(os.path.dirname(__file__), "model")
-
-model = joblib.load(os.path.join(MODEL_DIR, "trained_model.pkl"))
-feature_order = joblib.load(os.path.join(MODEL_DIR, "feature_order.pkl"))
-grade_encoder = joblib.load(os.path.join(MODEL_DIR, "grade_encoder.pkl"))
-topic_encoder = joblib.load(os.path.join(MODEL_DIR, "topic_encoder.pkl"))
-
-print("✅ ML model and encoders loaded successfully!")
-# ==========================================================
-# 🤖 Load Teacher Feedback Model
-# ==========================================================
-try:
-    feedback_model = joblib.load(os.path.join(MODEL_DIR, "teacher_feedback_model.pkl"))
-    feedback_vectorizer = joblib.load(os.path.join(MODEL_DIR, "teacher_feedback_vectorizer.pkl"))
-    print("✅ Teacher feedback model loaded successfully!")
-except Exception as e:
-    feedback_model = None
-    feedback_vectorizer = None
-    print(f"⚠️ Could not load teacher feedback model: {e}")
 
 @app.post("/login")
 def login(email: str, password: str, db: Session = Depends(get_db)):
@@ -422,7 +478,7 @@ def update_user_view(
 
     return user 
 @user_router.post("/users/{user_id}/image", response_model=UserBase)
-async def upload_user_image(
+def upload_user_image(
     user_id: int,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
@@ -1472,15 +1528,241 @@ def add_subject_class_level(
 
 
 
-from ml_utils import predict_grade
+from ml_utils import TEACHER_FEEDBACK_MODEL_VERSION, get_grade_predictor
+
+def _score_submission(
+    db: Session,
+    submission_id: int,
+    set_stage=lambda stage: None,
+    submission_text: Optional[str] = None,
+    student_homework: Optional[Student_Homework] = None,
+) -> dict:
+    """
+    Extract features, predict the grade, pick teacher feedback and add
+    AI_Feedback + AI_Score for a saved submission. Does not commit; the
+    caller owns the transaction. Used inline by create_homework_submission
+    (which passes the text and Student_Homework it already has) and by
+    background scoring jobs.
+    """
+    if student_homework is None or submission_text is None:
+        submission = db.query(Homework_Submission).filter(Homework_Submission.id == submission_id).first()
+        if not submission:
+            raise HTTPException(status_code=404, detail="Homework submission not found")
+        student_homework = submission.student_homework
+        submission_text = submission.submission_text
+
+    # --- Retrieve scoring criteria ---
+    scoring = (
+        db.query(Scoring_Criteria)
+        .filter(Scoring_Criteria.homework_id == student_homework.homework_id)
+        .first()
+    )
+    if not scoring:
+        raise HTTPException(status_code=404, detail="Scoring criteria not found for this homework")
+
+    # --- The model version taken here serves (and is recorded for) the whole request ---
+    served = grade_models.current()
+
+    # --- Cached result for identical text + criteria + model? ---
+    description = student_homework.homework.description
+    cache_key = scoring_cache.submission_key(
+        submission_text,
+        description,
+        scoring.topic,
+        scoring.difficulty_1to5,
+        served.version,
+        TEACHER_FEEDBACK_MODEL_VERSION,
+    )
+    cached = scoring_cache.get(cache_key) or {}
+    features = cached.get("features")
+    predicted_grade = cached.get("predicted_grade")
+    # A comment picked before the feedback corpus or index last changed is looked up again
+    generation = feedback_generation()
+    teacher_comment = cached.get("teacher_comment") if cached.get("feedback_generation") == generation else None
+
+    # --- Features and feedback run in the scoring process pool, the grade here ---
+    if features is None:
+        set_stage("extracting_features")
+        result = scoring_pool.score(
+            submission_text,
+            description,
+            scoring.topic,
+            scoring.difficulty_1to5,
+            with_feedback=teacher_comment is None,
+        )
+        features = result["features"]
+        set_stage("predicting")
+        predict_started = time.perf_counter()
+        predicted_grade = served.predictor.predict(features)
+        predict_ms = (time.perf_counter() - predict_started) * 1000
+        # Candidate model (if configured) runs on its own thread; never waited for
+        shadow_evaluator.observe(served, features, predicted_grade, predict_ms)
+    elif teacher_comment is None:
+        # Entries written by batch re-scoring carry no feedback comment yet; stale ones are redone
+        set_stage("generating_feedback")
+        result = scoring_pool.feedback(submission_text)
+    else:
+        result = None
+
+    if result is not None:
+        teacher_comment = result["teacher_comment"]
+        # Failed predictions/feedback are not cached so they get retried
+        if predicted_grade != "N/A" and result["feedback_ok"]:
+            scoring_cache.put(cache_key, {
+                "features": features,
+                "predicted_grade": predicted_grade,
+                "teacher_comment": teacher_comment,
+                "feedback_generation": generation,
+            })
+
+    reasoning_quality = features["reasoning_quality"]
+    method_appropriateness = features["method_appropriateness"]
+    explanation_clarity = features["explanation_clarity"]
+    computational_errors = features["computational_errors"]
+    conceptual_errors = features["conceptual_errors"]
+    rubric_points = features["rubric_points"]
+    criteria_met, criteria_missed, improvement_suggestions = [], [], []
+
+    # --- Simple AI rules for criteria met/missed ---
+    if reasoning_quality > 0.7:
+        criteria_met.append("God resonemangsförmåga")
+    else:
+        criteria_missed.append("Bristande resonemang")
+
+    if explanation_clarity > 0.7:
+        criteria_met.append("Tydlig förklaring")
+    else:
+        criteria_missed.append("Förklaring behöver utvecklas")
+
+    if method_appropriateness > 0.7:
+        criteria_met.append("Korrekt metodval")
+    else:
+        criteria_missed.append("Metodval behöver förbättras")
+
+    if computational_errors > 0:
+        improvement_suggestions.append("Kontrollera beräkningarna – ett eller flera räknefel upptäcktes.")
+
+    if conceptual_errors > 0:
+        improvement_suggestions.append("Gå igenom de matematiska begreppen för att undvika missförstånd.")
+
+    if not improvement_suggestions:
+        improvement_suggestions.append("Fortsätt på samma sätt! Du visar tydligt förståelse.")
+
+    # --- Save AI_Feedback + AI_Score + feature row (caller commits) ---
+    set_stage("saving")
+    ai_feedback_id = db.execute(
+        insert(AI_Feedback)
+        .values(
+            homework_submission_id=submission_id,
+            feedback_text=teacher_comment,
+            feedback_type="teacher_comment_sv",
+            criteria_met=", ".join(criteria_met),
+            criteria_missed=", ".join(criteria_missed),
+            improvement_suggestions=" ".join(improvement_suggestions),
+            model_used=TEACHER_FEEDBACK_MODEL_VERSION,
+        )
+        .returning(AI_Feedback.id)
+    ).scalar_one()
+
+    ai_score_id = db.execute(
+        insert(AI_Score)
+        .values(
+            homework_submission_id=submission_id,
+            predicted_score=int(rubric_points),
+            predicted_band=predicted_grade,
+            prediction_model_version=served.version,
+            predicted_at=datetime.now(timezone.utc),
+            confidence_level=Decimal("0.95"),
+            analysis_data=json.dumps(features, ensure_ascii=False),
+        )
+        .returning(AI_Score.id)
+    ).scalar_one()
+
+    save_features(db, [feature_row(submission_id, served.version, features)])
+
+    logger.info(f"✅ Submission {submission_id} processed — Grade: {predicted_grade}")
+
+    return {
+        "predicted_grade": predicted_grade,
+        "rubric_points": rubric_points,
+        "ai_teacher_feedback": teacher_comment,
+        "criteria_met": criteria_met,
+        "criteria_missed": criteria_missed,
+        "improvement_suggestions": improvement_suggestions,
+        "confidence": 0.95,
+        "ai_feedback_id": ai_feedback_id,
+        "ai_score_id": ai_score_id,
+    }
+
+
+def _submission_datetime(value):
+    """submission_date arrives as a string; SQLite needs a datetime (PostgreSQL parses either)."""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _upsert_submission(db: Session, submission: HomeworkSubmissionCreate):
+    """
+    INSERT ... ON CONFLICT (student_homework_id) DO UPDATE for a submission.
+    Atomic, so two concurrent submits cannot create duplicate rows.
+    Returns the stored row's id and response fields.
+    """
+    values = {
+        "student_homework_id": submission.student_homework_id,
+        "submission_text": submission.submission_text,
+        "submission_file_id": submission.submission_file_id,
+        "submission_date": _submission_datetime(submission.submission_date),
+        "status": submission.status,
+        "is_late": submission.is_late,
+    }
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(Homework_Submission).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Homework_Submission.student_homework_id],
+        set_={
+            **{key: stmt.excluded[key] for key in values if key != "student_homework_id"},
+            "updated_at": datetime.now(timezone.utc),
+        },
+    ).returning(
+        Homework_Submission.id,
+        Homework_Submission.student_homework_id,
+        Homework_Submission.submission_date,
+        Homework_Submission.status,
+        Homework_Submission.is_late,
+    )
+    return db.execute(stmt).one()
+
+
+def _run_scoring_job(job: ScoringJob) -> dict:
+    """Background entry point: score with a session of its own."""
+    db = SessionLocal()
+    try:
+        result = _score_submission(db, job.submission_id, job.set_stage)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 
 @app.post("/homework_submissions/", response_model=HomeworkSubmissionResponse)
-async def create_homework_submission(
+def create_homework_submission(
     submission: HomeworkSubmissionCreate,
+    async_scoring: bool = Query(False, description="Acknowledge right away and score in the background"),
     current_user: Student = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Create or update a student's homework submission, predict grade, and store AI feedback."""
+    """
+    Create or update a student's homework submission, predict grade, and store AI feedback.
+    With async_scoring=true the submission is saved and returned with a
+    scoring_job_id; poll GET /scoring_jobs/{id} for the result.
+    """
     try:
         logger.info(f"📥 Received submission data: {submission.dict()}")
 
@@ -1500,185 +1782,62 @@ async def create_homework_submission(
         if student.user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized to submit for this homework")
 
-        # --- Create or update submission ---
-        existing_submission = (
-            db.query(Homework_Submission)
-            .filter(Homework_Submission.student_homework_id == submission.student_homework_id)
-            .first()
-        )
+        # --- Create or update submission (one transaction with the AI rows) ---
+        new_submission = _upsert_submission(db, submission)
+        logger.info(f"💾 Upserted submission ID {new_submission.id}")
 
-        if existing_submission:
-            logger.info(f"🔁 Updating existing submission ID {existing_submission.id}")
-            existing_submission.submission_text = submission.submission_text
-            existing_submission.submission_file_id = submission.submission_file_id
-            existing_submission.submission_date = submission.submission_date
-            existing_submission.status = submission.status
-            existing_submission.is_late = submission.is_late
-            db.commit()
-            db.refresh(existing_submission)
-            new_submission = existing_submission
-        else:
-            logger.info("🆕 Creating new submission...")
-            new_submission = Homework_Submission(
-                student_homework_id=submission.student_homework_id,
-                submission_text=submission.submission_text,
-                submission_file_id=submission.submission_file_id,
-                submission_date=submission.submission_date,
-                status=submission.status,
-                is_late=submission.is_late,
-            )
-            db.add(new_submission)
-            db.commit()
-            db.refresh(new_submission)
-
-        # --- Retrieve scoring criteria ---
-        scoring = (
-            db.query(Scoring_Criteria)
-            .filter(Scoring_Criteria.homework_id == student_homework.homework_id)
-            .first()
-        )
-        if not scoring:
-            raise HTTPException(status_code=404, detail="Scoring criteria not found for this homework")
-
-        # --- Calculate scoring metrics ---
-        steps_count = calculate_steps_count(submission.submission_text)
-        expected_steps = estimate_expected_steps(scoring.topic, scoring.difficulty_1to5)
-        steps_completeness = round(min(steps_count / expected_steps, 1.0), 2)
-        reasoning_quality = calculate_reasoning_quality(submission.submission_text)
-        method_appropriateness = calculate_method_appropriateness(
-            submission.submission_text, student_homework.homework.description
-        )
-        representation_use = calculate_representation_use(submission.submission_text)
-        explanation_clarity = calculate_explanation_clarity(submission.submission_text)
-        units_handling = calculate_units_handling(submission.submission_text)
-        language_quality = calculate_language_quality(submission.submission_text)
-        computational_errors = calculate_computational_errors(submission.submission_text)
-        conceptual_errors = calculate_conceptual_errors(submission.submission_text)
-        correctness_pct = calculate_correctness_pct(submission.submission_text, expected_answer="")
-        time_minutes = calculate_time_minutes(datetime.now(), datetime.now())
-        external_aid_suspected_score = calculate_external_aid_suspected(submission.submission_text)
-        external_aid_suspected = external_aid_suspected_score > 0.5
-        originality_score = round(1.0 - external_aid_suspected_score, 2)
-        rubric_points = calculate_rubric_points_v2(
-            method_appropriateness, computational_errors, explanation_clarity, units_handling
-        )
-
-        # --- Prepare feature dict ---
-        features = {
-            "topic": scoring.topic,
-            "difficulty_1to5": scoring.difficulty_1to5,
-            "steps_count": steps_count,
-            "steps_completeness": steps_completeness,
-            "reasoning_quality": reasoning_quality,
-            "method_appropriateness": method_appropriateness,
-            "representation_use": representation_use,
-            "explanation_clarity": explanation_clarity,
-            "units_handling": units_handling,
-            "language_quality": language_quality,
-            "computational_errors": computational_errors,
-            "conceptual_errors": conceptual_errors,
-            "correctness_pct": correctness_pct,
-            "originality_score": originality_score,
-            "rubric_points": rubric_points,
-        }
-
-        # --- Predict grade ---
-        predicted_grade = predict_grade(model, feature_order, grade_encoder, topic_encoder, features)
-
-        # --- Generate AI Teacher Feedback ---
-        teacher_comment = "Bra försök! Fortsätt öva på att motivera varje steg tydligare."
-        criteria_met, criteria_missed, improvement_suggestions = [], [], []
-
-        try:
-            if feedback_model and feedback_vectorizer:
-                teacher_data = pd.read_csv("klass9_matte_inlamningar_dataset.csv")
-                teacher_comment = ml_utils.generate_teacher_feedback(
-                    feedback_model,
-                    feedback_vectorizer,
-                    teacher_data["teacher_comment_sv"],
-                    submission.submission_text,
-                )
-        except Exception as e:
-            logger.warning(f"⚠️ Feedback generation failed: {e}")
-
-        # --- Simple AI rules for criteria met/missed ---
-        if reasoning_quality > 0.7:
-            criteria_met.append("God resonemangsförmåga")
-        else:
-            criteria_missed.append("Bristande resonemang")
-
-        if explanation_clarity > 0.7:
-            criteria_met.append("Tydlig förklaring")
-        else:
-            criteria_missed.append("Förklaring behöver utvecklas")
-
-        if method_appropriateness > 0.7:
-            criteria_met.append("Korrekt metodval")
-        else:
-            criteria_missed.append("Metodval behöver förbättras")
-
-        if computational_errors > 0:
-            improvement_suggestions.append("Kontrollera beräkningarna – ett eller flera räknefel upptäcktes.")
-
-        if conceptual_errors > 0:
-            improvement_suggestions.append("Gå igenom de matematiska begreppen för att undvika missförstånd.")
-
-        if not improvement_suggestions:
-            improvement_suggestions.append("Fortsätt på samma sätt! Du visar tydligt förståelse.")
-
-        # --- Save AI_Feedback ---
-        ai_feedback = AI_Feedback(
-            homework_submission_id=new_submission.id,
-            feedback_text=teacher_comment,
-            feedback_type="teacher_comment_sv",
-            criteria_met=", ".join(criteria_met),
-            criteria_missed=", ".join(criteria_missed),
-            improvement_suggestions=" ".join(improvement_suggestions),
-            model_used="EduMate_TeacherFeedback_v2",
-        )
-        db.add(ai_feedback)
-        db.commit()
-        db.refresh(ai_feedback)
-
-        # --- Save AI Score ---
-        ai_score = AI_Score(
-            homework_submission_id=new_submission.id,
-            predicted_score=int(rubric_points),
-            predicted_band=predicted_grade,
-            prediction_model_version="EduMate_RF_v1",
-            predicted_at=datetime.now(timezone.utc),
-            confidence_level=Decimal("0.95"),
-            analysis_data=json.dumps(features, ensure_ascii=False),
-        )
-        db.add(ai_score)
-        db.commit()
-        db.refresh(ai_score)
-
-        logger.info(f"✅ Submission {new_submission.id} processed — Grade: {predicted_grade}")
-
-        # --- Return API Response ---
-        return {
+        response = {
             "id": new_submission.id,
             "student_homework_id": new_submission.student_homework_id,
             "submission_date": new_submission.submission_date.isoformat() if new_submission.submission_date else None,
 
             "status": new_submission.status,
             "is_late": new_submission.is_late,
-            "predicted_grade": predicted_grade,
-            "rubric_points": rubric_points,
-            "ai_teacher_feedback": teacher_comment,
-            "criteria_met": criteria_met,
-            "criteria_missed": criteria_missed,
-            "improvement_suggestions": improvement_suggestions,
-            "confidence": 0.95
         }
 
+        # --- Score in the background (falls back to inline when the queue is full) ---
+        if async_scoring:
+            db.commit()
+            job = scoring_jobs.submit(new_submission.id, _run_scoring_job, user_id=current_user.id)
+            if job:
+                logger.info(f"⏳ Submission {new_submission.id} queued for scoring as job {job.id}")
+                response["scoring_job_id"] = job.id
+                return response
+            logger.warning("⚠️ Scoring queue full, scoring inline")
+
+        response.update(_score_submission(
+            db,
+            new_submission.id,
+            submission_text=submission.submission_text,
+            student_homework=student_homework,
+        ))
+        db.commit()
+
+        # --- Return API Response ---
+        return response
+
     except Exception as e:
         db.rollback()
         logger.error(f"❌ Error creating submission: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create submission: {str(e)}")
 
 
+@app.get("/scoring_jobs/{job_id}")
+def get_scoring_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Progress and result of a background scoring job.
+    """
+    job = scoring_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scoring job not found")
+    if job.user_id != current_user.id and current_user.role.name not in ["Teacher", "Admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view this scoring job")
+    return job.to_dict()
+
+
 
 @app.get("/homework_submissions/all", response_model=List[dict])
 def get_all_homework_submissions(
@@ -1748,7 +1907,7 @@ def get_homework_submissions(
     return result
 
 @app.get("/files/{file_id}/download")
-async def download_file(
+def download_file(
     file_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -1778,7 +1937,7 @@ async def download_file(
 # Update your file upload endpoint:
 
 @app.post("/file_attachments")
-async def upload_file_attachment(
+def upload_file_attachment(
     file: UploadFile = File(...),
     description: str = Form(""),
     current_user: User = Depends(get_current_user),
@@ -1952,6 +2111,8 @@ def add_grade(
         homework_submission.grade_value = grade_data.grade  # Update the grade value
         db.commit()
         db.refresh(homework_submission)
+        # The comment becomes teacher feedback the kNN step can match from now on
+        record_feedback(homework_submission.submission_text, grade_data.feedback)
 
     return new_grade
 # --- Student Endpoints ---
@@ -2405,7 +2566,7 @@ def get_file_attachment(
 
 # Add the file upload endpoint
 @app.post("/file_attachments")
-async def add_file_attachment(
+def add_file_attachment(
     file: UploadFile = File(...),
     description: str = Form(""),
     current_user: User = Depends(get_current_user),
@@ -2638,32 +2799,86 @@ def get_ai_score_by_submission(
         raise HTTPException(status_code=404, detail="AI score not found for this submission")
 
     return ai_score
-# Keep your existing endpoints but update them to work with the new system
-@app.post("/ml/score", response_model=ScoreResponse)
-def score_endpoint(request: ScoreRequest, db: Session = Depends(get_db)):
-    scoring_service = ScoringService()
-
-    # Perform scoring
-    result = scoring_service.score_submission(request.text, request.subject)
-
-    # Save the AI score record
-    ai_score_record = scoring_service.create_ai_score_record(
-        db=db,
-        submission_id=request.submission_id,
-        result=result
-    )
+def _rescore_job(request: RescoreRequest):
+    """Background entry point for /admin/rescore: re-score with a session of its own."""
+    def run(job: ScoringJob) -> dict:
+        job.set_stage("rescoring")
+        db = SessionLocal()
+        try:
+            report = rescore_submissions(
+                db,
+                homework_id=request.homework_id,
+                class_level_id=request.class_level_id,
+                date_from=request.date_from,
+                date_to=request.date_to,
+                chunk_size=request.chunk_size,
+            )
+        finally:
+            db.close()
+        logger.info(f"✅ Re-scored {report['rows']} submissions ({report['rows_per_second']} rows/s)")
+        return report
 
-    return ScoreResponse(
-        submission_id=request.submission_id,
-        predicted_score=ai_score_record.predicted_score,
-        predicted_band=ai_score_record.predicted_band,
-        confidence=ai_score_record.confidence_level,
-        reason=ai_score_record.prediction_explainer,
-        processing_time_ms=123,  # Example placeholder
-        timestamp=ai_score_record.predicted_at,
-        model_used=ai_score_record.model_used
-    )
+    return run
+
+
+@app.post("/admin/rescore", status_code=status.HTTP_202_ACCEPTED)
+def rescore_homework_submissions(
+    request: RescoreRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Re-score existing submissions (by homework, class level and/or date range)
+    with the active grade model version, in chunks with one model call per chunk.
+    Runs as a background scoring job; poll GET /scoring_jobs/{id} for the
+    report (rows, chunks, seconds, rows_per_second, model_version).
+    """
+    if current_user.role.name != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized to re-score submissions")
+
+    job = scoring_jobs.submit(None, _rescore_job(request), user_id=current_user.id, kind="rescore")
+    if job is None:
+        raise HTTPException(status_code=503, detail="Scoring queue is full, try again later")
+    logger.info(f"⏳ Re-score queued as job {job.id}")
+    return job.to_dict()
+
+
+@app.get("/admin/models")
+def get_grade_model_versions(current_user: User = Depends(get_current_user)):
+    """Active and previous grade model version, plus versions still loading or failed."""
+    if current_user.role.name != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized to manage models")
+    grade_models.current()
+    return grade_models.status()
 
+
+@app.post("/admin/models/load", status_code=status.HTTP_202_ACCEPTED)
+def load_grade_model_version(request: ModelLoadRequest, current_user: User = Depends(get_current_user)):
+    """
+    Load a grade model file from model/ in the background, warm it up and
+    swap it in. Requests already running finish on the old version, which
+    stays loaded for /admin/models/rollback.
+    """
+    if current_user.role.name != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized to manage models")
+    try:
+        grade_models.load_in_background(request.version, request.model_file)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return grade_models.status()
+
+
+@app.post("/admin/models/rollback")
+def rollback_grade_model_version(current_user: User = Depends(get_current_user)):
+    """Make the previous grade model version active again."""
+    if current_user.role.name != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized to manage models")
+    try:
+        grade_models.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return grade_models.status()
 # Health check endpoint
 @app.get("/api/ml/health")
 async def ml_health_check():
@@ -2686,6 +2901,18 @@ async def ml_health_check():
             "health": "/api/ml/health"
         }
     }
+@app.get("/api/ml/metrics")
+def ml_metrics():
+    """Counters for the scoring and prediction caches, background scoring jobs, inference batching and shadow evaluation, /ml/score stage latencies, plus model memory."""
+    return {
+        "scoring_cache": scoring_cache.stats(),
+        "scoring_stages": scoring_service.stage_latency.snapshot(),
+        "prediction_cache": prediction_cache.stats(),
+        "shadow": shadow_evaluator.stats(),
+        "scoring_jobs": scoring_jobs.stats(),
+        "inference": get_grade_predictor().dispatcher.stats(),
+        "models": model_registry.memory_report(),
+    }
 @app.post("/homework_submissions/{submission_id}/generate-feedback")
 def generate_feedback_for_submission(
     submission_id: int,
@@ -2855,6 +3082,8 @@ def save_feedback(request: SaveFeedbackRequest, db: Session = Depends(get_db)):
     return {"message": "Feedback saved successfully"}
 app.include_router(user_router) 
 app.include_router(student_hw_router)       
+app.include_router(predict_router)
+app.include_router(score_router)
                                                        
 if __name__ == '__main__':
     uvicorn.run(app)
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Per-submission feature extraction latency: individual ml_utils.calculate_*
+functions vs the single-pass FeatureExtractor.
+
+Run from backend/:  python -m benchmarks.bench_feature_extractor
+"""
+import random
+import time
+
+from ml_utils import calculate_submission_features
+from feature_extractor import FeatureExtractor
+
+DESCRIPTION = "Lös ekvationen och förklara varje steg"
+SENTENCES = [
+    "Först flyttar jag över 5 till högerledet, sedan dividerar jag med 2.",
+    "2x + 5 = 11",
+    "2x = 6",
+    "x = 3",
+    "Därför blir svaret x = 3 eftersom 2 * 3 = 6.",
+    "Kontroll: 2 * 3 + 5 = 11 stämmer.",
+    "We solve the equation step by step and simplify each expression.",
+    "The area of the triangle is 12 cm and the table shows the values.",
+]
+
+
+def make_text(n_chars: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    while size < n_chars:
+        line = rng.choice(SENTENCES)
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def bench(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text, DESCRIPTION, "Ekvationer", 3)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    extractor = FeatureExtractor()
+    print(f"{'chars':>8} {'ml_utils ms':>12} {'extractor ms':>13} {'speedup':>8}")
+    for n_chars in (1_000, 10_000, 50_000, 200_000):
+        text = make_text(n_chars)
+        repeat = max(5, 2_000_000 // n_chars)
+        old = bench(calculate_submission_features, text, repeat)
+        new = bench(extractor.extract, text, repeat)
+        print(f"{n_chars:>8} {old:>12.3f} {new:>13.3f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
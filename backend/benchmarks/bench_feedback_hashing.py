@@ -0,0 +1,140 @@
+"""
+Feedback vectorizer report: the fitted TF-IDF vectorizer (today's
+teacher_feedback_vectorizer.pkl, max_features=3000, + float64 index) vs
+HashingFeedbackVectorizer with float32 and int8 indexes, on synthetic
+comment corpora of 1,186 (the real corpus size) and 100k comments.
+
+For each setup, a fresh process loads the saved files as a worker does and
+reports load time, resident memory added (RSS) and the bytes held by the
+vectorizer and the index. Agreement is the share of queries whose nearest
+comment under that setup is (or ties with) the TF-IDF one, and the share
+getting the same fallback decision (distance <= FEEDBACK_MAX_DISTANCE).
+Once the corpus has more than 3000 distinct words the current vectorizer
+drops the rest, so agreement is also given against TF-IDF over all words,
+which isolates what hashing (collisions) and quantization change.
+
+Run from backend/:  python -m benchmarks.bench_feedback_hashing [sizes...]
+"""
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+SIZES = (1186, 100_000)
+QUERIES = 1000
+# (label, vectorizer, hash bits / max_features, index dtype); the first two are the references
+SETUPS = (
+    ("tfidf 3000, float64 (current)", "tfidf", 3000, "float64"),
+    ("tfidf all words, float64", "tfidf", 0, "float64"),
+    ("hashing 20 bits, float64", "hashing", 20, "float64"),
+    ("hashing 20 bits, float32", "hashing", 20, "float32"),
+    ("hashing 20 bits, int8", "hashing", 20, "int8"),
+    ("hashing 16 bits, int8", "hashing", 16, "int8"),
+    ("hashing 12 bits, int8", "hashing", 12, "int8"),
+)
+
+
+def load(directory: Path, vectorizer: str, dtype: str):
+    """What a worker does: the vectorizer and the index from the saved files."""
+    from services.feedback_hashing import HashingFeedbackVectorizer, hashing_path, load_hashed_corpus
+    from services.feedback_index import FeedbackIndex
+
+    model_path = directory / "teacher_feedback_model.pkl"
+    if vectorizer == "hashing":
+        return HashingFeedbackVectorizer.load(hashing_path(model_path)), \
+            FeedbackIndex(load_hashed_corpus(hashing_path(model_path)), dtype)
+    return joblib.load(directory / "teacher_feedback_vectorizer.pkl"), \
+        FeedbackIndex.from_model(joblib.load(model_path))
+
+
+def measure(directory: str, vectorizer: str, dtype: str):
+    """Run in a fresh process: prints load time and memory as JSON."""
+    import sklearn.feature_extraction.text  # noqa: F401 - imports are not part of the artefact cost
+    import sklearn.neighbors  # noqa: F401
+
+    from services.model_registry import _rss_bytes, deep_size
+
+    rss_before = _rss_bytes()
+    started = time.perf_counter()
+    vectorizer_obj, index = load(Path(directory), vectorizer, dtype)
+    load_s = time.perf_counter() - started
+    print(json.dumps({
+        "load_ms": load_s * 1000,
+        "rss_mb": (_rss_bytes() - rss_before) / 1e6,
+        "vectorizer_kb": deep_size(vectorizer_obj) / 1e3,
+        "index_mb": deep_size(index) / 1e6,
+    }))
+
+
+def build(directory: Path, comments, vectorizer: str, bits: int):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.neighbors import NearestNeighbors
+
+    from services.feedback_hashing import HashingFeedbackVectorizer, hashing_path, save_hashed_feedback
+    from test_feedback_hashing import STOP_WORDS
+
+    directory.mkdir(parents=True, exist_ok=True)
+    model_path = directory / "teacher_feedback_model.pkl"
+    if vectorizer == "hashing":
+        hashing = HashingFeedbackVectorizer(bits, STOP_WORDS)
+        save_hashed_feedback(hashing_path(model_path), hashing, hashing.fit_transform(comments))
+        return
+    # As in ml/ml/notebooks/data_analysis_teacher_comment.ipynb (max_features=3000)
+    tfidf = TfidfVectorizer(max_features=bits or None, stop_words=STOP_WORDS)
+    model = NearestNeighbors(n_neighbors=1, metric="cosine").fit(tfidf.fit_transform(comments))
+    joblib.dump(tfidf, directory / "teacher_feedback_vectorizer.pkl")
+    joblib.dump(model, model_path)
+
+
+def main():
+    from ml_utils import FEEDBACK_MAX_DISTANCE
+    from test_feedback_hashing import synthetic_comments
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for n in sizes:
+        n_words = max(2000, n // 2)
+        comments = synthetic_comments(n, n_words=n_words)
+        queries = synthetic_comments(QUERIES, n_words=n_words, seed=1)
+        root = Path(tempfile.mkdtemp())
+        print(f"\n{n:,} comments ({n_words:,} distinct words in the generator), {QUERIES} queries")
+        print(f"{'':31}{'load':>7}{'RSS':>10}{'vectorizer':>12}{'index':>10}"
+              f"{'nearest / fallback agreement with':>38}")
+        print(f"{'':70}{'current':>16}{'all words':>18}")
+
+        references = []
+        for label, vectorizer, bits, dtype in SETUPS:
+            directory = root / f"{vectorizer}{bits}"
+            if not directory.exists():
+                build(directory, comments, vectorizer, bits)
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_feedback_hashing", "--measure", str(directory), vectorizer, dtype],
+                capture_output=True, text=True, check=True,
+            )
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+
+            vectorizer_obj, index = load(directory, vectorizer, dtype)
+            Q = vectorizer_obj.transform(queries)
+            distances, nearest = index.search(Q, k=1)
+            if len(references) < 2:
+                references.append((1.0 - index.similarities(Q), distances[:, 0]))
+            cells = []
+            for reference_distances, best in references:
+                # Same row, or a row just as close under the reference
+                picked = np.take_along_axis(reference_distances, nearest, axis=1)[:, 0]
+                nearest_agreement = np.mean(np.isclose(picked, best, atol=1e-9))
+                fallback_agreement = np.mean((distances[:, 0] > FEEDBACK_MAX_DISTANCE) == (best > FEEDBACK_MAX_DISTANCE))
+                cells.append(f"{nearest_agreement:9.3f} / {fallback_agreement:.3f}")
+            print(f"{label:31}{stats['load_ms']:4.0f} ms{stats['rss_mb']:7.1f} MB{stats['vectorizer_kb']:9.0f} kB"
+                  f"{stats['index_mb']:7.1f} MB" + "".join(f"{cell:>17}" for cell in cells))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--measure"]:
+        measure(*sys.argv[2:5])
+    else:
+        main()
@@ -0,0 +1,47 @@
+"""
+Teacher-feedback nearest-neighbour lookup: the sklearn NearestNeighbors
+model vs FeedbackIndex (one sparse product + argpartition), per call for
+batches of 1, 32 and 1024 TF-IDF queries, plus the end-to-end feedback
+for one text (vectorizer included).
+
+Run from backend/:  python -m benchmarks.bench_feedback_index
+"""
+import time
+
+import ml_utils
+from benchmarks.bench_tree_ensemble import BATCH_SIZES, bench
+from services.feedback_index import FeedbackIndex
+from services.model_registry import model_registry
+from test_feedback_index import make_texts
+
+
+def main():
+    model = model_registry.get("feedback_model")
+    vectorizer = model_registry.get("feedback_vectorizer")
+    started = time.perf_counter()
+    index = FeedbackIndex.from_model(model)
+    print(f"index: {len(index)} comments x {index.matrix.shape[1]} terms, {index.matrix.nnz} non-zeros, "
+          f"built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    texts = make_texts(max(BATCH_SIZES))
+    Q_all = vectorizer.transform(texts)
+    candidates = {
+        "NearestNeighbors.kneighbors": model.kneighbors,
+        "FeedbackIndex.kneighbors": index.kneighbors,
+    }
+    print(f"{'':30}" + "".join(f"{f'batch {n}':>16}" for n in BATCH_SIZES))
+    for name, fn in candidates.items():
+        cells = [f"{bench(fn, Q_all[:n]):12.1f} µs" for n in BATCH_SIZES]
+        print(f"{name:30}" + "".join(f"{cell:>16}" for cell in cells))
+
+    comments = [f"kommentar {i}" for i in range(len(index))]
+    print("\nOne text, vectorizer included:")
+    for name, searcher in (("sklearn", model), ("FeedbackIndex", index)):
+        us = bench(lambda text: ml_utils.generate_teacher_feedback(searcher, vectorizer, comments, text), texts[0])
+        print(f"  {name:28}{us:12.1f} µs")
+    us = bench(lambda batch: ml_utils.generate_teacher_feedback_batch(index, vectorizer, comments, batch), texts)
+    print(f"  {'batch of 1024 (per text)':28}{us / len(texts):12.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Approximate (LSH) vs exact teacher-feedback search on synthetic TF-IDF
+corpora of 10k, 100k and 1M comments: build/save/load time, recall@1
+(for near-duplicate and for noisier queries) and latency per query, one
+at a time and in batches of 256, for several probe counts.
+
+Run from backend/:  python -m benchmarks.bench_feedback_lsh [sizes...]
+e.g.                python -m benchmarks.bench_feedback_lsh 10000 100000
+"""
+import os
+import sys
+import tempfile
+import time
+
+from services.feedback_index import FeedbackIndex
+from services.feedback_lsh import LSHFeedbackIndex
+from test_feedback_lsh import near_queries, recall_at_1, synthetic_corpus
+
+SIZES = (10_000, 100_000, 1_000_000)
+QUERIES = 500
+PROBES = (0, 2, 4, 8)
+
+
+def per_query_us(search, Q, one_at_a_time: bool) -> float:
+    started = time.perf_counter()
+    if one_at_a_time:
+        for i in range(Q.shape[0]):
+            search(Q[i])
+    else:
+        for first in range(0, Q.shape[0], 256):
+            search(Q[first:first + 256])
+    return (time.perf_counter() - started) / Q.shape[0] * 1_000_000
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for n in sizes:
+        corpus = synthetic_corpus(n)
+        Q = near_queries(corpus, QUERIES)
+        Q_noisy = near_queries(corpus, QUERIES, seed=2, noise=0.8)
+        exact = FeedbackIndex(corpus)
+        index, build_s = timed(lambda: LSHFeedbackIndex.build(corpus))
+        path = os.path.join(tempfile.mkdtemp(), "feedback_lsh.npz")
+        _, save_s = timed(lambda: index.save(path))
+        _, load_s = timed(lambda: LSHFeedbackIndex.load(path))
+
+        print(f"\n{n:,} comments ({corpus.nnz:,} non-zeros): LSH {index.n_tables} tables x {index.n_bits} bits, "
+              f"build {build_s:.2f} s, save {save_s:.2f} s, load {load_s:.2f} s, "
+              f"{os.path.getsize(path) / 1e6:.0f} MB on disk")
+        print(f"{'':14}{'recall@1':>10}{'(noisy)':>9}{'candidates':>12}{'single':>14}{'batch 256':>14}")
+        single = per_query_us(exact.search, Q[:100], True)
+        batched = per_query_us(exact.search, Q, False)
+        print(f"{'exact':14}{1.0:10.3f}{1.0:9.3f}{n:12,}{single:11.0f} µs{batched:11.0f} µs")
+        for probes in PROBES:
+            recall = recall_at_1(index, exact, Q, n_probes=probes)
+            recall_noisy = recall_at_1(index, exact, Q_noisy, n_probes=probes)
+            query_ids, _ = index.candidates(Q, probes)
+            search = lambda X: index.search(X, n_probes=probes)
+            single = per_query_us(search, Q[:100], True)
+            batched = per_query_us(search, Q, False)
+            print(f"{f'lsh probes={probes}':14}{recall:10.3f}{recall_noisy:9.3f}{len(query_ids) / QUERIES:12,.0f}"
+                  f"{single:11.0f} µs{batched:11.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
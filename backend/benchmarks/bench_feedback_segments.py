@@ -0,0 +1,77 @@
+"""
+Online feedback insertion on a synthetic 100k-comment base index: cost of
+recording and picking up comments, single-query latency with a growing
+delta and with sealed segments waiting for compaction, and how long a
+compaction takes compared to rebuilding the index from scratch.
+
+Run from backend/:  python -m benchmarks.bench_feedback_segments
+"""
+import tempfile
+import time
+from pathlib import Path
+
+import scipy.sparse as sp
+
+from services.feedback_index import FeedbackIndex
+from services.feedback_segments import SegmentedFeedbackIndex, record_feedback
+from test_feedback_lsh import near_queries, synthetic_corpus
+
+BASE_ROWS = 100_000
+DELTA_ROWS = 256
+QUERIES = 200
+
+
+class RowVectorizer:
+    """'17' -> row 17 of a prepared matrix, so logged comments map to known vectors."""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def transform(self, texts):
+        return self.matrix[[int(t) for t in texts]]
+
+
+def per_query_us(index, Q) -> float:
+    started = time.perf_counter()
+    for i in range(Q.shape[0]):
+        index.search(Q[i])
+    return (time.perf_counter() - started) / Q.shape[0] * 1_000_000
+
+
+def main():
+    corpus = synthetic_corpus(BASE_ROWS + 5 * DELTA_ROWS)
+    base_rows, new_rows = corpus[:BASE_ROWS], corpus[BASE_ROWS:]
+    Q = near_queries(corpus, QUERIES)
+    log_path = Path(tempfile.mkdtemp()) / "teacher_feedback_log.jsonl"
+    index = SegmentedFeedbackIndex(FeedbackIndex(base_rows), RowVectorizer(new_rows), log_path, DELTA_ROWS)
+    index._compact_in_background = lambda: None  # compact by hand below, to measure the uncompacted state
+    print(f"base: {BASE_ROWS:,} comments, delta sealed at {DELTA_ROWS} rows")
+    print(f"{'state':36}{'per query':>12}")
+    print(f"{'base only':36}{per_query_us(index, Q):9.0f} µs")
+
+    written = 0
+    for target in (1, DELTA_ROWS - 1, 4 * DELTA_ROWS + 1):
+        # As in serving: each comment is recorded, then picked up by the next search
+        started = time.perf_counter()
+        for i in range(written, target):
+            record_feedback(f"inlämning {i}", str(i), log_path)
+            index.refresh()
+        per_comment_us = (time.perf_counter() - started) / (target - written) * 1e6
+        stats = index.stats()
+        label = f"{stats['logged_rows']} logged, {stats['segments']} segment(s)"
+        print(f"{label:36}{per_query_us(index, Q):9.0f} µs   (record + refresh {per_comment_us:.0f} µs/comment)")
+        written = target
+
+    started = time.perf_counter()
+    merged = index.compact()
+    compact_s = time.perf_counter() - started
+    print(f"{f'compacted ({merged} rows merged)':36}{per_query_us(index, Q):9.0f} µs   "
+          f"(compaction {compact_s * 1000:.0f} ms)")
+
+    started = time.perf_counter()
+    FeedbackIndex(sp.vstack([base_rows, new_rows[:written]]))
+    print(f"full rebuild of the exact index: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Single-row grade prediction latency: ml_utils.predict_grade (pandas
+DataFrame per call) vs the prepared GradePredictor.
+
+Run from backend/:  python -m benchmarks.bench_grade_predictor
+"""
+import time
+
+import ml_utils
+from ml_utils import GradePredictor, predict_grade
+from feature_extractor import feature_extractor
+from benchmarks.bench_feature_extractor import DESCRIPTION, make_text
+
+
+def bench(fn, features, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(features)
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def main():
+    features = feature_extractor.extract(make_text(2_000), DESCRIPTION, "Ekvationer", 3)
+    predictor = GradePredictor(ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder)
+
+    def legacy(f):
+        return predict_grade(ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder, f)
+
+    assert legacy(features) == predictor.predict(features)
+    for fn in (legacy, predictor.predict):  # warm-up
+        bench(fn, features, 20)
+
+    repeat = 2_000
+    old = bench(legacy, features, repeat)
+    new = bench(predictor.predict, features, repeat)
+    encode = bench(predictor.encode, features, repeat)
+    print(f"predict_grade        {old:9.1f} µs/row")
+    print(f"GradePredictor       {new:9.1f} µs/row  ({old / new:.1f}x)")
+    print(f"  of which encoding  {encode:9.1f} µs/row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Grade model inference backends side by side: build time, latency per call
+for batch sizes 1, 32 and 1024, and the largest probability difference to
+XGBoost. The onnx row needs onnxruntime and onnxmltools installed.
+
+Run from backend/:  python -m benchmarks.bench_inference_backends
+"""
+import time
+
+import numpy as np
+
+import ml_utils
+from benchmarks.bench_tree_ensemble import BATCH_SIZES, bench
+from services.inference_backends import BACKENDS, make_backend
+from test_tree_ensemble import random_matrix, realistic_matrix
+
+
+def main():
+    model = ml_utils.model
+    n_features = len(ml_utils.feature_order)
+    X_all = realistic_matrix(max(BATCH_SIZES))
+    X_check = np.concatenate([X_all, random_matrix()])
+    expected = model.predict_proba(X_check)
+
+    print(f"{'':10}{'build':>10}" + "".join(f"{f'batch {n}':>16}" for n in BATCH_SIZES) + f"{'max |Δp|':>12}")
+    for name in BACKENDS:
+        started = time.perf_counter()
+        backend = make_backend(model, n_features, name)
+        build_ms = (time.perf_counter() - started) * 1000
+        if backend.name != name:
+            print(f"{name:10}  not available, skipped")
+            continue
+        cells = []
+        for n in BATCH_SIZES:
+            X = np.ascontiguousarray(X_all[:n])
+            cells.append(f"{bench(backend.predict_proba, X):12.1f} µs")
+        diff = np.abs(np.asarray(backend.predict_proba(X_check)) - expected).max()
+        print(f"{name:10}{build_ms:7.0f} ms" + "".join(f"{cell:>16}" for cell in cells) + f"{diff:12.1e}")
+
+
+if __name__ == "__main__":
+    main()
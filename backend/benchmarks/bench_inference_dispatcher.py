@@ -0,0 +1,50 @@
+"""
+Grade prediction throughput with many concurrent callers: one booster
+call per row vs the micro-batching InferenceDispatcher.
+
+Run from backend/:  python -m benchmarks.bench_inference_dispatcher
+"""
+import threading
+import time
+
+import ml_utils
+from ml_utils import GradePredictor
+from feature_extractor import feature_extractor
+from services.inference_dispatcher import InferenceDispatcher
+from benchmarks.bench_feature_extractor import DESCRIPTION, make_text
+
+
+def run(predictor, features, threads, per_thread):
+    def worker():
+        for _ in range(per_thread):
+            predictor.predict(features)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return threads * per_thread / (time.perf_counter() - start)
+
+
+def make_predictor(batch_size, wait_ms):
+    predictor = GradePredictor(ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder)
+    predictor.dispatcher = InferenceDispatcher(predictor.predict_proba_batch, batch_size, wait_ms)
+    return predictor
+
+
+def main():
+    features = feature_extractor.extract(make_text(2_000), DESCRIPTION, "Ekvationer", 3)
+    print(f"{'threads':>8} {'direct rows/s':>14} {'batched rows/s':>15} {'mean batch':>11}")
+    for threads in (1, 4, 16, 64):
+        per_thread = max(20, 2_000 // threads)
+        direct = run(make_predictor(1, 0), features, threads, per_thread)
+        batched_predictor = make_predictor(32, 2)
+        batched = run(batched_predictor, features, threads, per_thread)
+        mean_batch = batched_predictor.dispatcher.stats()["batch_size"]["mean"]
+        print(f"{threads:>8} {direct:>14.0f} {batched:>15.0f} {mean_batch:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
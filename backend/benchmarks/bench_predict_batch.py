@@ -0,0 +1,63 @@
+"""
+Grading a whole class through the predict router: one POST /predict per
+student vs one POST /predict/batch with a row list, columnar JSON or an
+Arrow stream. In-process via TestClient, so HTTP parsing is included but
+no network.
+
+Run from backend/:  python -m benchmarks.bench_predict_batch
+"""
+import io
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers.predict import Features, router
+from test_predict_router import make_rows
+
+CLASS_SIZES = (30, 1000)
+ARROW_HEADERS = {"content-type": "application/vnd.apache.arrow.stream"}
+
+
+def arrow_body(rows):
+    import pyarrow as pa
+
+    table = pa.table({name: [row[name] for row in rows] for name in Features.model_fields})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def bench(fn, repeat):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    for n in CLASS_SIZES:
+        rows = make_rows(n)
+        columns = {name: [row[name] for row in rows] for name in Features.model_fields}
+        body = arrow_body(rows)
+        repeat = 3 if n > 100 else 10
+        results = {
+            "POST /predict per row": bench(lambda: [client.post("/predict", json=row) for row in rows], repeat),
+            "batch, row list": bench(lambda: client.post("/predict/batch", json=rows), repeat),
+            "batch, columnar JSON": bench(lambda: client.post("/predict/batch", json=columns), repeat),
+            "batch, Arrow stream": bench(lambda: client.post("/predict/batch", content=body, headers=ARROW_HEADERS), repeat),
+        }
+        baseline = results["POST /predict per row"]
+        print(f"{n} rows")
+        for name, ms in results.items():
+            print(f"  {name:24} {ms:9.1f} ms  ({ms * 1000 / n:7.1f} µs/row, {baseline / ms:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+How much the prediction cache saves on features produced by the real
+extractor: distinct encoded rows vs submissions, hit rate, and time per
+GradePredictor.predict with and without the cache.
+
+Run from backend/:  python -m benchmarks.bench_prediction_cache
+"""
+import random
+import time
+
+import ml_utils
+from ml_utils import GradePredictor
+from feature_extractor import feature_extractor
+from benchmarks.bench_feature_extractor import DESCRIPTION, make_text
+from services.prediction_cache import PredictionCache
+
+SUBMISSIONS = 5_000
+# Homework answers are a handful of lines; longer texts spread steps_count/computational_errors
+MAX_CHARS = 600
+TOPICS = ["Algebra", "Ekvationer", "Funktioner", "Geometri", "Procent"]
+
+
+def make_features(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        feature_extractor.extract(
+            make_text(rng.randint(40, MAX_CHARS), seed=i), DESCRIPTION, rng.choice(TOPICS), rng.randint(1, 5)
+        )
+        for i in range(n)
+    ]
+
+
+def run(predictor, rows):
+    start = time.perf_counter()
+    grades = [predictor.predict(features) for features in rows]
+    return grades, (time.perf_counter() - start) / len(rows) * 1_000_000
+
+
+def main():
+    rows = make_features(SUBMISSIONS)
+    args = (ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder)
+    plain = GradePredictor(*args)
+    cache = PredictionCache()
+    cached = GradePredictor(*args, cache=cache, cache_id="bench")
+    for predictor in (plain, cached):
+        predictor.dispatcher.max_batch_size = 1  # one caller: time the model call itself
+
+    distinct = len({plain.encode(features).tobytes() for features in rows})
+    expected, plain_us = run(plain, rows)
+    grades, cached_us = run(cached, rows)
+    assert grades == expected
+    stats = cache.stats()
+
+    print(f"submissions          {len(rows)}")
+    print(f"distinct rows        {distinct}  ({distinct / len(rows):.1%})")
+    print(f"cache hit rate       {stats['hit_rate']:.1%}  ({stats['payload_bytes'] / 1024:.0f} KiB cached)")
+    print(f"predict, no cache    {plain_us:8.1f} µs/row")
+    print(f"predict, cache       {cached_us:8.1f} µs/row  ({plain_us / cached_us:.1f}x)")
+    _, warm_us = run(cached, rows)
+    print(f"predict, warm cache  {warm_us:8.1f} µs/row  ({plain_us / warm_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Batch scoring throughput: ScoringService.score_many over a batch of
+synthetic math submissions, inline and on ScoringPool workers with 1, 4
+and os.cpu_count() processes. Pools are started (and warmed up) before
+timing, as score_batch_pool is by the first batch request.
+
+Run from backend/:  python -m benchmarks.bench_score_many [n_texts]
+"""
+import os
+import sys
+import time
+
+BATCHES = 3
+
+
+def main():
+    from ml_service import scoring_service
+    from services.scoring_pool import ScoringPool, _warm_up_heuristic_scorer
+    from test_score_batch import make_submissions
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texts = make_submissions(n, min_chars=200, max_chars=3000)
+    print(f"{n} texts, {sum(map(len, texts)) / n:.0f} characters on average, {os.cpu_count()} CPUs")
+
+    expected = None
+    for processes in sorted({0, 1, 4, os.cpu_count() or 1}):
+        pool = ScoringPool(processes, warm_up=_warm_up_heuristic_scorer)
+        pool.start()
+        try:
+            best = float("inf")
+            for _ in range(BATCHES):
+                started = time.perf_counter()
+                results = scoring_service.score_many(texts, "mathematics", pool=pool)
+                best = min(best, time.perf_counter() - started)
+        finally:
+            pool.shutdown()
+        scores = [r.score for r in results]
+        expected = expected or scores
+        label = "inline" if processes == 0 else f"{processes} processes"
+        print(f"{label:>13}: {n / best:8.0f} texts/s ({best * 1000:6.0f} ms per batch)"
+              f"{'' if scores == expected else '  ❌ scores differ from inline'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+API process startup budget: import time of app.py, which heavy ML
+modules it pulls in, and how long a fresh uvicorn process takes to
+answer /health/live and /health/ready.
+
+Uses a throwaway SQLite database unless DATABASE_URL is set.
+Run from backend/:  python -m benchmarks.bench_startup
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "xgboost", "sklearn", "scipy", "joblib")
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def bench_env():
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        env["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "startup.db")
+    return env
+
+
+def measure_import(env):
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def measure_first_request(env, timeout=60.0):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        live = wait_for(base + "/health/live", start + timeout)
+        ready = wait_for(base + "/health/ready", start + timeout) if live else None
+    finally:
+        server.terminate()
+        server.wait()
+    return (
+        live - start if live else None,
+        ready - start if ready else None,
+    )
+
+
+def fmt(seconds):
+    return f"{seconds:6.2f} s" if seconds is not None else "   n/a"
+
+
+def main(runs=3):
+    env = bench_env()
+    imports = [measure_import(env) for _ in range(runs)]
+    print(f"import app            {fmt(statistics.median(r['seconds'] for r in imports))}  (median of {runs})")
+    print(f"heavy ML modules      {', '.join(imports[-1]['heavy']) or 'none'}")
+
+    live, ready = zip(*(measure_first_request(env) for _ in range(runs)))
+    live = [t for t in live if t is not None]
+    ready = [t for t in ready if t is not None]
+    print(f"first /health/live    {fmt(statistics.median(live) if live else None)}")
+    print(f"first /health/ready   {fmt(statistics.median(ready) if ready else None)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+ScoringService indicator scan on 10 KB submissions: scan_submission()
+(one pass over the case-folded text) vs running each original pattern
+with re.search on its own, as the analyzers used to, and the full
+score_submission() per text. The last line is a 60 KB line of numbers
+without an operator, on which the old r'\\d+.*[×\\*].*\\d+' backtracked
+quadratically.
+
+Run from backend/:  python -m benchmarks.bench_submission_scan [n_texts]
+"""
+import sys
+import time
+
+
+def per_text_ms(fn, texts, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best / len(texts) * 1000
+
+
+def main():
+    from ml_service import scoring_service
+    from services.submission_scan import scan_submission
+    from test_score_batch import make_submissions
+    from test_submission_scan import reference_hits
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    texts = make_submissions(n, seed=9, min_chars=10_000, max_chars=10_000)
+    print(f"{n} submissions of {sum(map(len, texts)) // n:,} characters")
+    print(f"{'per-pattern re.search (indicators only)':42}{per_text_ms(reference_hits, texts):7.2f} ms/text")
+    print(f"{'scan_submission':42}{per_text_ms(scan_submission, texts):7.2f} ms/text")
+    print(f"{'score_submission':42}{per_text_ms(scoring_service.score_submission, texts):7.2f} ms/text")
+    numbers = ["12 " * 20_000]
+    print(f"{'score_submission, 60 KB of numbers':42}{per_text_ms(scoring_service.score_submission, numbers, 1):7.2f} ms/text")
+
+
+if __name__ == "__main__":
+    main()
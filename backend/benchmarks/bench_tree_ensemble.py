@@ -0,0 +1,54 @@
+"""
+Grade model latency per call for batch sizes 1, 32 and 1024:
+XGBClassifier.predict_proba, Booster.inplace_predict and the pure-NumPy
+TreeEnsemble built from trained_model.json.
+
+Run from backend/:  python -m benchmarks.bench_tree_ensemble
+"""
+import time
+
+import numpy as np
+
+import ml_utils
+from services.model_registry import MODEL_DIR
+from services.tree_ensemble import TreeEnsemble
+from test_tree_ensemble import realistic_matrix
+
+BATCH_SIZES = (1, 32, 1024)
+
+
+def bench(fn, X, min_seconds=0.5):
+    fn(X)  # warm-up
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        fn(X)
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1_000_000
+
+
+def main():
+    started = time.perf_counter()
+    ensemble = TreeEnsemble.from_json(MODEL_DIR / "trained_model.json")
+    print(f"export: {len(ensemble.roots)} trees, {len(ensemble.feature)} nodes, "
+          f"depth {ensemble.max_depth} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    model = ml_utils.model
+    booster = model.get_booster()
+    candidates = {
+        "XGBClassifier.predict_proba": model.predict_proba,
+        "Booster.inplace_predict": booster.inplace_predict,
+        "TreeEnsemble.predict_proba": ensemble.predict_proba,
+    }
+    X_all = realistic_matrix(max(BATCH_SIZES))
+
+    print(f"{'':30}" + "".join(f"{f'batch {n}':>16}" for n in BATCH_SIZES))
+    for name, fn in candidates.items():
+        cells = []
+        for n in BATCH_SIZES:
+            X = np.ascontiguousarray(X_all[:n])
+            cells.append(f"{bench(fn, X):12.1f} µs")
+        print(f"{name:30}" + "".join(f"{cell:>16}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
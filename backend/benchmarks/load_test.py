@@ -0,0 +1,106 @@
+"""
+Load test: latency of a cheap GET while homework submissions are scored.
+
+Measures GET latency first on an idle server, then while `--submitters`
+clients keep posting submissions. Each text is unique so the scoring
+cache doesn't hide the scoring cost. If the event loop is blocked by
+scoring, the second p95/max jumps to the scoring time.
+
+Needs a running server and a student token (run from backend/):
+    uvicorn app:app --port 8000
+    python -m benchmarks.load_test --token <student token> --student-homework-id 1
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.bench_feature_extractor import make_text
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def probe(client, path, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def submitter(client, args, worker, stop, latencies, errors):
+    n = 0
+    while not stop.is_set():
+        text = f"Elev {worker} försök {n}\n" + make_text(args.text_chars, seed=worker * 100_000 + n)
+        n += 1
+        start = time.perf_counter()
+        response = await client.post(
+            "/homework_submissions/",
+            json={
+                "student_homework_id": args.student_homework_id,
+                "submission_text": text,
+                "submission_date": "2025-01-01T12:00:00",
+            },
+            headers={"Authorization": f"Bearer {args.token}"},
+        )
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            errors.append(response.status_code)
+
+
+async def run_phase(args, submitters):
+    stop = asyncio.Event()
+    probe_latencies, submit_latencies, errors = [], [], []
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        tasks = [
+            asyncio.create_task(probe(client, args.probe_path, stop, probe_latencies))
+            for _ in range(args.probes)
+        ]
+        tasks += [
+            asyncio.create_task(submitter(client, args, i, stop, submit_latencies, errors))
+            for i in range(submitters)
+        ]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+    return probe_latencies, submit_latencies, errors
+
+
+def report(label, probe_latencies, submit_latencies, errors, duration):
+    print(
+        f"{label:<22} GET p50 {statistics.median(probe_latencies):7.1f} ms"
+        f"  p95 {percentile(probe_latencies, 95):7.1f} ms"
+        f"  max {max(probe_latencies):7.1f} ms"
+        f"  | submissions {len(submit_latencies) / duration:6.1f}/s"
+        + (f" (p50 {statistics.median(submit_latencies):.0f} ms)" if submit_latencies else "")
+        + (f"  errors {len(errors)}" if errors else "")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--student-homework-id", type=int, required=True)
+    parser.add_argument("--probe-path", default="/api/ml/health")
+    parser.add_argument("--probes", type=int, default=4)
+    parser.add_argument("--submitters", type=int, default=8)
+    parser.add_argument("--text-chars", type=int, default=20_000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    idle = asyncio.run(run_phase(args, submitters=0))
+    report("idle", *idle, args.duration)
+    loaded = asyncio.run(run_phase(args, submitters=args.submitters))
+    report(f"{args.submitters} submitters", *loaded, args.duration)
+
+
+if __name__ == "__main__":
+    main()
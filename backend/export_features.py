@@ -0,0 +1,46 @@
+"""
+Export the submission feature table for analytics or retraining.
+
+Examples (run from backend/):
+    python export_features.py --out features.npz
+    python export_features.py --model-version EduMate_RF_v1 --format arrow --out features.arrow
+"""
+import argparse
+import time
+
+import numpy as np
+
+from db_setup import SessionLocal
+from services.feature_store import export_arrow, export_numpy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export per-submission features")
+    parser.add_argument("--model-version")
+    parser.add_argument("--format", choices=["npz", "arrow"], default="npz")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        if args.format == "arrow":
+            import pyarrow as pa
+
+            table = export_arrow(db, model_version=args.model_version)
+            with pa.OSFile(args.out, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            rows = table.num_rows
+        else:
+            data = export_numpy(db, model_version=args.model_version)
+            np.savez(args.out, **{name: values.astype(str) if values.dtype == object else values
+                                  for name, values in data.items()})
+            rows = len(data["homework_submission_id"])
+    finally:
+        db.close()
+
+    print(f"✅ Exported {rows} feature rows to {args.out} ({time.perf_counter() - started:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
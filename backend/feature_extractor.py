@@ -0,0 +1,262 @@
+import re
+from typing import Dict, Optional
+
+from ml_utils import calculate_rubric_points_v2, estimate_expected_steps
+
+# --- Keyword tables (same lists as the calculate_* functions in ml_utils) ---
+MATH_OPS = ("=", "+", "-", "*", "/", "^")
+LINK_WORDS = ("därför", "alltså", "sedan", "således", "därav", "therefore", "because")
+EXPLANATION_WORDS = ("eftersom", "flyttar", "dividera", "addera", "förenkla", "löser")
+
+EQUATION_METHOD_WORDS = ("algebra", "x =", "factor", "faktorisera", "formel", "pq")
+TRIAL_WORDS = ("guess", "trial", "prova", "gissa")
+STATISTICS_METHOD_WORDS = ("medelvärde", "snitt", "/ 3", "average")
+
+REPRESENTATION_WORDS = ("diagram", "graph", "table")
+MISLEADING_WORDS = ("incorrect", "unclear")
+
+CLARITY_MATH_WORDS = ("add", "subtract", "divide", "multiply", "isolate", "solve", "equation")
+
+UNITS = ("cm", "m", "km", "mm", "kg", "g", "l", "ml", "s", "min", "h")
+CONVERSION_WORDS = ("=", "convert", "to", "from")
+UNIT_ERROR_WORDS = ("mixed units", "wrong units", "missing units")
+
+GRAMMAR_ISSUE_WORDS = ("stuff", "thing", "did", "got", "move")
+LANGUAGE_MATH_TERMS = (
+    "factor", "variable", "simplify", "probability", "equation",
+    "subtract", "add", "divide", "multiply",
+)
+
+# "used Pythagoras incorrectly" is matched against lowercased text in
+# calculate_conceptual_errors and therefore never hits; kept verbatim for parity.
+CONCEPTUAL_ERROR_INDICATORS = (
+    "wrong formula", "incorrect theorem", "misunderstood definition",
+    "used Pythagoras incorrectly", "wrong method", "misapplied rule",
+)
+
+CORRECT_STEP_WORDS = ("add", "subtract", "divide", "multiply", "simplify", "solve")
+
+PERFECT_WORDS = ("no mistakes", "perfect")
+REASONING_WORDS = ("because", "therefore", "reason", "explanation")
+ADVANCED_WORDS = ("complex", "advanced", "sophisticated", "optimal")
+
+SEQUENCE_WORDS = ("först", "sedan", "därefter", "slutligen", "finally", "then")
+
+# Every distinct keyword is searched for once per submission
+SUBMISSION_KEYWORDS = tuple(dict.fromkeys(
+    MATH_OPS + LINK_WORDS + EXPLANATION_WORDS
+    + EQUATION_METHOD_WORDS + TRIAL_WORDS + ("%", "procent", "pythagoras", "area", "volym")
+    + STATISTICS_METHOD_WORDS + REPRESENTATION_WORDS + MISLEADING_WORDS
+    + CLARITY_MATH_WORDS + UNITS + CONVERSION_WORDS + UNIT_ERROR_WORDS
+    + GRAMMAR_ISSUE_WORDS + LANGUAGE_MATH_TERMS + CONCEPTUAL_ERROR_INDICATORS
+    + CORRECT_STEP_WORDS + PERFECT_WORDS + REASONING_WORDS + ADVANCED_WORDS
+    + SEQUENCE_WORDS
+))
+
+# Description keyword groups for method_appropriateness, checked in this order
+DESCRIPTION_GROUPS = (
+    ("equation", ("equation", "ekvation", "solve", "lös")),
+    ("percent", ("procent", "%", "percentage", "increase", "decrease")),
+    ("geometry", ("geometri", "pythagoras", "area", "volym", "circle", "triangel")),
+    ("statistics", ("statistik", "sannolikhet", "probability", "mean", "average", "medelvärde", "snitt")),
+)
+
+CALCULATION_PATTERN = re.compile(r"(\d+)\s*([\+\-\*/])\s*(\d+)\s*=\s*(\d+)")
+SEQUENCE_SPLIT_PATTERN = re.compile(r"(först|sedan|därefter|slutligen|finally|then)")
+
+
+class FeatureExtractor:
+    """
+    Computes the whole scoring feature dict for a submission in one go.
+
+    The text is lowercased and split into lines once, every keyword of every
+    calculate_* function is looked up once, and the features are derived
+    from that hit set. Values are identical to calling the individual
+    ml_utils.calculate_* functions.
+    """
+
+    def __init__(self):
+        self._description_cache: Dict[str, Optional[str]] = {}
+
+    def _description_group(self, description: str) -> Optional[str]:
+        group = self._description_cache.get(description)
+        if group is None and description not in self._description_cache:
+            desc = description.lower()
+            group = next(
+                (name for name, words in DESCRIPTION_GROUPS if any(w in desc for w in words)),
+                None,
+            )
+            if len(self._description_cache) < 1024:
+                self._description_cache[description] = group
+        return group
+
+    def extract(
+        self,
+        submission_text: str,
+        homework_description: str,
+        topic: str,
+        difficulty: int,
+        expected_answer: str = "",
+    ) -> Dict[str, object]:
+        """Return the feature dict used by the grade model."""
+        text = submission_text or ""
+        empty = not text.strip()
+        lowered = text.lower()
+        lines = [line.strip() for line in lowered.split("\n") if line.strip()]
+        hits = set() if empty else {kw for kw in SUBMISSION_KEYWORDS if kw in lowered}
+
+        def has_any(words):
+            return any(w in hits for w in words)
+
+        # --- Steps ---
+        steps_count = 0
+        if not empty:
+            check_sequence = has_any(SEQUENCE_WORDS)
+            for line in lines:
+                # maxsplit=4 is enough to tell "at most 4 words" apart
+                if len(line.split(None, 4)) <= 4:
+                    steps_count += 1
+                elif check_sequence and any(w in line for w in SEQUENCE_WORDS):
+                    parts = SEQUENCE_SPLIT_PATTERN.split(line)
+                    steps_count += len([p for p in parts if p.strip()])
+                else:
+                    steps_count += 1
+        expected_steps = estimate_expected_steps(topic, difficulty)
+        steps_completeness = round(min(steps_count / expected_steps, 1.0), 2)
+
+        # --- Reasoning quality ---
+        reasoning_quality = 0.0
+        if not empty:
+            score = 0
+            if has_any(MATH_OPS):
+                score += 0.3
+            if has_any(LINK_WORDS):
+                score += 0.3
+            if has_any(EXPLANATION_WORDS):
+                score += 0.3
+            if len(lines) > 1:
+                score += 0.1
+            reasoning_quality = round(min(score, 1.0), 2)
+
+        # --- Method appropriateness ---
+        if empty:
+            method_appropriateness = 0.0
+        else:
+            group = self._description_group(homework_description)
+            if group == "equation":
+                if has_any(EQUATION_METHOD_WORDS):
+                    method_appropriateness = 1.0
+                elif has_any(TRIAL_WORDS):
+                    method_appropriateness = 0.5
+                else:
+                    method_appropriateness = 0.3
+            elif group == "percent":
+                method_appropriateness = 1.0 if has_any(("%", "procent")) else 0.0
+            elif group == "geometry":
+                method_appropriateness = 1.0 if has_any(("pythagoras", "area", "volym")) else 0.3
+            elif group == "statistics":
+                method_appropriateness = 1.0 if has_any(STATISTICS_METHOD_WORDS) else 0.3
+            elif has_any(("guess", "trial")):
+                method_appropriateness = 0.5
+            elif "pythagoras" in hits and "procent" in homework_description.lower():
+                method_appropriateness = 0.0
+            else:
+                method_appropriateness = 0.5
+
+        # --- Representation use ---
+        representation_use = 0.0
+        if has_any(REPRESENTATION_WORDS):
+            representation_use = 0.5 if has_any(MISLEADING_WORDS) else 1.0
+
+        # --- Explanation clarity ---
+        explanation_clarity = 0.0
+        if not empty:
+            has_complete_sentences = "." in text or "?" in text or "!" in text
+            uses_math_language = has_any(CLARITY_MATH_WORDS)
+            if has_complete_sentences and uses_math_language and text.count("\n") > 1:
+                explanation_clarity = 1.0
+            elif has_complete_sentences or uses_math_language:
+                explanation_clarity = 0.5
+
+        # --- Units handling ---
+        units_handling = 0.0
+        if has_any(UNITS):
+            if has_any(CONVERSION_WORDS) and not has_any(UNIT_ERROR_WORDS):
+                units_handling = 1.0
+            else:
+                units_handling = 0.5
+
+        # --- Language quality ---
+        language_quality = 0.0
+        if not empty:
+            uses_math_terms = has_any(LANGUAGE_MATH_TERMS)
+            is_logically_structured = "." in text or "\n" in text
+            if uses_math_terms and is_logically_structured and not has_any(GRAMMAR_ISSUE_WORDS):
+                language_quality = 1.0
+            elif uses_math_terms or is_logically_structured:
+                language_quality = 0.5
+
+        # --- Computational errors ---
+        computational_errors = 0
+        if not empty:
+            for num1, operator, num2, result in CALCULATION_PATTERN.findall(text):
+                num1, num2, result = int(num1), int(num2), int(result)
+                if operator == "+":
+                    correct_result = num1 + num2
+                elif operator == "-":
+                    correct_result = num1 - num2
+                elif operator == "*":
+                    correct_result = num1 * num2
+                else:
+                    correct_result = num1 / num2
+                if correct_result != result:
+                    computational_errors += 1
+
+        # --- Conceptual errors ---
+        conceptual_errors = sum(1 for indicator in CONCEPTUAL_ERROR_INDICATORS if indicator in hits)
+
+        # --- Correctness ---
+        correctness_pct = 0
+        if not empty:
+            is_final_answer_correct = expected_answer in text
+            has_correct_steps = has_any(CORRECT_STEP_WORDS)
+            if is_final_answer_correct and has_correct_steps:
+                correctness_pct = 100
+            elif is_final_answer_correct or has_correct_steps:
+                correctness_pct = 50
+
+        # --- External aid / originality ---
+        external_aid_suspected = 0.0
+        if not empty:
+            is_perfect_solution = has_any(PERFECT_WORDS)
+            missing_reasoning = not has_any(REASONING_WORDS)
+            if is_perfect_solution and missing_reasoning and has_any(ADVANCED_WORDS):
+                external_aid_suspected = 1.0
+            elif is_perfect_solution or missing_reasoning:
+                external_aid_suspected = 0.5
+        originality_score = round(1.0 - external_aid_suspected, 2)
+
+        rubric_points = calculate_rubric_points_v2(
+            method_appropriateness, computational_errors, explanation_clarity, units_handling
+        )
+
+        return {
+            "topic": topic,
+            "difficulty_1to5": difficulty,
+            "steps_count": steps_count,
+            "steps_completeness": steps_completeness,
+            "reasoning_quality": reasoning_quality,
+            "method_appropriateness": method_appropriateness,
+            "representation_use": representation_use,
+            "explanation_clarity": explanation_clarity,
+            "units_handling": units_handling,
+            "language_quality": language_quality,
+            "computational_errors": computational_errors,
+            "conceptual_errors": conceptual_errors,
+            "correctness_pct": correctness_pct,
+            "originality_score": originality_score,
+            "rubric_points": rubric_points,
+        }
+
+
+feature_extractor = FeatureExtractor()
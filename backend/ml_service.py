@@ -1,17 +1,21 @@
 from pathlib import Path
-import joblib
-import pandas as pd
-from xgboost import XGBClassifier
 from typing import Dict, Any
 import re
 import time
 import json
-from typing import Optional, Dict, Any
-from datetime import datetime
-from dataclasses import dataclass
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
 from decimal import Decimal
 import numpy as np
 
+from services.metrics import StageLatency
+from services.model_registry import model_registry
+from services.submission_scan import (
+    CONCLUSION, DEPTH_INDICATORS, MATH_STRUCTURES, MATH_SYMBOLS, MATH_TOPICS, PROBLEM_SOLVING,
+    SECTIONS, SHOWS_WORK, TECH_TERMS, SubmissionScan, scan_submission,
+)
+
 @dataclass
 class ScorePrediction:
     score: Optional[float]
@@ -21,74 +25,43 @@ class ScorePrediction:
     processing_time_ms: float
     analysis_data: Dict[str, Any]
     model_used: str = "EduMate_Scorer_v1"
+    stage_ms: Dict[str, float] = field(default_factory=dict)  # measured time per scoring stage
 
 # Paths
 MODEL_DIR = Path(__file__).resolve().parent / "model"
 
-# Globals (start empty, load on startup)
-_model = None
-_topic_encoder = None
-_feature_order = None
+# Smallest number of texts sent to one batch scoring worker at a time
+SCORE_BATCH_MIN_CHUNK = 8
 
+WARM_UP_TEXT = (
+    "Steg 1: Vi löser ekvationen 2x + 5 = 11 genom att subtrahera 5 från båda sidor, 2x = 6.\n\n"
+    "Steg 2: Dividera med 2, så x = 3. Kontroll: 2 · 3 + 5 = 11 stämmer.\n\nSvar: x = 3"
+)
 
 def init_models():
-    """Load all ML artefacts safely"""
-    global _model, _topic_encoder, _feature_order
-
-    try:
-        m = XGBClassifier()
-        m.load_model(MODEL_DIR / "trained_model.json")
-        _model = m
-        print("✅ Model loaded")
-    except Exception as e:
-        print(f"❌ Could not load model: {e}")
-
-    try:
-        _topic_encoder = joblib.load(MODEL_DIR / "topic_encoder.pkl")
-        print("✅ Topic encoder loaded")
-    except Exception as e:
-        print(f"❌ Could not load topic_encoder.pkl: {e}")
-
-    try:
-        _feature_order = joblib.load(MODEL_DIR / "feature_order.pkl")
-        print("✅ Feature order loaded")
-    except Exception as e:
-        print(f"❌ Could not load feature_order.pkl: {e}")
+    """Load all ML artefacts up front (they are otherwise loaded on first use)"""
+    for name in ("grade_model", "topic_encoder", "feature_order"):
+        model_registry.try_get(name)
 
 
 def get_model():
-    if _model is None:
-        raise RuntimeError("Model not loaded – did you call init_models()?")
-    return _model
+    return model_registry.get("grade_model")
 
 
 def get_topic_encoder():
-    if _topic_encoder is None:
-        raise RuntimeError("Topic encoder not loaded – did you call init_models()?")
-    return _topic_encoder
+    return model_registry.get("topic_encoder")
 
 
 def get_feature_order():
-    if _feature_order is None:
-        raise RuntimeError("Feature order not loaded – did you call init_models()?")
-    return _feature_order
+    return model_registry.get("feature_order")
 
 class InferenceService:
-    def _preprocess(self, payload: Dict[str, Any]) -> pd.DataFrame:
-        df = pd.DataFrame([payload])
-        # Encode 'topic'
-        df["topic"] = _topic_encoder.transform(df["topic"])
-        # Ordna kolumner exakt som vid träning
-        df = df[_feature_order]
-        return df
-
     def predict(self, payload: Dict[str, Any]):
-        df = self._preprocess(payload)
-        pred = _model.predict(df)[0]
-        proba = _model.predict_proba(df)[0]
-        classes = list(_model.classes_)
-        probs = {cls: float(p) for cls, p in zip(classes, proba)}
-        return pred, probs
+        # Same path as POST /predict: active model version and its inference backend,
+        # prediction cache, and micro-batching with concurrent requests
+        from services.inference import predict_one
+
+        return predict_one(payload)
 
 class FeedbackService:
     """
@@ -127,10 +100,31 @@ class ScoringService:
             'A': (90, 100), 'B': (80, 89), 'C': (70, 79),
             'D': (60, 69), 'E': (50, 59), 'F': (0, 49)
         }
+        # Milliseconds per scoring stage, for every text this instance scores
+        self.stage_latency = StageLatency()
     
     def score_submission(self, submission_text: str, subject: str = "mathematics") -> ScorePrediction:
         """Score a homework submission using AI analysis"""
-        start_time = time.time()
+        prediction = self._score(submission_text, subject)
+        self._observe(prediction)
+        return prediction
+
+    def _observe(self, prediction: ScorePrediction):
+        self.stage_latency.observe({**prediction.stage_ms, "total": prediction.processing_time_ms})
+
+    def warm_up(self) -> float:
+        """Score a sample text once, outside the latency histogram; returns its milliseconds."""
+        return self._score(WARM_UP_TEXT, "mathematics").processing_time_ms
+
+    def _score(self, submission_text: str, subject: str) -> ScorePrediction:
+        start_time = last = time.perf_counter()
+        stage_ms: Dict[str, float] = {}
+
+        def lap(stage: str):
+            nonlocal last
+            now = time.perf_counter()
+            stage_ms[stage] = (now - last) * 1000
+            last = now
         
         try:
             # Check minimum length requirement
@@ -138,55 +132,110 @@ class ScoringService:
                 return ScorePrediction(
                     score=None, band=None, confidence=0.0,
                     reason=f"Submission too short (minimum {self.min_length} characters required)",
-                    processing_time_ms=(time.time() - start_time) * 1000,
+                    processing_time_ms=(time.perf_counter() - start_time) * 1000,
                     analysis_data={"error": "insufficient_length", "length": len(submission_text)},
                     model_used=self.model_name
                 )
             
             # Analyze submission components
-            analysis_results = self._perform_analysis(submission_text, subject)
+            scan = scan_submission(submission_text)
+            lap("scan")
+            analysis_results = self._perform_analysis(submission_text, subject, scan)
+            lap("analysis")
             
             # Calculate final score
             final_score = self._calculate_final_score(analysis_results)
             band = self._score_to_band(final_score)
             confidence = self._calculate_confidence(analysis_results, final_score)
+            lap("score")
             
             # Generate explanation
             reason = self._generate_explanation(analysis_results)
+            lap("explanation")
             
             return ScorePrediction(
                 score=round(final_score, 1),
                 band=band,
                 confidence=round(confidence, 2),
                 reason=reason,
-                processing_time_ms=(time.time() - start_time) * 1000,
+                processing_time_ms=(time.perf_counter() - start_time) * 1000,
                 analysis_data=analysis_results,
-                model_used=self.model_name
+                model_used=self.model_name,
+                stage_ms=stage_ms
             )
             
         except Exception as e:
             return ScorePrediction(
                 score=None, band=None, confidence=0.0,
                 reason=f"Scoring error: {str(e)}",
-                processing_time_ms=(time.time() - start_time) * 1000,
+                processing_time_ms=(time.perf_counter() - start_time) * 1000,
                 analysis_data={"error": str(e)},
-                model_used=self.model_name
+                model_used=self.model_name,
+                stage_ms=stage_ms
             )
     
-    def _perform_analysis(self, text: str, subject: str) -> Dict[str, Any]:
+    def create_ai_score_record(self, db, submission_id: int, result: ScorePrediction):
+        """
+        Store a prediction as a new AI_Score row for the submission and return
+        it. The time this takes is added to result.stage_ms as "persist".
+        """
+        from models import AI_Score
+
+        started = time.perf_counter()
+        ai_score = AI_Score(
+            homework_submission_id=submission_id,
+            predicted_score=None if result.score is None else round(result.score),
+            predicted_band=result.band,
+            prediction_explainer=result.reason,
+            prediction_model_version=result.model_used,
+            predicted_at=datetime.now(timezone.utc),
+            confidence_level=result.confidence,
+            model_used=result.model_used,
+            analysis_data=json.dumps(result.analysis_data),
+        )
+        db.add(ai_score)
+        db.commit()
+        db.refresh(ai_score)
+        result.stage_ms["persist"] = (time.perf_counter() - started) * 1000
+        self.stage_latency.observe({"persist": result.stage_ms["persist"]})
+        return ai_score
+    
+    def score_many(self, texts: List[str], subject: str = "mathematics", pool=None) -> List[ScorePrediction]:
+        """
+        score_submission for every text, in order. The texts are split into
+        chunks across the batch scoring process pool (one worker per core
+        by default); small batches are scored inline. Stage latencies of
+        texts scored by the workers are recorded here, in this process.
+        """
+        from services.scoring_pool import score_batch_pool
+
+        pool = pool or score_batch_pool
+        texts = list(texts)
+        # About four chunks per worker, so a slow chunk doesn't leave the others idle
+        chunk_size = max(SCORE_BATCH_MIN_CHUNK, -(-len(texts) // (max(pool.processes, 1) * 4)))
+        if pool.processes <= 1 or len(texts) <= chunk_size:
+            return [self.score_submission(text, subject) for text in texts]
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        predictions = [result for part in pool.map(_score_chunk, chunks, [subject] * len(chunks)) for result in part]
+        for prediction in predictions:
+            self._observe(prediction)
+        return predictions
+
+    def _perform_analysis(self, text: str, subject: str, scan: Optional[SubmissionScan] = None) -> Dict[str, Any]:
         """Perform comprehensive analysis of submission"""
+        scan = scan or scan_submission(text)
         return {
             "length": len(text),
             "word_count": len(text.split()),
-            "content_quality": self._analyze_content_quality(text),
-            "mathematical_rigor": self._analyze_mathematical_content(text),
-            "structure_organization": self._analyze_structure(text),
-            "language_clarity": self._analyze_language(text),
-            "subject_relevance": self._analyze_subject_relevance(text, subject),
-            "completeness": self._analyze_completeness(text)
+            "content_quality": self._analyze_content_quality(text, scan),
+            "mathematical_rigor": self._analyze_mathematical_content(text, scan),
+            "structure_organization": self._analyze_structure(text, scan),
+            "language_clarity": self._analyze_language(text, scan),
+            "subject_relevance": self._analyze_subject_relevance(text, subject, scan),
+            "completeness": self._analyze_completeness(text, scan)
         }
     
-    def _analyze_content_quality(self, text: str) -> float:
+    def _analyze_content_quality(self, text: str, scan: SubmissionScan) -> float:
         """Analyze overall content quality"""
         score = 0.2  # Base score
         
@@ -202,24 +251,11 @@ class ScoringService:
             score += 0.1
         
         # Depth indicators (0.4 weight)
-        depth_indicators = [
-            r'(därför|therefore|således|hence|consequently)',
-            r'(eftersom|because|due to|på grund av)',
-            r'(exempelvis|till exempel|for example|such as)',
-            r'(kontroll|verification|check|verifi)',
-            r'(analys|analysis|undersök|investigate)',
-            r'(steg|step)',
-            r'(lösning|solution)',
-            r'(given|givet)',
-            r'(slutsats|conclusion)',
-            r'(identifiera|identify)',
-        ]
-        
-        found_indicators = sum(1 for pattern in depth_indicators if re.search(pattern, text, re.IGNORECASE))
+        found_indicators = scan.count(DEPTH_INDICATORS)
         score += min(0.4, found_indicators * 0.05)  # Reduced multiplier
         
         # Coherence (0.3 weight)
-        sentences = re.split(r'[.!?]+', text)
+        sentences = scan.sentences
         if len(sentences) > 5:  # Higher threshold
             avg_sentence_length = sum(len(s.split()) for s in sentences if s.strip()) / len(sentences)
             if 8 <= avg_sentence_length <= 25:
@@ -233,62 +269,31 @@ class ScoringService:
         
         return min(1.0, score)
     
-    def _analyze_mathematical_content(self, text: str) -> float:
+    def _analyze_mathematical_content(self, text: str, scan: SubmissionScan) -> float:
         """Analyze mathematical content and notation"""
         score = 0.1  # Lower base score
         
         # Mathematical symbols (0.4 weight)
-        math_symbols = [
-            r'[=≠<>≤≥≈]',
-            r'[+\-×÷*/^]',
-            r'∫|∑|∏|√|∆|∂',
-            r'[αβγδεθλμπσφψω]',
-            r'sin|cos|tan|log|ln|exp|lim',
-            r'\d+[\.,]\d+',
-            r'x\^?\d+|x²|x³|y²|y³',
-            r'\d+',
-            r'[xyz]',
-            r'→|⇒',
-        ]
-        
-        found_symbols = sum(1 for pattern in math_symbols if re.search(pattern, text, re.IGNORECASE))
+        found_symbols = scan.count(MATH_SYMBOLS)
         score += min(0.4, found_symbols * 0.02)  # Reduced multiplier
         
         # Mathematical structure (0.4 weight)
-        structure_patterns = [
-            r'(lösning|solution|svar|answer)',
-            r'(bevis|proof|visa|show)',
-            r'(given|givet|antag|assume)',
-            r'(därför|therefore|thus|så)',
-            r'(steg \d+|step \d+|\d+\))',
-            r'(ekvation|equation)',
-            r'(faktor|factor)',
-            r'(andragrad|quadratic)',
-            r'(standardform|standard form)',
-            r'(nollprodukt|zero product)',
-        ]
-        
-        found_structures = sum(1 for pattern in structure_patterns if re.search(pattern, text, re.IGNORECASE))
+        found_structures = scan.count(MATH_STRUCTURES)
         score += min(0.4, found_structures * 0.04)  # Reduced multiplier
         
         # Problem-solving approach (0.2 weight)
-        if re.search(r'(kontroll|check|verifi)', text, re.IGNORECASE):
-            score += 0.08
-        if re.search(r'(substitution|insättning|ersätt)', text, re.IGNORECASE):
-            score += 0.04
-        if re.search(r'(multipliceras|adderas|×|\+)', text, re.IGNORECASE):
-            score += 0.04
-        if re.search(r'(nollprodukt|zero product)', text, re.IGNORECASE):
-            score += 0.04
+        for indicator, weight in PROBLEM_SOLVING:
+            if scan.has(indicator):
+                score += weight
         
         return min(1.0, score)
     
-    def _analyze_structure(self, text: str) -> float:
+    def _analyze_structure(self, text: str, scan: SubmissionScan) -> float:
         """Analyze submission structure and organization"""
         score = 0.1  # Lower base score
         
         # Clear numbered steps (0.3 weight)
-        step_count = len(re.findall(r'(steg \d+|step \d+)', text, re.IGNORECASE))
+        step_count = scan.step_count
         if step_count >= 4:
             score += 0.3
         elif step_count >= 2:
@@ -297,13 +302,12 @@ class ScoringService:
             score += 0.1
         
         # Clear sections (0.2 weight)
-        if re.search(r'(a\)|b\)|c\)|d\))', text):
-            score += 0.1
-        if re.search(r'(1\.|2\.|3\.|4\.)', text):
-            score += 0.1
+        for indicator in SECTIONS:
+            if scan.has(indicator):
+                score += 0.1
         
         # Mathematical steps shown (0.3 weight)
-        equation_count = len(re.findall(r'=', text))
+        equation_count = text.count('=')
         if equation_count >= 5:
             score += 0.3
         elif equation_count >= 3:
@@ -320,25 +324,24 @@ class ScoringService:
         
         return min(1.0, score)
     
-    def _analyze_language(self, text: str) -> float:
+    def _analyze_language(self, text: str, scan: SubmissionScan) -> float:
         """Analyze language clarity and correctness"""
         score = 0.5  # Base score
         
         # Spelling and grammar indicators
-        if len(re.findall(r'\b\w+\b', text)) > 20:  # Sufficient content
+        if scan.has_many_words:  # Sufficient content
             score += 0.2
         
         # Proper punctuation
-        if re.search(r'[.!?]', text):
+        if scan.has(("PUNCTUATION",)):
             score += 0.15
         
         # Technical vocabulary
-        tech_terms = r'(ekvation|funktion|derivata|integral|gränsvärde|asymptot|koefficient)'
-        if re.search(tech_terms, text, re.IGNORECASE):
+        if scan.has(TECH_TERMS):
             score += 0.15
         
         # Avoid excessive informal language
-        informal_count = len(re.findall(r'\b(typ|liksom|asså|kanske)\b', text, re.IGNORECASE))
+        informal_count = scan.informal_count
         if informal_count == 0:
             score += 0.1
         elif informal_count > 3:
@@ -346,37 +349,25 @@ class ScoringService:
         
         return min(1.0, max(0.0, score))
     
-    def _analyze_subject_relevance(self, text: str, subject: str) -> float:
+    def _analyze_subject_relevance(self, text: str, subject: str, scan: SubmissionScan) -> float:
         """Analyze relevance to subject matter"""
         if subject.lower() == "mathematics":
-            math_topics = [
-                r'(algebra|geometri|trigonometri|kalkyl|statistik)',
-                r'(ekvation|funktion|graf|koordinat)',
-                r'(sannolikhet|frekvens|medelvärde)',
-                r'(derivata|integral|gränsvärde)',
-                r'(vektor|matris|determinant)',
-                r'(andragrad|kvadrat|faktor)',  # Added for quadratic equations
-                r'(\d+.*[×\*].*\d+|\d+.*\+.*\d+)',  # Mathematical operations
-                r'(lösning|solution|svar)',  # Solution indicators
-                r'(multipliceras|adderas)',  # Mathematical terminology
-            ]
-            
-            found_topics = sum(1 for pattern in math_topics if re.search(pattern, text, re.IGNORECASE))
+            found_topics = scan.count(MATH_TOPICS)
             base_score = 0.5  # Higher base score
             return min(1.0, base_score + found_topics * 0.15)  # More generous
         
         return 0.5  # Default for unknown subjects
     
-    def _analyze_completeness(self, text: str) -> float:
+    def _analyze_completeness(self, text: str, scan: SubmissionScan) -> float:
         """Analyze if submission appears complete"""
         score = 0.0
         
         # Has conclusion or final answer
-        if re.search(r'(svar|answer|slutsats|conclusion|resultat|result):', text, re.IGNORECASE):
+        if scan.has(CONCLUSION):
             score += 0.4
         
         # Shows work/process
-        if re.search(r'(=|→|⇒|därför|så)', text):
+        if scan.has(SHOWS_WORK):
             score += 0.3
         
         # Reasonable length for completeness
@@ -558,6 +549,13 @@ class FeedbackService:
             "feedback_text": feedback_text,
             "resources": resources
         }
+
+
+def _score_chunk(texts: List[str], subject: str) -> List[ScorePrediction]:
+    """Batch scoring worker: one chunk of ScoringService.score_many. The caller records the stage laps."""
+    return [scoring_service._score(text, subject) for text in texts]
+
+
 # Global instance
 inference_service = InferenceService()
 feedback_service = FeedbackService()
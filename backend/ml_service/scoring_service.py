@@ -9,13 +9,8 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 from models import AI_Score
 
-# Load model and encoders once at startup
-MODEL_DIR = Path(__file__).resolve().parent.parent / "model"
-
-# Load the trained model and encoders
-model = joblib.load(MODEL_DIR / "trained_grade_model.pkl")
-topic_encoder = joblib.load(MODEL_DIR / "topic_encoder.pkl")
-grade_encoder = joblib.load(MODEL_DIR / "grade_encoder.pkl")
+# Model and encoders come from the shared registry (services/model_registry.py)
+# when needed; nothing is loaded at import time
 
 # Define the order of features expected by the model
 FEATURE_ORDER = [
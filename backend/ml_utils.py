@@ -10,10 +10,13 @@ from fastapi import Depends, HTTPException
 from sqlalchemy.orm.exc import NoResultFound
 from models import Homework, Homework_Submission, Student_Homework
 # --- ML PREDICTION UTILITIES ---
-import joblib
-import pandas as pd
+# pandas, xgboost and scikit-learn are imported where used, not at import time
 import numpy as np
 import os
+import threading
+from services.inference_backends import XGBoostBackend
+from services.inference_dispatcher import InferenceDispatcher
+from services.model_registry import model_registry
 def extract_topic_from_description(description: str) -> str:
     """
     Analyzes description and returns the topic (ämne) based on weighted keywords.
@@ -594,18 +597,62 @@ def calculate_rubric_points_v2(
 
     return rubric_points    
 
+def calculate_submission_features(submission_text: str, homework_description: str, topic: str, difficulty: int) -> dict:
+    """
+    Builds the model feature dict by calling each calculate_* function separately.
+    Reference implementation for feature_extractor.FeatureExtractor, which
+    returns the same values in a single pass.
+    """
+    steps_count = calculate_steps_count(submission_text)
+    expected_steps = estimate_expected_steps(topic, difficulty)
+    method_appropriateness = calculate_method_appropriateness(submission_text, homework_description)
+    explanation_clarity = calculate_explanation_clarity(submission_text)
+    units_handling = calculate_units_handling(submission_text)
+    computational_errors = calculate_computational_errors(submission_text)
+    external_aid_suspected_score = calculate_external_aid_suspected(submission_text)
+
+    return {
+        "topic": topic,
+        "difficulty_1to5": difficulty,
+        "steps_count": steps_count,
+        "steps_completeness": round(min(steps_count / expected_steps, 1.0), 2),
+        "reasoning_quality": calculate_reasoning_quality(submission_text),
+        "method_appropriateness": method_appropriateness,
+        "representation_use": calculate_representation_use(submission_text),
+        "explanation_clarity": explanation_clarity,
+        "units_handling": units_handling,
+        "language_quality": calculate_language_quality(submission_text),
+        "computational_errors": computational_errors,
+        "conceptual_errors": calculate_conceptual_errors(submission_text),
+        "correctness_pct": calculate_correctness_pct(submission_text, expected_answer=""),
+        "originality_score": round(1.0 - external_aid_suspected_score, 2),
+        "rubric_points": calculate_rubric_points_v2(
+            method_appropriateness, computational_errors, explanation_clarity, units_handling
+        ),
+    }
+
 # Model directory (adjust if needed)
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "model")
+# Stored on AI_Score.prediction_model_version and part of cache keys
+GRADE_MODEL_VERSION = "EduMate_RF_v1"
+TEACHER_FEEDBACK_MODEL_VERSION = "EduMate_TeacherFeedback_v2"
+
+# Model and encoders are shared through the model registry and loaded on
+# first access, e.g. `ml_utils.model` or `from ml_utils import model`
+_REGISTRY_ATTRIBUTES = {
+    "model": "grade_model",
+    "topic_encoder": "topic_encoder",
+    "grade_encoder": "grade_encoder",
+    "feature_order": "feature_order",
+}
+
 
-# Load pre-trained model and encoders
-try:
-    model = joblib.load(os.path.join(MODEL_DIR, "trained_model.pkl"))
-    topic_encoder = joblib.load(os.path.join(MODEL_DIR, "topic_encoder.pkl"))
-    grade_encoder = joblib.load(os.path.join(MODEL_DIR, "grade_encoder.pkl"))
-    feature_order = joblib.load(os.path.join(MODEL_DIR, "feature_order.pkl"))
-    print("✅ ML model and encoders loaded successfully.")
-except Exception as e:
-    print(f"⚠️ Warning: Could not load model or encoders: {e}")
+def __getattr__(name):
+    if name in _REGISTRY_ATTRIBUTES:
+        return model_registry.get(_REGISTRY_ATTRIBUTES[name])
+    if name == "grade_predictor":
+        return get_grade_predictor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def predict_grade(model, feature_order, grade_encoder, topic_encoder, scoring):
@@ -622,6 +669,8 @@ def predict_grade(model, feature_order, grade_encoder, topic_encoder, scoring):
     Returns:
         str: Predicted grade (A–F)
     """
+    import pandas as pd
+
     try:
         # --- 1️⃣ Ensure all expected features exist ---
         scoring = {f: scoring.get(f, 0) for f in feature_order}
@@ -654,9 +703,158 @@ def predict_grade(model, feature_order, grade_encoder, topic_encoder, scoring):
         return "N/A"  # return fallback if prediction fails
 
 
+def _to_float(value) -> float:
+    """Numeric cast used for model input; anything unparsable becomes 0 (like pd.to_numeric + fillna)."""
+    if value is None:
+        return 0.0
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if value != value else value
+
+
+class GradePredictor:
+    """
+    predict_grade without pandas: built once from the model and encoders,
+    it writes a feature dict straight into a preallocated float32 row
+    (one per thread) and runs it through an inference backend (the
+    XGBoost booster unless another one is given, see
+    services/inference_backends.py). Same grades as predict_grade.
+
+    Single-row calls go through an InferenceDispatcher, so rows from
+    concurrent requests share one booster call. With a PredictionCache,
+    rows this model has already seen skip the booster altogether; cache_id
+    must be unique per loaded model.
+    """
+
+    def __init__(self, model, feature_order, grade_encoder, topic_encoder, dispatcher=None,
+                 cache=None, cache_id=None, backend=None):
+        self.model = model
+        self.feature_order = list(feature_order)
+        self.column_index = {name: j for j, name in enumerate(self.feature_order)}
+        self.topic_index = self.column_index.get("topic")
+        self.topic_codes = {topic: code for code, topic in enumerate(topic_encoder.classes_)}
+        self.grades = list(grade_encoder.classes_)
+        self.classes = [int(c) for c in getattr(model, "classes_", range(len(self.grades)))]
+        self._local = threading.local()
+
+        self.backend = backend or XGBoostBackend(model)
+
+        self.dispatcher = dispatcher or InferenceDispatcher(self.predict_proba_batch, name="grade")
+        self.cache = cache if cache_id is not None else None
+        self.cache_id = cache_id
+
+    def _row(self) -> np.ndarray:
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = np.zeros((1, len(self.feature_order)), dtype=np.float32)
+        return row
+
+    def encode(self, features: dict) -> np.ndarray:
+        """Fill and return this thread's input row; missing features are 0."""
+        row = self._row()
+        values = row[0]
+        values[:] = 0.0
+        for name, value in features.items():
+            j = self.column_index.get(name)
+            if j is None:
+                continue
+            if j == self.topic_index and isinstance(value, str):
+                value = self.topic_codes.get(value, -1)  # Unknown topic → safe fallback
+            values[j] = _to_float(value)
+        return row
+
+    def encode_columns(self, columns: dict, n_rows: int) -> np.ndarray:
+        """
+        Vectorized encode() for a batch given column-wise: one list or array
+        of n_rows values per feature name. Missing columns are 0.
+        """
+        X = np.zeros((n_rows, len(self.feature_order)), dtype=np.float32)
+        for name, values in columns.items():
+            j = self.column_index.get(name)
+            if j is None:
+                continue
+            if j == self.topic_index:
+                values = [self.topic_codes.get(v, -1) if isinstance(v, str) else _to_float(v) for v in values]
+            try:
+                column = np.asarray(values, dtype=np.float32)
+            except (TypeError, ValueError):
+                column = np.array([_to_float(v) for v in values], dtype=np.float32)
+            X[:, j] = np.where(np.isnan(column), 0.0, column)
+        return X
+
+    def predict_proba_batch(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for an encoded (n, n_features) matrix, one model call."""
+        return self.backend.predict_proba(X)
+
+    def predict_proba_many(self, X: np.ndarray) -> np.ndarray:
+        """predict_proba_batch that only sends rows missing from the cache to the model."""
+        if self.cache is None or not len(X):
+            return self.predict_proba_batch(X)
+        keys = [self.cache.make_key(self.cache_id, row) for row in X]
+        cached = [self.cache.get(key) for key in keys]
+        missing = [i for i, value in enumerate(cached) if value is None]
+        if missing:
+            computed = self.predict_proba_batch(X[missing])
+            for i, value in zip(missing, computed):
+                cached[i] = self.cache.put(keys[i], value)
+        return np.stack(cached)
+
+    def predict_proba(self, features: dict) -> np.ndarray:
+        """Class probabilities for one feature dict (cached, else micro-batched with concurrent callers)."""
+        row = self.encode(features)[0]
+        if self.cache is None:
+            # The caller waits for the result, so its row buffer stays untouched until then
+            return self.dispatcher.predict(row)
+        key = self.cache.make_key(self.cache_id, row)
+        proba = self.cache.get(key)
+        if proba is None:
+            proba = self.cache.put(key, self.dispatcher.predict(row))
+        return proba
+
+    def predict(self, features: dict) -> str:
+        try:
+            return self.grades[int(np.argmax(self.predict_proba(features)))]
+        except Exception as e:
+            print(f"❌ [GradePredictor] Error: {e}")
+            return "N/A"
+
+    def predict_many(self, rows: List[dict]) -> List[str]:
+        """Grades for many feature dicts: one encode and one model call for the rows not in the cache."""
+        if not rows:
+            return []
+        columns = {name: [row.get(name, 0) for row in rows] for name in self.feature_order}
+        proba = self.predict_proba_many(self.encode_columns(columns, len(rows)))
+        return [self.grades[i] for i in np.argmax(proba, axis=1)]
+
+
+def get_grade_predictor() -> GradePredictor:
+    """GradePredictor of the active grade model version (see services/model_versions.py)."""
+    from services.model_versions import grade_models
+
+    return grade_models.current().predictor
+
+
+FEEDBACK_MAX_DISTANCE = 0.6
+FEEDBACK_FALLBACK = "Bra försök! Försök förklara varje steg tydligare och kontrollera beräkningarna noga."
+
+
+def _teacher_comment(teacher_comments, nearest: int, distance: float) -> str:
+    # If similarity is poor (>0.6 cosine distance), give a generic fallback
+    if distance > FEEDBACK_MAX_DISTANCE:
+        return FEEDBACK_FALLBACK
+    if hasattr(teacher_comments, "iloc"):
+        return teacher_comments.iloc[nearest]
+    return teacher_comments[nearest]
+
+
 def generate_teacher_feedback(feedback_model, feedback_vectorizer, teacher_comments, new_text):
     """
     Find the most similar teacher comment from training data given a new text.
+    feedback_model is the sklearn NearestNeighbors model or a FeedbackIndex.
+    teacher_comments can be a pandas Series or anything indexable by row
+    position, e.g. the shared FeedbackCorpus.
     Returns: The most relevant feedback (string)
     """
     if feedback_model is None or feedback_vectorizer is None:
@@ -667,9 +865,17 @@ def generate_teacher_feedback(feedback_model, feedback_vectorizer, teacher_comme
 
     # Find nearest neighbor (most similar existing feedback)
     distance, index = feedback_model.kneighbors(X_new)
-    feedback = teacher_comments.iloc[index[0][0]]
-
-    # If similarity is poor (>0.6 cosine distance), give a generic fallback
-    if distance[0][0] > 0.6:
-        return "Bra försök! Försök förklara varje steg tydligare och kontrollera beräkningarna noga."
-    return feedback
\ No newline at end of file
+    return _teacher_comment(teacher_comments, int(index[0][0]), distance[0][0])
+
+
+def generate_teacher_feedback_batch(feedback_index, feedback_vectorizer, teacher_comments, texts) -> List[str]:
+    """generate_teacher_feedback for many texts: one transform and one FeedbackIndex search."""
+    if feedback_index is None or feedback_vectorizer is None:
+        return ["Ingen feedbackmodell tillgänglig."] * len(texts)
+    if not len(texts):
+        return []
+    distances, indices = feedback_index.search(feedback_vectorizer.transform(texts), k=1)
+    return [
+        _teacher_comment(teacher_comments, int(nearest), distance)
+        for nearest, distance in zip(indices[:, 0], distances[:, 0])
+    ]
\ No newline at end of file
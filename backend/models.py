@@ -1,5 +1,5 @@
 from datetime import datetime,timezone
-from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Date, Table, Text, UniqueConstraint, Numeric, Boolean
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Date, Table, Text, UniqueConstraint, Numeric, Boolean, Float
 from sqlalchemy.orm import relationship
 from db_setup import Base
 
@@ -297,6 +297,7 @@ class Homework_Submission(Base):
     ai_feedback = relationship("AI_Feedback", back_populates="homework_submission", cascade="all, delete-orphan")
     #scoring_criteria relation
     scoring_criteria = relationship("Scoring_Criteria", back_populates="homework_submission", cascade="all, delete-orphan")
+    features = relationship("Submission_Feature", back_populates="homework_submission", cascade="all, delete-orphan")
     __table_args__ = (
         UniqueConstraint("student_homework_id", name="uq_homework_submission_student_homework"),
     )
@@ -378,6 +379,38 @@ class AI_Score(Base):
     # Relationships
     homework_submission = relationship("Homework_Submission", back_populates="ai_scores")
 
+class Submission_Feature(Base):
+    """One row of model input features per submission and grade model version."""
+    __tablename__ = "submission_features"
+
+    id = Column(Integer, primary_key=True, index=True)
+    homework_submission_id = Column(Integer, ForeignKey("homework_submission.id", ondelete="CASCADE"), nullable=False)
+    model_version = Column(String(32), nullable=False, index=True)
+
+    topic = Column(String, nullable=True)
+    difficulty_1to5 = Column(Float, nullable=True)
+    steps_count = Column(Float, nullable=True)
+    steps_completeness = Column(Float, nullable=True)
+    reasoning_quality = Column(Float, nullable=True)
+    method_appropriateness = Column(Float, nullable=True)
+    representation_use = Column(Float, nullable=True)
+    explanation_clarity = Column(Float, nullable=True)
+    units_handling = Column(Float, nullable=True)
+    language_quality = Column(Float, nullable=True)
+    computational_errors = Column(Float, nullable=True)
+    conceptual_errors = Column(Float, nullable=True)
+    correctness_pct = Column(Float, nullable=True)
+    originality_score = Column(Float, nullable=True)
+    rubric_points = Column(Float, nullable=True)
+
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Relationships
+    homework_submission = relationship("Homework_Submission", back_populates="features")
+    __table_args__ = (
+        UniqueConstraint("homework_submission_id", "model_version", name="uq_submission_features_submission_version"),
+    )
+
 class AI_Feedback(Base):
     __tablename__ = "ai_feedback"
     
@@ -440,4 +473,38 @@ class AI_Model_Metrics(Base):
     teacher_overrides = Column(Integer, default=0)
     last_trained = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class Shadow_Metric(Base):
+    """One shadow evaluation window (services/shadow.py) per model: agreement and latency."""
+    __tablename__ = "shadow_metrics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    model_name = Column(String(100), nullable=False)
+    evaluation = Column(String(20), nullable=False)  # "primary" or "shadow"
+    compared_to = Column(String(100), nullable=True)  # the other model in the comparison
+    total_predictions = Column(Integer, default=0)
+    agreement_rate = Column(Numeric(5, 4), nullable=True)
+    latency_p50_ms = Column(Float, nullable=True)
+    latency_p95_ms = Column(Float, nullable=True)
+    latency_p99_ms = Column(Float, nullable=True)
+    window_started_at = Column(DateTime, nullable=True)
+    details = Column(Text, nullable=True)  # JSON: prediction pairs, dropped observations
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class Scoring_Job(Base):
+    """Status of a background scoring job (services/scoring_jobs.py), readable from any worker process."""
+    __tablename__ = "scoring_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    kind = Column(String(20), nullable=False, default="submission")  # submission or rescore
+    homework_submission_id = Column(Integer, ForeignKey("homework_submission.id", ondelete="CASCADE"), nullable=True, index=True)  # None for rescore jobs
+    user_id = Column(Integer, nullable=True)
+    status = Column(String(20), nullable=False)  # queued, running, completed, failed
+    stage = Column(String(32), nullable=False)
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # refreshed while the job's process is alive
@@ -0,0 +1,44 @@
+"""
+Re-score existing homework submissions with the active grade model version.
+
+Examples (run from backend/):
+    python rescore.py --homework-id 12
+    python rescore.py --class-level-id 3 --date-from 2025-09-01 --date-to 2025-12-31
+"""
+import argparse
+from datetime import datetime
+
+from db_setup import SessionLocal
+from services.rescoring import DEFAULT_CHUNK_SIZE, rescore_submissions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score homework submissions in bulk")
+    parser.add_argument("--homework-id", type=int)
+    parser.add_argument("--class-level-id", type=int)
+    parser.add_argument("--date-from", type=datetime.fromisoformat)
+    parser.add_argument("--date-to", type=datetime.fromisoformat)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = rescore_submissions(
+            db,
+            homework_id=args.homework_id,
+            class_level_id=args.class_level_id,
+            date_from=args.date_from,
+            date_to=args.date_to,
+            chunk_size=args.chunk_size,
+        )
+    finally:
+        db.close()
+
+    print(
+        f"✅ Re-scored {report['rows']} submissions with {report['model_version']} in {report['chunks']} chunks "
+        f"({report['seconds']} s, {report['rows_per_second']} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
-from fastapi import APIRouter
-from pydantic import BaseModel, Field
-from . import typing as _  # optional to silence linters
-from ..services.inference import predict_one
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+from services.inference import predict_columns, predict_one
 
 router = APIRouter(prefix="/predict", tags=["predict"])
 
+# Largest number of rows POST /predict/batch accepts in one request
+PREDICT_BATCH_MAX_ROWS = int(os.getenv("PREDICT_BATCH_MAX_ROWS", "10000"))
+ARROW_CONTENT_TYPES = ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file")
+
 class Features(BaseModel):
     topic: str = Field(..., description="Algebra, Geometri, Ekvationer, Procent, Statistik & Sannolikhet, Funktioner, Problemlösning")
     difficulty_1to5: int
@@ -25,7 +35,183 @@ class Features(BaseModel):
     originality_score: float
     rubric_points: float
 
+_FIELD_ADAPTERS = {name: TypeAdapter(field.annotation) for name, field in Features.model_fields.items()}
+
+
+def _row_errors(e: ValidationError, column: str = None) -> List[Dict[str, Any]]:
+    return [
+        {"loc": [column] if column else list(error["loc"]), "msg": error["msg"], "type": error["type"]}
+        for error in e.errors()
+    ]
+
+
+def _columns_from_rows(rows: list) -> Tuple[Dict[str, list], List[int], Dict[int, list]]:
+    """Validate each row with Features; valid rows are transposed into columns."""
+    columns: Dict[str, list] = {name: [] for name in Features.model_fields}
+    valid, errors = [], {}
+    for i, row in enumerate(rows):
+        try:
+            item = Features.model_validate(row)
+        except ValidationError as e:
+            errors[i] = _row_errors(e)
+            continue
+        valid.append(i)
+        for name in columns:
+            columns[name].append(getattr(item, name))
+    return columns, valid, errors
+
+
+def _validate_columns(columns: Dict[str, Any]) -> Tuple[Dict[str, Any], List[int], Dict[int, list]]:
+    """
+    Validate a columnar batch column by column. Numeric columns that convert
+    cleanly are checked in one NumPy pass; only columns with bad values
+    fall back to validating value by value. Returns the valid rows' columns.
+    """
+    missing = [name for name in Features.model_fields if name not in columns]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing columns: {', '.join(missing)}")
+    lengths = {len(columns[name]) for name in Features.model_fields}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=422, detail="All columns must have the same number of values")
+    n_rows = lengths.pop()
+    _check_size(n_rows)
+
+    errors: Dict[int, list] = {}
+    checked: Dict[str, Any] = {}
+
+    def check_each(name, values):
+        adapter, out = _FIELD_ADAPTERS[name], []
+        for i, value in enumerate(values):
+            try:
+                out.append(adapter.validate_python(value))
+            except ValidationError as e:
+                errors.setdefault(i, []).extend(_row_errors(e, name))
+                out.append(None)
+        return out
+
+    for name, field in Features.model_fields.items():
+        values = columns[name]
+        if field.annotation is str:
+            checked[name] = check_each(name, values)
+            continue
+        try:
+            column = np.asarray(values, dtype=np.float64)
+            if column.ndim != 1 or np.isnan(column).any():
+                raise ValueError(name)
+            if field.annotation is int and not np.array_equal(column, np.round(column)):
+                raise ValueError(name)
+            checked[name] = column
+        except (TypeError, ValueError):
+            checked[name] = check_each(name, list(values))
+
+    valid = [i for i in range(n_rows) if i not in errors]
+    if errors:
+        index = np.array(valid, dtype=np.intp)
+        checked = {
+            name: values[index] if isinstance(values, np.ndarray) else [values[i] for i in valid]
+            for name, values in checked.items()
+        }
+    return checked, valid, errors
+
+
+def _arrow_columns(body: bytes) -> Dict[str, Any]:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=415, detail="Arrow input needs pyarrow installed on the server")
+    try:
+        try:
+            table = pa.ipc.open_stream(body).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_file(pa.BufferReader(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Arrow body: {e}")
+
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if column.null_count or not (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            columns[name] = column.to_pylist()  # nulls and strings are validated value by value
+        else:
+            columns[name] = column.to_numpy()
+    return columns
+
+
+def _check_size(n_rows: int):
+    if n_rows > PREDICT_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {PREDICT_BATCH_MAX_ROWS} rows per batch")
+
+
+def _predict_batch(columns: Dict[str, Any], valid: List[int], errors: Dict[int, list]) -> Dict[str, Any]:
+    model_version, classes, proba = predict_columns(columns, len(valid))
+    predictions = proba.argmax(axis=1) if len(valid) else []
+    results: List[Dict[str, Any]] = [None] * (len(valid) + len(errors))
+    for k, i in enumerate(valid):
+        results[i] = {
+            "index": i,
+            "prediction": classes[int(predictions[k])],
+            "probabilities": {cls: float(p) for cls, p in zip(classes, proba[k].tolist())},
+        }
+    for i, row_errors in errors.items():
+        results[i] = {"index": i, "errors": row_errors}
+    return {
+        "model_version": model_version,
+        "rows": len(results),
+        "predicted": len(valid),
+        "failed": len(errors),
+        "results": results,
+    }
+
+
 @router.post("")
 def post_predict(item: Features):
     pred, probs = predict_one(item.dict())
-    return {"prediction": pred, "probabilities": probs}
\ No newline at end of file
+    return {"prediction": pred, "probabilities": probs}
+
+
+@router.post(
+    "/batch",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "oneOf": [
+                            {"type": "array", "items": Features.model_json_schema()},
+                            {"type": "object", "description": "Columnar: one array per feature name"},
+                        ]
+                    }
+                },
+                ARROW_CONTENT_TYPES[0]: {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def post_predict_batch(request: Request):
+    """
+    Predict many rows with one encode and one model call. The body is a
+    JSON list of Features rows, a columnar JSON object ({feature: [values]})
+    or an Arrow IPC stream/file with one column per feature. Results come
+    back in input order; invalid rows carry their validation errors instead
+    of a prediction and don't fail the rest of the batch.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in ARROW_CONTENT_TYPES:
+        columns = _arrow_columns(body)
+        return await run_in_threadpool(lambda: _predict_batch(*_validate_columns(columns)))
+
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    if isinstance(payload, list):
+        _check_size(len(payload))
+        return await run_in_threadpool(lambda: _predict_batch(*_columns_from_rows(payload)))
+    if isinstance(payload, dict):
+        if not all(isinstance(values, list) for values in payload.values()):
+            raise HTTPException(status_code=422, detail="Columnar body must map each feature to a list of values")
+        return await run_in_threadpool(lambda: _predict_batch(*_validate_columns(payload)))
+    raise HTTPException(status_code=422, detail="Body must be a list of rows or an object of columns")
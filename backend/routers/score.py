@@ -0,0 +1,98 @@
+import os
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from auth import get_current_user
+from db_setup import get_db
+from ml_service import scoring_service
+from models import Homework_Submission, User
+from schemas import ScoreRequest, ScoreResponse
+
+router = APIRouter(prefix="/ml/score", tags=["ml"])
+
+# Largest number of texts POST /ml/score/batch accepts in one request
+SCORE_BATCH_MAX_TEXTS = int(os.getenv("SCORE_BATCH_MAX_TEXTS", "1000"))
+
+
+class ScoreBatchRequest(BaseModel):
+    texts: List[str] = Field(..., description="Submission texts to score")
+    subject: str = Field("mathematics", description="Subject area for scoring context")
+
+
+@router.post("", response_model=ScoreResponse)
+def post_score(request: ScoreRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Score one text with the long-lived, warmed-up ScoringService. Without
+    text, the submission's own text is scored. With a submission_id (which
+    must exist) the prediction is stored as a new AI_Score row.
+    processing_time_ms is the whole request; stage_times_ms is what each
+    scoring stage took. Teachers and admins only.
+    """
+    if current_user.role.name not in ["Teacher", "Admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized to score")
+    started = time.perf_counter()
+    text = request.text
+    if request.submission_id is not None:
+        submission = db.query(Homework_Submission).filter(Homework_Submission.id == request.submission_id).first()
+        if not submission:
+            raise HTTPException(status_code=404, detail="Submission not found")
+        if text is None:
+            text = submission.submission_text or ""
+    if text is None:
+        raise HTTPException(status_code=422, detail="Provide text or submission_id")
+
+    result = scoring_service.score_submission(text, request.subject or "mathematics")
+    timestamp = datetime.now(timezone.utc)
+    if request.submission_id is not None:
+        timestamp = scoring_service.create_ai_score_record(db, request.submission_id, result).predicted_at
+
+    return ScoreResponse(
+        submission_id=request.submission_id,
+        predicted_score=result.score,
+        predicted_band=result.band,
+        confidence=result.confidence,
+        reason=result.reason,
+        processing_time_ms=(time.perf_counter() - started) * 1000,
+        stage_times_ms=result.stage_ms,
+        timestamp=timestamp,
+        model_used=result.model_used,
+    )
+
+
+@router.post("/batch")
+def post_score_batch(request: ScoreBatchRequest, current_user: User = Depends(get_current_user)):
+    """
+    Score many texts with the heuristic ScoringService, spread over the
+    batch scoring process pool. Results come back in input order; texts
+    that can't be scored (too short) carry a null score and the reason.
+    Nothing is stored. Teachers and admins only.
+    """
+    if current_user.role.name not in ["Teacher", "Admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized to batch score")
+    if len(request.texts) > SCORE_BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=413, detail=f"At most {SCORE_BATCH_MAX_TEXTS} texts per batch")
+    started = time.perf_counter()
+    predictions = scoring_service.score_many(request.texts, request.subject)
+    results = [
+        {
+            "index": i,
+            "predicted_score": p.score,
+            "predicted_band": p.band,
+            "confidence": p.confidence,
+            "reason": p.reason,
+            "processing_time_ms": p.processing_time_ms,
+            "model_used": p.model_used,
+        }
+        for i, p in enumerate(predictions)
+    ]
+    return {
+        "texts": len(results),
+        "scored": sum(1 for p in predictions if p.score is not None),
+        "processing_time_ms": (time.perf_counter() - started) * 1000,
+        "results": results,
+    }
@@ -297,6 +297,7 @@ class HomeworkSubmissionResponse(BaseModel):
     is_late: str
     teacher_feedback: Optional[str] = None
     grade_value: Optional[str] = None
+    scoring_job_id: Optional[str] = None  # Set when scoring runs in the background
     
     class Config:
         from_attributes = True
@@ -492,9 +493,21 @@ class ScoreResponse(BaseModel):
     confidence: float = Field(description="Confidence level 0-1")
     reason: str = Field(description="Explanation of prediction or why no prediction")
     processing_time_ms: float = Field(description="Processing time in milliseconds")
+    stage_times_ms: Dict[str, float] = Field(default_factory=dict, description="Measured milliseconds per scoring stage")
     timestamp: datetime = Field(description="When prediction was made")
     model_used: Optional[str] = Field(description="AI model used for prediction")
 
+class RescoreRequest(BaseModel):
+    homework_id: Optional[int] = Field(None, description="Only submissions for this homework")
+    class_level_id: Optional[int] = Field(None, description="Only homework for this class level")
+    date_from: Optional[datetime] = Field(None, description="Submitted at or after")
+    date_to: Optional[datetime] = Field(None, description="Submitted at or before")
+    chunk_size: int = Field(500, ge=1, le=10000, description="Rows per DB chunk / model call")
+
+class ModelLoadRequest(BaseModel):
+    version: str = Field(..., min_length=1, max_length=32, description="Label recorded in AI_Score.prediction_model_version")
+    model_file: str = Field(..., description="Grade model file in model/, e.g. trained_model.json or trained_grade_model.pkl")
+
 class AIScoreCreate(BaseModel):
     homework_submission_id: int
     predicted_score: Optional[Decimal]
@@ -0,0 +1,134 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import Submission_Feature
+
+# Numeric columns of Submission_Feature, in FeatureExtractor output order
+FEATURE_COLUMNS = (
+    "difficulty_1to5",
+    "steps_count",
+    "steps_completeness",
+    "reasoning_quality",
+    "method_appropriateness",
+    "representation_use",
+    "explanation_clarity",
+    "units_handling",
+    "language_quality",
+    "computational_errors",
+    "conceptual_errors",
+    "correctness_pct",
+    "originality_score",
+    "rubric_points",
+)
+
+EXPORT_CHUNK_SIZE = 50_000
+
+
+def feature_row(homework_submission_id: int, model_version: str, features: Dict[str, object]) -> dict:
+    """Submission_Feature values for a FeatureExtractor feature dict."""
+    row = {
+        "homework_submission_id": homework_submission_id,
+        "model_version": model_version,
+        "topic": features.get("topic"),
+    }
+    for name in FEATURE_COLUMNS:
+        value = features.get(name)
+        row[name] = float(value) if value is not None else None
+    return row
+
+
+def save_features(db: Session, rows: List[dict]):
+    """
+    Insert or overwrite feature rows, one per (submission, model version).
+    Runs in the caller's transaction; the caller commits.
+    """
+    if not rows:
+        return
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(Submission_Feature)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Submission_Feature.homework_submission_id, Submission_Feature.model_version],
+        set_={key: stmt.excluded[key] for key in ("topic", *FEATURE_COLUMNS)},
+    )
+    db.execute(stmt, rows)
+
+
+def _export_chunks(
+    db: Session,
+    model_version: Optional[str],
+    columns: Sequence[str],
+    chunk_size: int,
+) -> Iterable[list]:
+    stmt = select(
+        Submission_Feature.homework_submission_id,
+        Submission_Feature.model_version,
+        Submission_Feature.topic,
+        *[getattr(Submission_Feature, name) for name in columns],
+    ).order_by(Submission_Feature.id)
+    if model_version is not None:
+        stmt = stmt.where(Submission_Feature.model_version == model_version)
+    result = db.execute(stmt.execution_options(yield_per=chunk_size))
+    for chunk in result.partitions():
+        yield chunk
+
+
+def export_numpy(
+    db: Session,
+    model_version: Optional[str] = None,
+    columns: Sequence[str] = FEATURE_COLUMNS,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Dict[str, np.ndarray]:
+    """
+    Read the feature table into one NumPy array per column.
+
+    Feature columns come back as float32 (missing values as NaN),
+    homework_submission_id as int64, model_version and topic as object
+    arrays. Rows are streamed in chunks, nothing is parsed from JSON.
+    """
+    ids, versions, topics, blocks = [], [], [], []
+    for chunk in _export_chunks(db, model_version, columns, chunk_size):
+        ids.append(np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk)))
+        versions.append(np.array([row[1] for row in chunk], dtype=object))
+        topics.append(np.array([row[2] for row in chunk], dtype=object))
+        # None -> NaN in the float conversion
+        blocks.append(np.array([row[3:] for row in chunk], dtype=np.float32).reshape(len(chunk), len(columns)))
+
+    if blocks:
+        matrix = np.concatenate(blocks)
+    else:
+        matrix = np.empty((0, len(columns)), dtype=np.float32)
+
+    data = {
+        "homework_submission_id": np.concatenate(ids) if ids else np.empty(0, dtype=np.int64),
+        "model_version": np.concatenate(versions) if versions else np.empty(0, dtype=object),
+        "topic": np.concatenate(topics) if topics else np.empty(0, dtype=object),
+    }
+    for i, name in enumerate(columns):
+        data[name] = np.ascontiguousarray(matrix[:, i])
+    return data
+
+
+def export_arrow(
+    db: Session,
+    model_version: Optional[str] = None,
+    columns: Sequence[str] = FEATURE_COLUMNS,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+):
+    """Same as export_numpy, as a pyarrow.Table (needs the optional pyarrow package)."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise RuntimeError("Arrow export needs pyarrow: pip install pyarrow") from e
+
+    data = export_numpy(db, model_version, columns, chunk_size)
+    return pa.table({
+        "homework_submission_id": pa.array(data["homework_submission_id"]),
+        "model_version": pa.array(data["model_version"].tolist(), type=pa.string()),
+        "topic": pa.array(data["topic"].tolist(), type=pa.string()),
+        **{name: pa.array(data[name]) for name in columns},
+    })
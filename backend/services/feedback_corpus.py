@@ -0,0 +1,140 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_CORPUS_PATH = BASE_DIR / "klass9_matte_inlamningar_dataset.csv"
+COMMENT_COLUMN = "teacher_comment_sv"
+# Seconds between checks of the CSV's mtime on lookup
+FEEDBACK_CORPUS_CHECK_SECONDS = float(os.getenv("FEEDBACK_CORPUS_CHECK_SECONDS", "5"))
+
+# Cache file: magic, source mtime_ns, source size, comment count; then int64 offsets and the UTF-8 blob
+_CACHE_HEADER = struct.Struct("<8sqqq")
+_CACHE_MAGIC = b"TMFBC001"
+
+
+def cache_path_for(path: Path) -> Path:
+    """Where the comments of a corpus CSV are cached for memory mapping."""
+    return path.with_name(path.name + ".comments.bin")
+
+
+class FeedbackCorpus:
+    """
+    Teacher-comment corpus used by the kNN feedback step.
+
+    The comments are stored as one UTF-8 blob plus an offsets array, so the
+    whole column costs roughly its size on disk and a lookup by kNN index is
+    a single slice. The first process to need them parses the CSV and writes
+    blob and offsets to a cache file next to it; every process (the scoring
+    pool workers, other uvicorn workers) memory-maps that file read-only,
+    so they all share one copy in the page cache. The cache is rebuilt when
+    the CSV's mtime or size changes; lookups check the mtime at most every
+    check_seconds. If the cache can't be written the comments are kept in
+    this process's memory instead.
+    """
+
+    def __init__(self, path=DEFAULT_CORPUS_PATH, column: str = COMMENT_COLUMN,
+                 check_seconds: float = FEEDBACK_CORPUS_CHECK_SECONDS, cache_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.column = column
+        self.check_seconds = check_seconds
+        self.cache_path = Path(cache_path) if cache_path is not None else cache_path_for(self.path)
+        self.shared = False
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self._data = (b"", np.zeros(1, dtype=np.int64))
+
+    def _read_comments(self) -> list:
+        import pandas as pd
+
+        comments = pd.read_csv(self.path, usecols=[self.column])[self.column]
+        return [c.encode("utf-8") if isinstance(c, str) else b"" for c in comments]
+
+    def _map_cache(self, stat: os.stat_result):
+        """(blob, offsets) views of the cache file, or None if it is missing or for another CSV version."""
+        try:
+            with open(self.cache_path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # ValueError: empty file
+            return None
+        if len(mapped) < _CACHE_HEADER.size:
+            return None
+        magic, mtime_ns, size, count = _CACHE_HEADER.unpack_from(mapped)
+        blob_start = _CACHE_HEADER.size + 8 * (count + 1)
+        if (magic, mtime_ns, size) != (_CACHE_MAGIC, stat.st_mtime_ns, stat.st_size) or len(mapped) < blob_start:
+            return None
+        offsets = np.frombuffer(mapped, dtype=np.int64, count=count + 1, offset=_CACHE_HEADER.size)
+        return memoryview(mapped)[blob_start:], offsets
+
+    def _write_cache(self, stat: os.stat_result, encoded: list, offsets: np.ndarray):
+        tmp = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, stat.st_mtime_ns, stat.st_size, len(encoded)))
+                f.write(offsets.astype("<i8").tobytes())
+                for comment in encoded:
+                    f.write(comment)
+            os.replace(tmp, self.cache_path)  # readers map either the old file or the complete new one
+        except OSError as e:
+            print(f"⚠️ Could not write feedback corpus cache {self.cache_path}: {e}")
+            tmp.unlink(missing_ok=True)
+
+    def _load(self, stat: os.stat_result):
+        data = self._map_cache(stat)
+        if data is None:
+            encoded = self._read_comments()
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(c) for c in encoded], out=offsets[1:])
+            self._write_cache(stat, encoded, offsets)
+            data = self._map_cache(stat) or (b"".join(encoded), offsets)
+
+        # Swap blob and offsets as one tuple so readers never see a half-loaded corpus
+        self._data = data
+        self.shared = isinstance(data[0], memoryview)
+        self._mtime = stat.st_mtime
+        print(
+            f"✅ Feedback corpus loaded: {len(data[1]) - 1} comments from {self.path.name}"
+            f"{' (memory-mapped)' if self.shared else ''}"
+        )
+
+    def refresh(self) -> bool:
+        """Reload the CSV if it changed on disk. Returns True if a reload happened."""
+        self._next_check = time.monotonic() + self.check_seconds
+        stat = os.stat(self.path)
+        if stat.st_mtime == self._mtime:
+            return False
+        with self._lock:
+            if stat.st_mtime != self._mtime:
+                self._load(stat)
+                return True
+        return False
+
+    def _check(self):
+        if self._mtime is None or time.monotonic() >= self._next_check:
+            self.refresh()
+
+    def __len__(self) -> int:
+        self._check()
+        return len(self._data[1]) - 1
+
+    def __getitem__(self, index: int) -> str:
+        self._check()
+        blob, offsets = self._data
+        index = int(index)
+        if index < 0:
+            index += len(offsets) - 1
+        if not 0 <= index < len(offsets) - 1:
+            raise IndexError(f"Comment index {index} out of range")
+        return str(blob[offsets[index]:offsets[index + 1]], "utf-8")
+
+
+# Shared instance, loaded on first use. Spawned scoring pool workers each
+# have one too, but they all map the same cache file.
+feedback_corpus = FeedbackCorpus()
@@ -0,0 +1,155 @@
+"""
+Vocabulary-free vectorizer for teacher feedback.
+
+The fitted TfidfVectorizer keeps a Python dict from every kept term to
+its column, in every worker. HashingFeedbackVectorizer hashes terms into
+2 ** n_bits columns instead (sklearn's HashingVectorizer, same tokens and
+stop words), then applies the same smoothed IDF and L2 norm. The only
+state is the IDF of the buckets seen in the corpus: two NumPy arrays, no
+strings. As with a fitted vocabulary, terms in buckets the corpus never
+used are dropped, so without collisions the cosine distances are the
+TF-IDF ones; and the output has one column per used bucket, so more bits
+mean fewer collisions at no memory cost.
+
+The vectorizer and the hashed, normalized corpus (float32) are saved
+together next to the feedback model. Build them from the comment CSV, in
+backend/:
+    python -m services.feedback_hashing [--bits 16]
+and serve them with FEEDBACK_VECTORIZER=hashing.
+"""
+import argparse
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+import scipy.sparse as sp
+
+from services.feedback_index import _normalized
+
+# Hash buckets = 2 ** FEEDBACK_HASH_BITS; fewer bits mean more terms sharing a bucket
+FEEDBACK_HASH_BITS = int(os.getenv("FEEDBACK_HASH_BITS", "20"))
+
+HASHING_FILE = "teacher_feedback_hashing.npz"
+
+
+def hashing_path(model_path: Union[str, Path]) -> Path:
+    """The hashed vectorizer and corpus file, next to the feedback model files."""
+    return Path(model_path).with_name(HASHING_FILE)
+
+
+class HashingFeedbackVectorizer:
+    """
+    TF-IDF with hashed terms: transform() gives L2-normalized float64 CSR
+    rows, column j being the j-th bucket the corpus used.
+    """
+
+    def __init__(self, n_bits: int = FEEDBACK_HASH_BITS, stop_words: Optional[List[str]] = None,
+                 idf_buckets: Optional[np.ndarray] = None, idf_values: Optional[np.ndarray] = None):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.n_bits = n_bits
+        self.stop_words = list(stop_words) if stop_words else None
+        self._hasher = HashingVectorizer(n_features=2 ** n_bits, alternate_sign=False, norm=None,
+                                         stop_words=self.stop_words)
+        # Sorted buckets seen in the corpus and their IDF; any other bucket is dropped
+        self.idf_buckets = np.zeros(0, dtype=np.int32) if idf_buckets is None else idf_buckets
+        self.idf_values = np.zeros(0, dtype=np.float32) if idf_values is None else idf_values
+
+    def fit(self, texts: Iterable[str]) -> "HashingFeedbackVectorizer":
+        """Smoothed IDF of each bucket, as TfidfTransformer(smooth_idf=True) computes it per term."""
+        counts = self._hasher.transform(texts).tocsc()
+        n_docs = counts.shape[0]
+        df = np.diff(counts.indptr)
+        self.idf_buckets = np.flatnonzero(df).astype(np.int32)
+        self.idf_values = (np.log((1 + n_docs) / (1 + df[self.idf_buckets])) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts: Iterable[str]) -> sp.csr_matrix:
+        X = self._hasher.transform(texts).tocsr()
+        n_columns = len(self.idf_buckets)
+        if not n_columns:
+            return sp.csr_matrix((X.shape[0], 0))
+        # Bucket -> column; buckets the corpus never used get weight 0 and are dropped
+        columns = np.minimum(np.searchsorted(self.idf_buckets, X.indices), n_columns - 1)
+        seen = self.idf_buckets[columns] == X.indices
+        X = sp.csr_matrix((X.data * np.where(seen, self.idf_values[columns], 0.0), columns, X.indptr),
+                          shape=(X.shape[0], n_columns))
+        X.eliminate_zeros()
+        return _normalized(X)
+
+    def fit_transform(self, texts: List[str]) -> sp.csr_matrix:
+        return self.fit(texts).transform(texts)
+
+    # --- Persistence ---
+
+    def state(self) -> dict:
+        return {
+            "n_bits": np.array(self.n_bits),
+            "stop_words": np.array(self.stop_words or [], dtype=str),
+            "idf_buckets": self.idf_buckets,
+            "idf_values": self.idf_values,
+        }
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "HashingFeedbackVectorizer":
+        """Read the vectorizer from a file written by save_hashed_feedback(); the corpus is not read."""
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"{path} not found; build it with python -m services.feedback_hashing")
+        with np.load(path) as data:
+            return cls(int(data["n_bits"]), data["stop_words"].tolist(), data["idf_buckets"], data["idf_values"])
+
+
+def save_hashed_feedback(path: Union[str, Path], vectorizer: HashingFeedbackVectorizer, corpus: sp.csr_matrix):
+    """Write the vectorizer and the hashed corpus (as float32) to path atomically."""
+    path = Path(path)
+    corpus = sp.csr_matrix(corpus, dtype=np.float32)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, data=corpus.data, indices=corpus.indices, indptr=corpus.indptr,
+                 shape=np.array(corpus.shape), **vectorizer.state())
+    os.replace(tmp_path, path)
+
+
+def load_hashed_corpus(path: Union[str, Path]) -> sp.csr_matrix:
+    """The hashed corpus rows saved by save_hashed_feedback()."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found; build it with python -m services.feedback_hashing")
+    with np.load(path) as data:
+        return sp.csr_matrix((data["data"], data["indices"], data["indptr"]), shape=tuple(data["shape"]))
+
+
+def tfidf_stop_words(vectorizer_path: Union[str, Path]) -> Optional[List[str]]:
+    """Stop words of the fitted TF-IDF vectorizer, so both tokenize the same way."""
+    import joblib
+
+    try:
+        stop_words = joblib.load(vectorizer_path).get_stop_words()
+    except (OSError, AttributeError) as e:
+        print(f"⚠️ No stop words from {vectorizer_path}: {e}")
+        return None
+    return sorted(stop_words) if stop_words else None
+
+
+def main():
+    from services.feedback_corpus import DEFAULT_CORPUS_PATH, FeedbackCorpus
+    from services.model_registry import MODEL_DIR
+
+    parser = argparse.ArgumentParser(description="Hash the teacher comment corpus for FEEDBACK_VECTORIZER=hashing")
+    parser.add_argument("--bits", type=int, default=FEEDBACK_HASH_BITS)
+    parser.add_argument("--csv", default=str(DEFAULT_CORPUS_PATH))
+    args = parser.parse_args()
+
+    corpus = FeedbackCorpus(args.csv)
+    comments = [corpus[i] for i in range(len(corpus))]
+    vectorizer = HashingFeedbackVectorizer(args.bits, tfidf_stop_words(MODEL_DIR / "teacher_feedback_vectorizer.pkl"))
+    path = hashing_path(MODEL_DIR / "teacher_feedback_model.pkl")
+    save_hashed_feedback(path, vectorizer, vectorizer.fit_transform(comments))
+    print(f"✅ Hashed {len(comments)} comments into 2^{args.bits} buckets "
+          f"({len(vectorizer.idf_buckets)} used) to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import copy
+import os
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+# Teacher feedback nearest neighbours: exact (FeedbackIndex) or lsh (approximate, services/feedback_lsh.py)
+FEEDBACK_INDEX = os.getenv("FEEDBACK_INDEX", "exact").strip().lower()
+# Text vectors: the fitted tfidf vectorizer, or hashing (services/feedback_hashing.py, no vocabulary)
+FEEDBACK_VECTORIZER = os.getenv("FEEDBACK_VECTORIZER", "tfidf").strip().lower()
+# How the exact index stores corpus vectors: float64, float32 or int8 (quantized per row)
+FEEDBACK_VECTOR_DTYPE = os.getenv("FEEDBACK_VECTOR_DTYPE", "float64").strip().lower()
+VECTOR_DTYPES = ("float64", "float32", "int8")
+
+# Similarities computed at once (queries x corpus rows); larger batches are searched in blocks
+SIMILARITY_BLOCK = 4_000_000
+
+
+def _normalized(X) -> "sp.csr_matrix":
+    """L2-normalized float64 CSR copy of X, the same arithmetic as sklearn's normalize()."""
+    import scipy.sparse as sp
+    from sklearn.utils.sparsefuncs_fast import inplace_csr_row_normalize_l2
+
+    X = sp.csr_matrix(X, dtype=np.float64, copy=True)
+    inplace_csr_row_normalize_l2(X)
+    return X
+
+
+def _quantized(X: "sp.csr_matrix") -> Tuple["sp.csr_matrix", np.ndarray]:
+    """
+    int8 copy of X plus one float32 scale per row (its largest |value| / 127),
+    so row i is approximately scales[i] * quantized[i].
+    """
+    import scipy.sparse as sp
+
+    lengths = np.diff(X.indptr)
+    row_max = np.zeros(X.shape[0])
+    non_empty = lengths > 0
+    row_max[non_empty] = np.maximum.reduceat(np.abs(X.data), X.indptr[:-1][non_empty])
+    scales = np.where(row_max > 0, row_max / 127.0, 1.0).astype(np.float32)
+    data = np.rint(X.data / np.repeat(scales, lengths)).astype(np.int8)
+    return sp.csr_matrix((data, X.indices.copy(), X.indptr.copy()), shape=X.shape), scales
+
+
+class FeedbackIndex:
+    """
+    Cosine nearest neighbours over the teacher-feedback TF-IDF corpus.
+
+    The corpus is kept as an L2-normalized CSR matrix, transposed once, so
+    a batch of queries is one sparse product giving every cosine
+    similarity, and argpartition (argmin for k=1) picks the top k per row.
+    Distances are 1 - cosine similarity, as NearestNeighbors(metric="cosine")
+    reports them; all-zero rows are at distance 1 from everything. For k=1
+    equal distances go to the lowest row (sklearn picks any of them); for
+    larger k ties at the cut-off are broken arbitrarily, as in sklearn.
+
+    kneighbors() has the NearestNeighbors signature, so the index can be
+    passed wherever the sklearn model was.
+
+    With dtype float32 the vectors take 2/3 of the memory, with int8 (one
+    scale per row) under half; distances then differ from the float64
+    ones by about 1e-7 and 1e-2 respectively, which can reorder near ties.
+    """
+
+    def __init__(self, matrix, dtype: str = FEEDBACK_VECTOR_DTYPE):
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown FEEDBACK_VECTOR_DTYPE {dtype} (expected one of {', '.join(VECTOR_DTYPES)})")
+        self.dtype = dtype
+        self.scales = None
+        if dtype == "int8":
+            self.matrix, self.scales = _quantized(_normalized(matrix))
+        else:
+            self.matrix = _normalized(matrix).astype(dtype, copy=False)
+        self._matrix_t = self.matrix.T.tocsr()
+        self.n_neighbors = 1
+
+    @classmethod
+    def from_model(cls, feedback_model) -> "FeedbackIndex":
+        """Index the vectors a fitted NearestNeighbors(metric="cosine") was trained on."""
+        if feedback_model.metric != "cosine":
+            raise ValueError(f"Feedback model uses metric {feedback_model.metric}, expected cosine")
+        index = cls(feedback_model._fit_X)
+        index.n_neighbors = feedback_model.n_neighbors
+        return index
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def vectors(self) -> "sp.csr_matrix":
+        """The corpus vectors as float64 (dequantized for int8)."""
+        import scipy.sparse as sp
+
+        if self.scales is None:
+            return self.matrix.astype(np.float64)
+        return sp.diags(self.scales.astype(np.float64)) @ self.matrix.astype(np.float64)
+
+    def extended(self, rows) -> "FeedbackIndex":
+        """
+        A new index with rows appended after the existing ones, which keep
+        their ids and stored values; only the new rows are normalized.
+        """
+        import scipy.sparse as sp
+
+        added = FeedbackIndex(rows, self.dtype)
+        index = copy.copy(self)
+        index.matrix = sp.vstack([self.matrix, added.matrix], format="csr")
+        if self.scales is not None:
+            index.scales = np.concatenate([self.scales, added.scales])
+        index._matrix_t = index.matrix.T.tocsr()
+        return index
+
+    def similarities(self, X) -> np.ndarray:
+        """Dense (n_queries, n_corpus) cosine similarities."""
+        import scipy.sparse as sp
+
+        X = _normalized(X)
+        if self.scales is None:
+            return (X.astype(self.matrix.dtype, copy=False) @ self._matrix_t).toarray()
+        # Only the postings of the query terms are converted from int8
+        terms = np.unique(X.indices)
+        X = sp.csr_matrix((X.data.astype(np.float32), np.searchsorted(terms, X.indices), X.indptr),
+                          shape=(X.shape[0], len(terms)))
+        similarities = (X @ self._matrix_t[terms].astype(np.float32)).toarray()
+        similarities *= self.scales
+        return similarities
+
+    def search(self, X, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (distances, indices) per query row, nearest first; both (n_queries, k)."""
+        import scipy.sparse as sp
+
+        X = sp.csr_matrix(X)
+        step = max(1, SIMILARITY_BLOCK // max(len(self), 1))
+        if X.shape[0] > step:
+            blocks = [self.search(X[first:first + step], k) for first in range(0, X.shape[0], step)]
+            return np.vstack([d for d, _ in blocks]), np.vstack([i for _, i in blocks])
+        k = min(k, len(self))
+        distances = self.similarities(X)
+        np.subtract(1.0, distances, out=distances)
+        np.clip(distances, 0.0, 2.0, out=distances)
+        if k == 1:
+            top = distances.argmin(axis=1)[:, None]
+            return np.take_along_axis(distances, top, axis=1), top
+        if k < distances.shape[1]:
+            top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+        top_distances = np.take_along_axis(distances, top, axis=1)
+        order = np.argsort(top_distances, axis=1, kind="stable")
+        return np.take_along_axis(top_distances, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def kneighbors(self, X, n_neighbors: int = None, return_distance: bool = True):
+        distances, indices = self.search(X, n_neighbors or self.n_neighbors)
+        return (distances, indices) if return_distance else indices
+
+
+def load_feedback_index(path: Path, kind: str = FEEDBACK_INDEX, vectorizer: str = FEEDBACK_VECTORIZER):
+    """
+    Registry loader: the FEEDBACK_INDEX index for teacher_feedback_model.pkl,
+    or, with FEEDBACK_VECTORIZER=hashing, for the hashed corpus saved next to it.
+    """
+    import joblib
+
+    if kind not in ("exact", "lsh"):
+        raise ValueError(f"Unknown FEEDBACK_INDEX {kind} (expected exact or lsh)")
+    if vectorizer == "hashing":
+        from services.feedback_hashing import hashing_path, load_hashed_corpus
+
+        path = hashing_path(path)
+        if kind == "lsh":
+            from services.feedback_lsh import LSHFeedbackIndex
+
+            return LSHFeedbackIndex.load_or_build(path, load_matrix=load_hashed_corpus)
+        return FeedbackIndex(load_hashed_corpus(path))
+    if vectorizer != "tfidf":
+        raise ValueError(f"Unknown FEEDBACK_VECTORIZER {vectorizer} (expected tfidf or hashing)")
+    if kind == "lsh":
+        from services.feedback_lsh import LSHFeedbackIndex
+
+        return LSHFeedbackIndex.load_or_build(path)
+    return FeedbackIndex.from_model(joblib.load(path))
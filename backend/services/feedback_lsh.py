@@ -0,0 +1,257 @@
+"""
+Approximate nearest-neighbour index for the teacher-feedback corpus.
+
+Random-hyperplane LSH for cosine distance: each of n_tables tables hashes
+a vector to n_bits signs of its projections on random hyperplanes, so
+vectors at a small angle tend to share a bucket. A query collects the
+rows in its bucket (plus n_probes neighbouring buckets per table, found
+by flipping its least certain bits) and re-ranks only those candidates
+exactly. More tables or probes raise recall and cost; more bits make
+buckets smaller.
+
+Build and save next to the feedback model from backend/:
+    python -m services.feedback_lsh model/teacher_feedback_model.pkl
+"""
+import argparse
+import os
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+
+from services.feedback_index import _normalized
+
+# Hash tables, bits per table (0 picks them from the corpus size) and extra buckets probed per table
+FEEDBACK_LSH_TABLES = int(os.getenv("FEEDBACK_LSH_TABLES", "16"))
+FEEDBACK_LSH_BITS = int(os.getenv("FEEDBACK_LSH_BITS", "0"))
+FEEDBACK_LSH_PROBES = int(os.getenv("FEEDBACK_LSH_PROBES", "4"))
+
+
+# Queries searched together; bounds the dense copy of the query block
+SEARCH_CHUNK = 256
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, start + length) for each pair."""
+    ends = np.cumsum(lengths)
+    return np.repeat(starts - (ends - lengths), lengths) + np.arange(ends[-1] if len(ends) else 0)
+
+
+def default_bits(n_rows: int) -> int:
+    """About 16 corpus rows per bucket."""
+    return int(np.clip(round(np.log2(max(n_rows, 1) / 16)), 4, 24))
+
+
+def lsh_path(model_path: Union[str, Path]) -> Path:
+    """Where the index for a feedback model file is kept: next to it, _lsh.npz suffix."""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + "_lsh.npz")
+
+
+class LSHFeedbackIndex:
+    """
+    FeedbackIndex with approximate search: same search()/kneighbors()
+    interface and distances, but only candidates sharing an LSH bucket
+    with the query are compared. Queries without any candidate get index
+    -1 at distance inf.
+    """
+
+    def __init__(self, matrix: sp.csr_matrix, planes: np.ndarray, rows: np.ndarray, keys: np.ndarray,
+                 n_tables: int, n_probes: int = FEEDBACK_LSH_PROBES, n_neighbors: int = 1):
+        """
+        planes holds n_tables * n_bits hyperplanes. Every table lists all
+        corpus rows sorted by bucket code, the tables one after another:
+        rows[j] sits in the bucket keys[j] = table << n_bits | code, so
+        keys is sorted and one searchsorted finds a bucket in any table.
+        """
+        self.matrix = matrix
+        self.planes = planes
+        self._planes_t = np.ascontiguousarray(planes.T)  # scipy copies a non-contiguous operand per call
+        self.rows = rows
+        self.keys = keys
+        self.n_tables, self.n_bits = n_tables, planes.shape[0] // n_tables
+        self.n_probes = n_probes
+        self.n_neighbors = n_neighbors
+        self._bit_values = np.left_shift(1, np.arange(self.n_bits, dtype=np.int64))
+        self._table_keys = np.arange(self.n_tables, dtype=np.int64) << self.n_bits
+
+    @classmethod
+    def build(cls, matrix, n_tables: int = FEEDBACK_LSH_TABLES, n_bits: int = FEEDBACK_LSH_BITS,
+              n_probes: int = FEEDBACK_LSH_PROBES, seed: int = 0) -> "LSHFeedbackIndex":
+        matrix = _normalized(matrix)
+        n_bits = n_bits or default_bits(matrix.shape[0])
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal((n_tables * n_bits, matrix.shape[1]))
+        empty = np.zeros(0, dtype=np.int64)
+        index = cls(matrix, planes, empty, empty, n_tables, n_probes)
+        keys = index._codes(index._project(matrix)) + index._table_keys  # (n_rows, n_tables)
+        order = np.argsort(keys, axis=0, kind="stable")
+        index.keys = np.take_along_axis(keys, order, axis=0).T.ravel()
+        index.rows = order.T.ravel()
+        return index
+
+    @classmethod
+    def from_model(cls, feedback_model, **kwargs) -> "LSHFeedbackIndex":
+        """Index the vectors a fitted NearestNeighbors(metric="cosine") was trained on."""
+        if feedback_model.metric != "cosine":
+            raise ValueError(f"Feedback model uses metric {feedback_model.metric}, expected cosine")
+        index = cls.build(feedback_model._fit_X, **kwargs)
+        index.n_neighbors = feedback_model.n_neighbors
+        return index
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def extended(self, rows) -> "LSHFeedbackIndex":
+        """
+        A new index with rows appended after the existing ones, hashed
+        with the same hyperplanes; existing rows are not hashed again.
+        """
+        rows = _normalized(rows)
+        n = len(self)
+        new_keys = (self._codes(self._project(rows)) + self._table_keys).T.ravel()  # table by table
+        keys = np.concatenate([self.keys, new_keys])
+        order = np.argsort(keys, kind="stable")  # within a bucket, existing rows stay first
+        row_ids = np.concatenate([self.rows, np.tile(np.arange(n, n + rows.shape[0]), self.n_tables)])
+        return LSHFeedbackIndex(sp.vstack([self.matrix, rows], format="csr"), self.planes, row_ids[order],
+                                keys[order], self.n_tables, self.n_probes, self.n_neighbors)
+
+    # --- Hashing ---
+
+    def _project(self, X: sp.csr_matrix) -> np.ndarray:
+        """(n_rows, n_tables, n_bits) projections of normalized rows on the hyperplanes."""
+        projected = np.asarray(X @ self._planes_t)
+        return projected.reshape(X.shape[0], self.n_tables, self.n_bits)
+
+    def _codes(self, projected: np.ndarray) -> np.ndarray:
+        """(n_rows, n_tables) bucket codes."""
+        return (projected > 0) @ self._bit_values
+
+    def _probe_codes(self, projected: np.ndarray, n_probes: int) -> np.ndarray:
+        """(n_rows, n_tables, 1 + n_probes): own bucket, then one flipped bit per probe, least certain first."""
+        codes = self._codes(projected)
+        n_probes = min(n_probes, self.n_bits)
+        if not n_probes:
+            return codes[:, :, None]
+        flips = np.argsort(np.abs(projected), axis=2)[:, :, :n_probes]
+        return np.concatenate([codes[:, :, None], codes[:, :, None] ^ self._bit_values[flips]], axis=2)
+
+    def candidates(self, X, n_probes: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Candidate (query, row) pairs for the query rows of X, each pair
+        once, sorted by query and row.
+        """
+        X = sp.csr_matrix(X)
+        probes = self._probe_codes(self._project(X), self.n_probes if n_probes is None else n_probes)
+        probes = (probes + self._table_keys[None, :, None]).ravel()
+        starts = np.searchsorted(self.keys, probes, side="left")
+        lengths = np.searchsorted(self.keys, probes, side="right") - starts
+        n_rows = len(self)
+        query_ids = np.repeat(np.arange(X.shape[0]), len(probes) // max(X.shape[0], 1))
+        pairs = np.unique(np.repeat(query_ids, lengths) * n_rows + self.rows[_ranges(starts, lengths)])
+        return pairs // n_rows, pairs % n_rows
+
+    def _similarities(self, X: sp.csr_matrix, query_ids: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each (query, row) pair, from the CSR arrays directly."""
+        indptr = self.matrix.indptr
+        lengths = indptr[rows + 1] - indptr[rows]
+        positions = _ranges(indptr[rows], lengths)
+        pair = np.repeat(np.arange(len(rows)), lengths)
+        columns = self.matrix.indices[positions]
+        if X.shape[0] > 1:
+            columns = columns + query_ids[pair] * X.shape[1]  # into the flattened query block
+        products = self.matrix.data[positions] * np.take(X.toarray().ravel(), columns)
+        return np.bincount(pair, weights=products, minlength=len(rows))
+
+    def search(self, X, k: int = 1, n_probes: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k (distances, indices) per query row, nearest first; both (n_queries, k)."""
+        X = _normalized(X)
+        k = max(1, min(k, len(self)))
+        distances = np.full((X.shape[0], k), np.inf)
+        indices = np.full((X.shape[0], k), -1, dtype=np.int64)
+        if not len(self):
+            return distances, indices
+        for first in range(0, X.shape[0], SEARCH_CHUNK):
+            chunk = X if X.shape[0] <= SEARCH_CHUNK else X[first:first + SEARCH_CHUNK]
+            query_ids, rows = self.candidates(chunk, n_probes)
+            if not len(rows):
+                continue
+            pair_distances = 1.0 - self._similarities(chunk, query_ids, rows)
+            np.clip(pair_distances, 0.0, 2.0, out=pair_distances)
+            # Per query: nearest first, equal distances to the lowest row
+            order = np.lexsort((rows, pair_distances, query_ids))
+            query_ids, rows, pair_distances = query_ids[order], rows[order], pair_distances[order]
+            rank = np.arange(len(rows)) - np.searchsorted(query_ids, query_ids)
+            keep = rank < k
+            distances[first + query_ids[keep], rank[keep]] = pair_distances[keep]
+            indices[first + query_ids[keep], rank[keep]] = rows[keep]
+        return distances, indices
+
+    def kneighbors(self, X, n_neighbors: int = None, return_distance: bool = True):
+        distances, indices = self.search(X, n_neighbors or self.n_neighbors)
+        return (distances, indices) if return_distance else indices
+
+    # --- Persistence ---
+
+    def save(self, path: Union[str, Path]):
+        """Write the index to path (.npz) atomically."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+                shape=np.array(self.matrix.shape), planes=self.planes, rows=self.rows, keys=self.keys,
+                n_tables=np.array(self.n_tables), n_neighbors=np.array(self.n_neighbors),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], n_probes: int = FEEDBACK_LSH_PROBES) -> "LSHFeedbackIndex":
+        with np.load(path) as data:
+            matrix = sp.csr_matrix((data["data"], data["indices"], data["indptr"]), shape=tuple(data["shape"]))
+            return cls(matrix, data["planes"], data["rows"], data["keys"], int(data["n_tables"]),
+                       n_probes, int(data["n_neighbors"]))
+
+    @classmethod
+    def load_or_build(cls, model_path: Union[str, Path], load_matrix=None) -> "LSHFeedbackIndex":
+        """
+        The saved index next to model_path when it is newer than the model
+        file; otherwise build it from the model (or from load_matrix(model_path)
+        for a corpus saved another way) and save it there.
+        """
+        import joblib
+
+        model_path = Path(model_path)
+        path = lsh_path(model_path)
+        if path.exists() and path.stat().st_mtime >= model_path.stat().st_mtime:
+            return cls.load(path)
+        if load_matrix is None:
+            index = cls.from_model(joblib.load(model_path))
+        else:
+            index = cls.build(load_matrix(model_path))
+        try:
+            index.save(path)
+            print(f"✅ Saved feedback LSH index to {path.name}")
+        except OSError as e:
+            print(f"⚠️ Could not save feedback LSH index {path}: {e}")
+        return index
+
+
+def main():
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Build the LSH index for a teacher feedback model")
+    parser.add_argument("model_path")
+    parser.add_argument("--tables", type=int, default=FEEDBACK_LSH_TABLES)
+    parser.add_argument("--bits", type=int, default=FEEDBACK_LSH_BITS)
+    args = parser.parse_args()
+    index = LSHFeedbackIndex.from_model(joblib.load(args.model_path), n_tables=args.tables, n_bits=args.bits)
+    index.save(lsh_path(args.model_path))
+    print(f"✅ Indexed {len(index)} comments in {index.n_tables} tables x {index.n_bits} bits "
+          f"to {lsh_path(args.model_path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Teacher feedback index that grows online.
+
+Comments teachers write through POST /grades are appended to a JSON-lines
+log next to the feedback model (record_feedback). Every process serving
+feedback tails that log into a small delta segment that is searched along
+with the base index, so a new comment can be matched right away. A full
+delta is sealed as a segment, and a background thread folds sealed
+segments into the base index. A query searches the base, at most a few
+segments and the delta, and never waits for a merge.
+
+After each merge the compacted base, its logged comments and the log
+offset they cover are saved next to the log, so a restart loads them and
+only vectorizes the comments logged since.
+
+Like the base corpus, a logged row is the TF-IDF vector of the comment
+itself (the submission text is kept in the log for offline refits). Rows
+keep their ids: base rows first, then logged comments in log order.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from services.feedback_corpus import DEFAULT_CORPUS_PATH
+from services.feedback_index import FEEDBACK_INDEX, FEEDBACK_VECTOR_DTYPE, FEEDBACK_VECTORIZER, FeedbackIndex
+from services.model_registry import MODEL_DIR
+
+# Set to 0 to stop recording graded comments (the log is still searched)
+FEEDBACK_ONLINE = os.getenv("FEEDBACK_ONLINE", "1") == "1"
+# Append-only log of graded submissions and their teacher comments
+FEEDBACK_LOG_PATH = Path(os.getenv("FEEDBACK_LOG_PATH", str(MODEL_DIR / "teacher_feedback_log.jsonl")))
+# Rows in the delta segment before it is sealed and merged into the base index
+FEEDBACK_DELTA_ROWS = int(os.getenv("FEEDBACK_DELTA_ROWS", "256"))
+# Log bytes before the saved offset that must still match for a compacted snapshot to be used
+SNAPSHOT_LOG_TAIL = 256
+
+_log_lock = threading.Lock()
+
+
+def record_feedback(submission_text: Optional[str], comment: Optional[str],
+                    log_path: Path = FEEDBACK_LOG_PATH) -> bool:
+    """Append a graded submission and its comment to the feedback log. Returns True if written."""
+    if not (FEEDBACK_ONLINE and submission_text and comment and comment.strip()):
+        return False
+    line = json.dumps({"text": submission_text, "comment": comment}, ensure_ascii=False) + "\n"
+    try:
+        # One O_APPEND write per line, so lines from several processes never interleave
+        with _log_lock:
+            fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode("utf-8"))
+            finally:
+                os.close(fd)
+        return True
+    except OSError as e:
+        print(f"⚠️ Could not record teacher feedback in {log_path}: {e}")
+        return False
+
+
+def feedback_generation(log_path: Path = FEEDBACK_LOG_PATH, corpus_path: Path = DEFAULT_CORPUS_PATH) -> str:
+    """
+    Changes whenever the nearest teacher comment for a text can change: the
+    vectorizer and index settings, the comment corpus (reloaded when its
+    mtime changes) and the log of online comments (grows with every one).
+    """
+    parts = [FEEDBACK_VECTORIZER, FEEDBACK_INDEX, FEEDBACK_VECTOR_DTYPE]
+    for path in (corpus_path, log_path):
+        try:
+            stat = os.stat(path)
+            parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+        except FileNotFoundError:
+            parts.append("-")
+    return "/".join(parts)
+
+
+class SegmentedComments:
+    """Comment lookup by row id: base rows from the base corpus, then the logged comments."""
+
+    def __init__(self, base_comments, n_base: int, logged: List[str]):
+        self.base_comments = base_comments
+        self.n_base = n_base
+        self.logged = logged
+
+    def __len__(self) -> int:
+        return self.n_base + len(self.logged)
+
+    def __getitem__(self, index: int) -> str:
+        index = int(index)
+        if index < self.n_base:
+            if hasattr(self.base_comments, "iloc"):
+                return self.base_comments.iloc[index]
+            return self.base_comments[index]
+        return self.logged[index - self.n_base]
+
+
+def snapshot_path(log_path: Path) -> Path:
+    """Where the compacted base for a feedback log is saved."""
+    return log_path.with_name(log_path.stem + ".compacted.pkl")
+
+
+class SegmentedFeedbackIndex:
+    """
+    A base FeedbackIndex (or LSHFeedbackIndex) plus the comments logged
+    since it was built. Same search()/kneighbors() interface; results from
+    the parts are merged by distance, equal distances to the lowest row.
+
+    base_id names the base index (its model file and mtime); a saved
+    compacted snapshot is only used for the same base_id, base size and
+    index settings, and while the log up to its offset is unchanged.
+    """
+
+    def __init__(self, base, vectorizer, log_path: Path = FEEDBACK_LOG_PATH,
+                 delta_rows: int = FEEDBACK_DELTA_ROWS, base_id: str = ""):
+        self.vectorizer = vectorizer
+        self.log_path = Path(log_path)
+        self.snapshot_path = snapshot_path(self.log_path)
+        self.base_id = base_id
+        self.delta_rows = max(1, delta_rows)
+        self.n_base = len(base)
+        self.n_neighbors = base.n_neighbors
+        self.compactions = 0
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()  # one merge at a time
+        self._log_offset = 0
+        self._comments: List[str] = []
+        self._base = base
+        self._segments: Tuple[FeedbackIndex, ...] = ()
+        self._segment_ends: Tuple[int, ...] = ()  # log offset after each sealed segment's last comment
+        self._delta_matrices: List["sp.csr_matrix"] = []
+        self._delta: Optional[FeedbackIndex] = None
+        self._compactor: Optional[threading.Thread] = None
+        self._compacting = False  # cleared under _lock once no sealed segment is left
+        # (index, first row id) for every part; replaced as a whole, so a search sees one consistent state
+        self._parts: Tuple[Tuple[object, int], ...] = ((base, 0),)
+        self._load_snapshot()
+        self.refresh()
+
+    def __len__(self) -> int:
+        return self.n_base + len(self._comments)
+
+    def comments(self, base_comments) -> SegmentedComments:
+        """Comments for the row ids search() returns, base rows taken from base_comments."""
+        return SegmentedComments(base_comments, self.n_base, self._comments)
+
+    # --- Insertion ---
+
+    def refresh(self) -> int:
+        """Read comments appended to the log since the last call. Returns how many were added."""
+        try:
+            size = os.stat(self.log_path).st_size
+        except FileNotFoundError:
+            return 0
+        if size <= self._log_offset:
+            return 0
+        with self._lock:
+            with open(self.log_path, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read(size - self._log_offset)
+            complete = data.rfind(b"\n") + 1  # a line still being written is read next time
+            if not complete:
+                return 0
+            self._log_offset += complete
+            comments = []
+            for line in data[:complete].splitlines():
+                try:
+                    comments.append(str(json.loads(line)["comment"]))
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"⚠️ Skipping bad line in {self.log_path.name}: {e}")
+            if comments:
+                self._append(self.vectorizer.transform(comments), comments)
+            return len(comments)
+
+    def _append(self, rows: "sp.csr_matrix", comments: List[str]):
+        """Add rows to the delta segment; seal it when full. Caller holds the lock."""
+        import scipy.sparse as sp
+
+        self._comments.extend(comments)
+        self._delta_matrices.append(sp.csr_matrix(rows))
+        self._delta = FeedbackIndex(sp.vstack(self._delta_matrices, format="csr"))
+        if len(self._delta) >= self.delta_rows:
+            self._segments += (self._delta,)
+            self._segment_ends += (self._log_offset,)
+            self._delta_matrices, self._delta = [], None
+            self._compact_in_background()
+        self._update_parts()
+
+    def _update_parts(self):
+        parts, offset = [], 0
+        for index in (self._base, *self._segments, self._delta):
+            if index is not None:
+                parts.append((index, offset))
+                offset += len(index)
+        self._parts = tuple(parts)
+
+    # --- Compaction ---
+
+    def _compact_in_background(self):
+        """Start the merge thread unless one is running. Caller holds the lock."""
+        if not self._compacting:
+            self._compacting = True
+            self._compactor = threading.Thread(target=self.compact, name="feedback-compaction", daemon=True)
+            self._compactor.start()
+
+    def compact(self) -> int:
+        """
+        Fold the sealed segments into the base index. The merge runs
+        without the lock; searches keep using the old parts until the
+        new base is swapped in, then the new base is saved. Returns the
+        number of rows merged.
+        """
+        import scipy.sparse as sp
+
+        merged_rows = 0
+        with self._compact_lock:
+            while True:
+                with self._lock:
+                    base, segments = self._base, self._segments
+                    if not segments:
+                        self._compacting = False
+                        return merged_rows
+                try:
+                    merged = base.extended(sp.vstack([s.vectors() for s in segments], format="csr"))
+                except Exception as e:
+                    print(f"⚠️ Feedback index compaction failed, segments stay searchable: {e}")
+                    with self._lock:
+                        self._compacting = False
+                    return merged_rows
+                with self._lock:
+                    self._base = merged
+                    self._segments = self._segments[len(segments):]
+                    log_offset = self._segment_ends[len(segments) - 1]
+                    self._segment_ends = self._segment_ends[len(segments):]
+                    self._update_parts()
+                    self.compactions += 1
+                    comments = self._comments[:len(merged) - self.n_base]
+                merged_rows += sum(len(s) for s in segments)
+                self._save_snapshot(merged, comments, log_offset)
+
+    # --- Snapshot of the compacted base ---
+
+    def _snapshot_key(self) -> dict:
+        return {
+            "base_id": self.base_id,
+            "base_rows": self.n_base,
+            "index": type(self._base).__name__,
+            "settings": [FEEDBACK_VECTORIZER, FEEDBACK_INDEX, FEEDBACK_VECTOR_DTYPE],
+        }
+
+    def _log_tail(self, offset: int) -> bytes:
+        start = max(0, offset - SNAPSHOT_LOG_TAIL)
+        with open(self.log_path, "rb") as f:
+            f.seek(start)
+            return f.read(offset - start)
+
+    def _save_snapshot(self, base, comments: List[str], log_offset: int):
+        """Write the compacted base atomically; a failed save only costs a longer next start."""
+        import joblib
+
+        tmp = self.snapshot_path.with_name(f"{self.snapshot_path.name}.{os.getpid()}.tmp")
+        try:
+            snapshot = {
+                "key": self._snapshot_key(),
+                "log_offset": log_offset,
+                "log_tail": self._log_tail(log_offset),
+                "comments": comments,
+                "base": base,
+            }
+            joblib.dump(snapshot, tmp)
+            os.replace(tmp, self.snapshot_path)
+        except Exception as e:
+            print(f"⚠️ Could not save the compacted feedback index to {self.snapshot_path}: {e}")
+            tmp.unlink(missing_ok=True)
+
+    def _load_snapshot(self) -> bool:
+        """Start from the saved compacted base if it still matches the base index and the log."""
+        if not self.snapshot_path.exists():
+            return False
+        import joblib
+
+        try:
+            snapshot = joblib.load(self.snapshot_path)
+            log_offset = snapshot["log_offset"]
+            if snapshot["key"] != self._snapshot_key():
+                print(f"⚠️ Ignoring {self.snapshot_path.name}: saved for another base index")
+                return False
+            if self._log_tail(log_offset) != snapshot["log_tail"]:
+                print(f"⚠️ Ignoring {self.snapshot_path.name}: {self.log_path.name} changed")
+                return False
+        except Exception as e:
+            print(f"⚠️ Ignoring {self.snapshot_path.name}: {e}")
+            return False
+        self._base = snapshot["base"]
+        self._comments = list(snapshot["comments"])
+        self._log_offset = log_offset
+        self._update_parts()
+        return True
+
+    def wait_for_compaction(self, timeout: Optional[float] = None):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join(timeout)
+
+    # --- Search ---
+
+    def search(self, X, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (distances, row ids) per query row over all parts, nearest first."""
+        import scipy.sparse as sp
+
+        self.refresh()
+        parts = self._parts
+        X = sp.csr_matrix(X)
+        if len(parts) == 1:
+            return parts[0][0].search(X, k)
+        k = min(k, sum(len(index) for index, _ in parts))
+        results = [index.search(X, k) for index, _ in parts]
+        distances = np.hstack([d for d, _ in results])
+        indices = np.hstack([np.where(i >= 0, i + offset, -1) for (_, i), (_, offset) in zip(results, parts)])
+        # Stable sort over parts in row order: equal distances go to the lowest row
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+    def kneighbors(self, X, n_neighbors: int = None, return_distance: bool = True):
+        distances, indices = self.search(X, n_neighbors or self.n_neighbors)
+        return (distances, indices) if return_distance else indices
+
+    def stats(self) -> dict:
+        parts = self._parts
+        return {
+            "rows": len(self),
+            "base_rows": len(parts[0][0]),
+            "logged_rows": len(self._comments),
+            "segments": len(parts) - 1,
+            "compactions": self.compactions,
+        }
@@ -1,32 +1,34 @@
-from pathlib import Path
-import joblib
-import pandas as pd
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ml_utils import get_grade_predictor
+from services.model_versions import grade_models
 
-MODEL_DIR = Path(__file__).resolve().parents[1] / "model"
-_model = joblib.load(MODEL_DIR/"trained_model.pkl")
-_topic_encoder = joblib.load(MODEL_DIR/"topic_encoder.pkl")
-_feature_order = joblib.load(MODEL_DIR/"feature_order.pkl")
 
 def predict_one(payload: dict):
-    df = pd.DataFrame([payload])
-    df["topic"] = _topic_encoder.transform(df["topic"])
-    df = df[_feature_order]
-    pred = _model.predict(df)[0]
-    proba = _model.predict_proba(df)[0]
-    classes = list(_model.classes_)
+    # Goes through the shared micro-batching dispatcher like every other grade prediction
+    grade_predictor = get_grade_predictor()
+    proba = grade_predictor.predict_proba(payload)
+    classes = grade_predictor.classes
+    pred = classes[int(np.argmax(proba))]
     return pred, {cls: float(p) for cls, p in zip(classes, proba)}
 
-class InferenceService:
-    def _preprocess(self, payload: Dict[str, Any]) -> pd.DataFrame:
-        df = pd.DataFrame([payload])
-        df["topic"] = get_topic_encoder().transform(df["topic"])
-        df = df[get_feature_order()]
-        return df
 
+def predict_columns(columns: Dict[str, Any], n_rows: int) -> Tuple[str, List[int], np.ndarray]:
+    """
+    One vectorized encode and one model call (for the rows not in the
+    prediction cache) for a whole batch of feature columns. Returns the serving model version, the classes and an
+    (n_rows, n_classes) probability matrix.
+    """
+    served = grade_models.current()
+    predictor = served.predictor
+    if n_rows == 0:
+        return served.version, predictor.classes, np.zeros((0, len(predictor.classes)), dtype=np.float32)
+    proba = predictor.predict_proba_many(predictor.encode_columns(columns, n_rows))
+    return served.version, predictor.classes, np.asarray(proba)
+
+
+class InferenceService:
     def predict(self, payload: Dict[str, Any]):
-        df = self._preprocess(payload)
-        pred = get_model().predict(df)[0]
-        proba = get_model().predict_proba(df)[0]
-        classes = list(get_model().classes_)
-        probs = {cls: float(p) for cls, p in zip(classes, proba)}
-        return pred, probs
\ No newline at end of file
+        return predict_one(payload)
@@ -0,0 +1,165 @@
+"""
+Inference backends for the grade model.
+
+GradePredictor encodes features into a float32 matrix and hands it to a
+backend, which returns the (n_rows, n_classes) class probabilities:
+
+    xgboost  Booster.inplace_predict (default)
+    numpy    the pure-NumPy TreeEnsemble from services/tree_ensemble.py
+    onnx     ONNX Runtime; needs onnxruntime and onnxmltools installed
+
+GRADE_INFERENCE_BACKEND picks the backend for every grade model version.
+A backend that can't be built (e.g. onnxruntime not installed) falls back
+to xgboost with a warning.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Which backend serves the grade model: xgboost, numpy or onnx
+GRADE_INFERENCE_BACKEND = os.getenv("GRADE_INFERENCE_BACKEND", "xgboost").strip().lower()
+# ONNX Runtime threads per inference call (0 = the runtime's default)
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+
+
+class InferenceBackend:
+    """Runs an encoded (n_rows, n_features) float32 matrix through the model."""
+
+    name = "base"
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class XGBoostBackend(InferenceBackend):
+    """The loaded model itself; XGBoost models go straight to the booster."""
+
+    name = "xgboost"
+
+    def __init__(self, model):
+        self.model = model
+        # XGBClassifier.predict only uses the trees up to best_iteration
+        self.booster = model.get_booster() if hasattr(model, "get_booster") else None
+        try:
+            self.iteration_range = (0, model.best_iteration + 1)
+        except AttributeError:
+            self.iteration_range = (0, 0)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if self.booster is None:
+            return self.model.predict_proba(X)
+        return self.booster.inplace_predict(X, iteration_range=self.iteration_range)
+
+
+def serving_booster(model):
+    """
+    Copy of the booster XGBClassifier.predict uses (trees up to
+    best_iteration), without feature names so exporters index features
+    by position like the encoded rows do.
+    """
+    booster = model.get_booster()
+    try:
+        booster = booster[: model.best_iteration + 1]
+    except AttributeError:
+        booster = booster.copy()
+    booster.feature_names = None
+    booster.feature_types = None
+    return booster
+
+
+class TreeEnsembleBackend(InferenceBackend):
+    name = "numpy"
+
+    def __init__(self, ensemble):
+        self.ensemble = ensemble
+
+    @classmethod
+    def from_model(cls, model) -> "TreeEnsembleBackend":
+        from services.tree_ensemble import TreeEnsemble
+
+        model_json = json.loads(serving_booster(model).save_raw(raw_format="json"))
+        return cls(TreeEnsemble.from_xgboost_json(model_json))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.ensemble.predict_proba(X)
+
+
+def export_onnx(model, n_features: int) -> bytes:
+    """Serialized ONNX graph of an XGBoost classifier taking float32 rows."""
+    import onnxmltools
+    from onnxmltools.convert.common.data_types import FloatTensorType
+
+    onnx_model = onnxmltools.convert_xgboost(
+        serving_booster(model), initial_types=[("input", FloatTensorType([None, n_features]))]
+    )
+    return onnx_model.SerializeToString()
+
+
+def onnx_path(model_path: Path) -> Path:
+    """Where the ONNX export of a model file is kept: next to it, .onnx suffix."""
+    return Path(model_path).with_suffix(".onnx")
+
+
+class OnnxBackend(InferenceBackend):
+    name = "onnx"
+
+    def __init__(self, model_bytes: bytes, intra_op_threads: int = ONNX_INTRA_OP_THREADS):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(model_bytes, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = "probabilities"
+
+    @classmethod
+    def from_model(cls, model, n_features: int, model_path: Optional[Path] = None) -> "OnnxBackend":
+        """
+        Export the model (or reuse the export next to model_path when it
+        is newer than the model file) and open an ONNX Runtime session.
+        """
+        if model_path is None:
+            return cls(export_onnx(model, n_features))
+        model_path = Path(model_path)
+        path = onnx_path(model_path)
+        if path.exists() and path.stat().st_mtime >= model_path.stat().st_mtime:
+            return cls(path.read_bytes())
+
+        model_bytes = export_onnx(model, n_features)
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            tmp_path.write_bytes(model_bytes)
+            os.replace(tmp_path, path)
+            print(f"✅ Exported {model_path.name} to {path.name}")
+        except OSError as e:
+            print(f"⚠️ Could not save ONNX export {path}: {e}")
+        return cls(model_bytes)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.session.run([self.output_name], {self.input_name: X})[0]
+
+
+BACKENDS = ("xgboost", "numpy", "onnx")
+
+
+def make_backend(model, n_features: int, name: str = GRADE_INFERENCE_BACKEND,
+                 model_path: Optional[Path] = None) -> InferenceBackend:
+    """Backend `name` for a loaded grade model; xgboost when it can't be built."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name} (expected one of {', '.join(BACKENDS)})")
+    if name == "xgboost":
+        return XGBoostBackend(model)
+    if not hasattr(model, "get_booster"):
+        print(f"⚠️ The {name} backend needs an XGBoost model, using xgboost")
+        return XGBoostBackend(model)
+    try:
+        if name == "numpy":
+            return TreeEnsembleBackend.from_model(model)
+        return OnnxBackend.from_model(model, n_features, model_path)
+    except Exception as e:
+        print(f"⚠️ Could not build the {name} inference backend, using xgboost: {e}")
+        return XGBoostBackend(model)
@@ -0,0 +1,133 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from services.metrics import Histogram
+
+# Max rows per model call; 1 turns batching off (callers predict directly)
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "32"))
+# Longest the first row of a batch waits for more rows to arrive
+INFERENCE_BATCH_WAIT_MS = float(os.getenv("INFERENCE_BATCH_WAIT_MS", "2"))
+
+
+class InferenceDispatcher:
+    """
+    Micro-batches single-row predictions from concurrent callers.
+
+    Callers hand in one encoded input row and block on the result. A
+    worker thread takes the first queued row and keeps collecting rows
+    until it has max_batch_size of them or max_wait_ms has passed since
+    the first, then runs predict_batch once on the stacked rows and hands
+    each caller its own output row. A lone caller waits at most
+    max_wait_ms for company.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = INFERENCE_BATCH_SIZE,
+        max_wait_ms: float = INFERENCE_BATCH_WAIT_MS,
+        name: str = "inference",
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128])
+        self.queue_depths = Histogram([0, 1, 2, 4, 8, 16, 32, 64, 128])
+        self.max_queue_depth = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch_size > 1 and not self._closed
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, row: np.ndarray) -> Future:
+        """Queue one 1-D input row; the future resolves to its output row."""
+        future: Future = Future()
+        if not self.enabled:
+            try:
+                future.set_result(self.predict_batch(row.reshape(1, -1))[0])
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_worker()
+        with self._lock:
+            if self._closed:
+                return self.submit(row)
+            depth = self._queue.qsize()
+            self._queue.put((row, future))
+        self.queue_depths.observe(depth)
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def predict(self, row: np.ndarray) -> np.ndarray:
+        return self.submit(row).result()
+
+    def close(self):
+        """Stop the worker once the queued rows are served; later calls predict directly."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._thread is not None:
+                self._queue.put(None)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    # Rows already queued are taken even once the window has closed
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # serve this batch, then stop
+                    break
+                batch.append(item)
+
+            self.batch_sizes.observe(len(batch))
+            try:
+                X = np.stack([row.reshape(-1) for row, _ in batch])
+                outputs = self.predict_batch(X)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "queue_depth_at_submit": self.queue_depths.snapshot(),
+            "batch_size": self.batch_sizes.snapshot(),
+        }
@@ -0,0 +1,59 @@
+import threading
+from typing import Any, Dict, Sequence
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram; each value lands in the first bucket with value <= bound."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(sorted(bounds))
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}" if self.bounds else "all"]
+        return {
+            "count": count,
+            "mean": round(total / count, 3) if count else 0.0,
+            "buckets": dict(zip(labels, counts)),
+        }
+
+
+# Millisecond buckets for StageLatency
+LATENCY_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class StageLatency:
+    """One latency Histogram (milliseconds) per named stage, created on first observation."""
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BOUNDS_MS):
+        self.bounds = tuple(bounds)
+        self._stages: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage_ms: Dict[str, float]):
+        for stage, ms in stage_ms.items():
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                with self._lock:
+                    histogram = self._stages.setdefault(stage, Histogram(self.bounds))
+            histogram.observe(ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stages = dict(self._stages)
+        return {stage: histogram.snapshot() for stage, histogram in stages.items()}
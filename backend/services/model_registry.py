@@ -0,0 +1,214 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+MODEL_DIR = Path(__file__).resolve().parents[1] / "model"
+# After a failed load, try_get() returns None without retrying for this long
+MODEL_RETRY_SECONDS = float(os.getenv("MODEL_RETRY_SECONDS", "60"))
+
+
+def _load_joblib(path: Path):
+    import joblib
+
+    return joblib.load(path)
+
+
+def _load_xgb_classifier(path: Path):
+    if path.suffix != ".json":
+        return _load_joblib(path)
+    from xgboost import XGBClassifier
+
+    model = XGBClassifier()
+    model.load_model(path)
+    return model
+
+
+def _load_feedback_index(path: Path):
+    from services.feedback_index import load_feedback_index
+
+    return load_feedback_index(path)
+
+
+def _load_feedback_vectorizer(path: Path):
+    from services.feedback_index import FEEDBACK_VECTORIZER
+
+    if FEEDBACK_VECTORIZER == "hashing":
+        from services.feedback_hashing import HashingFeedbackVectorizer, hashing_path
+
+        return HashingFeedbackVectorizer.load(hashing_path(path))
+    return _load_joblib(path)
+
+
+def _load_feedback_segments(path: Path):
+    from services.feedback_index import load_feedback_index
+    from services.feedback_segments import SegmentedFeedbackIndex
+
+    # Own base index (not the shared feedback_index), so a compacted base replaces it in memory
+    stat = path.stat()
+    return SegmentedFeedbackIndex(
+        load_feedback_index(path),
+        model_registry.get("feedback_vectorizer"),
+        base_id=f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}",
+    )
+
+
+# name -> (candidate files in order of preference, loader)
+# trained_model.json and trained_model.pkl hold the same booster; the JSON
+# export loads faster and without the pickle version warning.
+ARTEFACTS: Dict[str, tuple] = {
+    "grade_model": (("trained_model.json", "trained_model.pkl"), _load_xgb_classifier),
+    "topic_encoder": (("topic_encoder.pkl",), _load_joblib),
+    "grade_encoder": (("grade_encoder.pkl",), _load_joblib),
+    "feature_order": (("feature_order.pkl",), _load_joblib),
+    "feedback_model": (("teacher_feedback_model.pkl",), _load_joblib),
+    "feedback_index": (("teacher_feedback_model.pkl",), _load_feedback_index),
+    "feedback_segments": (("teacher_feedback_model.pkl",), _load_feedback_segments),
+    "feedback_vectorizer": (("teacher_feedback_vectorizer.pkl",), _load_feedback_vectorizer),
+}
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux /proc), None elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def deep_size(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Approximate memory held by an artefact: NumPy/SciPy buffers, the
+    serialized XGBoost booster, plus Python containers and objects.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes + (deep_size(obj.base, seen) if obj.base is not None else 0)
+    if hasattr(obj, "save_raw") and hasattr(obj, "inplace_predict"):  # xgboost.Booster
+        return len(obj.save_raw())
+    if hasattr(obj, "get_booster"):
+        try:
+            return deep_size(obj.get_booster(), seen) + sys.getsizeof(obj)
+        except Exception:
+            pass
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+class ModelRegistry:
+    """
+    Single owner of the ML artefacts in model/.
+
+    Each artefact is loaded on first use, exactly once per process, and
+    every caller gets the same object back. Callers must treat them as
+    read-only. memory_report() lists what each loaded artefact costs.
+    """
+
+    def __init__(self, model_dir: Path = MODEL_DIR, artefacts: Dict[str, tuple] = ARTEFACTS,
+                 retry_seconds: float = MODEL_RETRY_SECONDS):
+        self.model_dir = Path(model_dir)
+        self.artefacts = dict(artefacts)
+        self.retry_seconds = retry_seconds
+        self._objects: Dict[str, Any] = {}
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._errors: Dict[str, str] = {}
+        self._retry_at: Dict[str, float] = {}  # name -> monotonic time try_get() may load it again
+        self._locks = {name: threading.Lock() for name in self.artefacts}
+
+    def path(self, name: str) -> Path:
+        """File an artefact is (or would be) loaded from: the first candidate that exists."""
+        candidates, _ = self.artefacts[name]
+        for filename in candidates:
+            path = self.model_dir / filename
+            if path.exists():
+                return path
+        return self.model_dir / candidates[0]
+
+    def get(self, name: str) -> Any:
+        """Shared instance of an artefact, loading it on first call."""
+        if name in self._objects:
+            return self._objects[name]
+        if name not in self.artefacts:
+            raise KeyError(f"Unknown model artefact: {name}")
+
+        with self._locks[name]:
+            if name in self._objects:
+                return self._objects[name]
+            loader: Callable[[Path], Any] = self.artefacts[name][1]
+            path = self.path(name)
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            try:
+                obj = loader(path)
+            except Exception as e:
+                self._errors[name] = str(e)
+                raise
+            elapsed = time.perf_counter() - started
+            rss_after = _rss_bytes()
+
+            self._info[name] = {
+                "path": str(path),
+                "file_bytes": path.stat().st_size,
+                "object_bytes": deep_size(obj),
+                "rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+                "load_seconds": round(elapsed, 4),
+            }
+            self._errors.pop(name, None)
+            self._retry_at.pop(name, None)
+            self._objects[name] = obj
+            print(f"✅ Loaded {name} from {path.name} ({elapsed * 1000:.0f} ms)")
+            return obj
+
+    def try_get(self, name: str) -> Optional[Any]:
+        """
+        Like get(), but returns None when the artefact can't be loaded. A
+        failure is logged once and remembered for retry_seconds, so callers
+        on the request path don't retry the load on every call.
+        """
+        if name in self._objects:
+            return self._objects[name]
+        retry_at = self._retry_at.get(name)
+        if retry_at is not None and time.monotonic() < retry_at:
+            return None
+        try:
+            return self.get(name)
+        except Exception as e:
+            self._retry_at[name] = time.monotonic() + self.retry_seconds
+            print(f"⚠️ Could not load {name} (next try in {self.retry_seconds:.0f} s): {e}")
+            return None
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._objects
+
+    def memory_report(self) -> Dict[str, Any]:
+        artefacts = {}
+        for name in self.artefacts:
+            if name in self._info:
+                artefacts[name] = {"loaded": True, **self._info[name]}
+            else:
+                artefacts[name] = {"loaded": False, "error": self._errors.get(name)}
+        return {
+            "artefacts": artefacts,
+            "total_object_bytes": sum(info["object_bytes"] for info in self._info.values()),
+            "process_rss_bytes": _rss_bytes(),
+        }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,275 @@
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ml_utils import GRADE_MODEL_VERSION, GradePredictor
+from services.inference_backends import GRADE_INFERENCE_BACKEND, InferenceBackend, make_backend
+from services.model_registry import MODEL_DIR, _load_xgb_classifier, model_registry
+from services.prediction_cache import prediction_cache
+from services.scoring_cache import scoring_cache
+
+# Which grade model version the API processes serve; rewritten on every swap/rollback
+MODEL_STATE_PATH = Path(os.getenv("MODEL_STATE_PATH", str(MODEL_DIR / "active_grade_model.json")))
+# How often each process looks at MODEL_STATE_PATH for swaps made by another worker
+MODEL_STATE_CHECK_SECONDS = float(os.getenv("MODEL_STATE_CHECK_SECONDS", "5"))
+
+
+_load_ids = itertools.count(1)
+
+
+class ModelVersion:
+    """
+    One loaded grade model: its version label, file, inference backend and
+    warmed-up predictor. cache_id tells apart two loads of the same label
+    in the prediction cache.
+    """
+
+    def __init__(self, version: str, model_file: str, model, backend: Optional[InferenceBackend] = None):
+        self.version = version
+        self.model_file = model_file
+        self.cache_id = f"{version}#{next(_load_ids)}"
+        self.predictor = GradePredictor(
+            model,
+            model_registry.get("feature_order"),
+            model_registry.get("grade_encoder"),
+            model_registry.get("topic_encoder"),
+            cache=prediction_cache,
+            cache_id=self.cache_id,
+            backend=backend,
+        )
+        self.loaded_at = datetime.now(timezone.utc)
+        self.warm_up_ms: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "model_file": self.model_file,
+            "cache_id": self.cache_id,
+            "backend": self.predictor.backend.name,
+            "loaded_at": self.loaded_at.isoformat(),
+            "warm_up_ms": self.warm_up_ms,
+        }
+
+
+class GradeModelVersions:
+    """
+    Active and previous grade model, swappable without a restart.
+
+    Callers take current() once per request and use its predictor and
+    version together, so a request that started on the old model finishes
+    on it. load() builds and warms up the new model before swapping; the
+    old one is kept as previous for an instant rollback().
+
+    The choice is written to MODEL_STATE_PATH; other worker processes
+    notice the change within MODEL_STATE_CHECK_SECONDS and load the same
+    version in the background.
+
+    Every version is served through the inference backend named by
+    backend (GRADE_INFERENCE_BACKEND).
+    """
+
+    def __init__(
+        self,
+        model_dir: Path = MODEL_DIR,
+        state_path: Path = MODEL_STATE_PATH,
+        check_seconds: float = MODEL_STATE_CHECK_SECONDS,
+        backend: str = GRADE_INFERENCE_BACKEND,
+    ):
+        self.model_dir = Path(model_dir)
+        self.state_path = Path(state_path)
+        self.check_seconds = check_seconds
+        self.backend = backend
+        self.active: Optional[ModelVersion] = None
+        self.previous: Optional[ModelVersion] = None
+        self.loading: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._state_mtime: Optional[float] = None
+        self._next_check = 0.0
+
+    # --- Serving ---
+
+    def current(self) -> ModelVersion:
+        """The version new requests should use."""
+        if self.active is None:
+            with self._lock:
+                if self.active is None:
+                    self._bootstrap()
+        elif time.monotonic() >= self._next_check:
+            self._check_state()
+        return self.active
+
+    def _version(self, version: str, path: Path, model) -> ModelVersion:
+        n_features = len(model_registry.get("feature_order"))
+        entry = ModelVersion(version, path.name, model, make_backend(model, n_features, self.backend, path))
+        entry.warm_up_ms = self._warm_up(entry.predictor)
+        return entry
+
+    def _default_version(self) -> ModelVersion:
+        return self._version(GRADE_MODEL_VERSION, model_registry.path("grade_model"), model_registry.get("grade_model"))
+
+    def _bootstrap(self):
+        state = self._read_state()
+        target = (state or {}).get("active")
+        if target and target["version"] != GRADE_MODEL_VERSION:
+            try:
+                self.active = self._build(target["version"], target["model_file"])
+                return
+            except Exception as e:
+                print(f"⚠️ Could not load grade model {target['version']} from {target['model_file']}: {e}")
+        self.active = self._default_version()
+
+    # --- Loading and swapping ---
+
+    def _model_path(self, model_file: str) -> Path:
+        if not model_file or Path(model_file).name != model_file:
+            raise ValueError("model_file must be a file name inside the model directory")
+        path = self.model_dir / model_file
+        if not path.exists():
+            raise FileNotFoundError(f"Model file {model_file} not found")
+        return path
+
+    def _build(self, version: str, model_file: str) -> ModelVersion:
+        path = self._model_path(model_file)
+        return self._version(version, path, _load_xgb_classifier(path))
+
+    @staticmethod
+    def _warm_up(predictor: GradePredictor) -> float:
+        """First inference calls (and a shape check) before the model takes traffic."""
+        started = time.perf_counter()
+        for batch_size in (1, 32):
+            X = np.zeros((batch_size, len(predictor.feature_order)), dtype=np.float32)
+            proba = np.asarray(predictor.predict_proba_batch(X))
+            if proba.shape != (batch_size, len(predictor.grades)):
+                raise ValueError(
+                    f"Model returns {proba.shape[-1]} classes, grade encoder has {len(predictor.grades)}"
+                )
+        predictor.predict_proba({})
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def load(self, version: str, model_file: str, write_state: bool = True) -> ModelVersion:
+        """Load, warm up and activate a model version (blocking)."""
+        self._model_path(model_file)
+        self.loading[version] = {"status": "loading", "model_file": model_file}
+        try:
+            entry = self._build(version, model_file)
+        except Exception as e:
+            self.loading[version] = {"status": "failed", "model_file": model_file, "error": str(e)}
+            print(f"❌ Loading grade model {version} failed: {e}")
+            raise
+        self.loading.pop(version, None)
+        self._activate(entry)
+        if write_state:
+            self._write_state()
+        print(f"✅ Grade model {version} ({model_file}) is now active (warm-up {entry.warm_up_ms} ms)")
+        return entry
+
+    def load_in_background(self, version: str, model_file: str, write_state: bool = True):
+        """Validate the request now, then load() in a background thread."""
+        self._model_path(model_file)
+        if self.loading.get(version, {}).get("status") == "loading":
+            raise ValueError(f"Model version {version} is already loading")
+        self.loading[version] = {"status": "loading", "model_file": model_file}
+
+        def run():
+            try:
+                self.load(version, model_file, write_state)
+            except Exception:
+                pass  # recorded in self.loading
+
+        threading.Thread(target=run, name=f"load-{version}", daemon=True).start()
+
+    def _activate(self, entry: ModelVersion):
+        self.current()
+        with self._lock:
+            dropped = self.previous
+            relabelled = entry.version in {self.active.version, dropped.version if dropped else None}
+            self.previous, self.active = self.active, entry
+        # Nothing new is routed to the version that fell off; its queued rows are still served
+        if dropped is not None and dropped is not entry:
+            dropped.predictor.dispatcher.close()
+            prediction_cache.invalidate(dropped.cache_id)
+        # Submission results are cached per version label, which now means another model
+        if relabelled:
+            scoring_cache.clear()
+
+    def rollback(self, write_state: bool = True) -> ModelVersion:
+        """Swap back to the previous version; it is still loaded, so this is instant."""
+        self.current()
+        with self._lock:
+            if self.previous is None:
+                raise ValueError("No previous model version to roll back to")
+            self.active, self.previous = self.previous, self.active
+        if write_state:
+            self._write_state()
+        print(f"✅ Rolled back grade model to {self.active.version}")
+        return self.active
+
+    # --- Shared state between worker processes ---
+
+    def _read_state(self) -> Optional[Dict[str, Any]]:
+        try:
+            self._state_mtime = os.stat(self.state_path).st_mtime
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read {self.state_path}: {e}")
+            return None
+
+    def _write_state(self):
+        def describe(entry):
+            return {"version": entry.version, "model_file": entry.model_file} if entry else None
+
+        state = {
+            "active": describe(self.active),
+            "previous": describe(self.previous),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+        self._state_mtime = os.stat(self.state_path).st_mtime
+
+    def _check_state(self):
+        """Follow a swap or rollback made by another process."""
+        if not self._state_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = time.monotonic() + self.check_seconds
+            try:
+                mtime = os.stat(self.state_path).st_mtime
+            except OSError:
+                return
+            if mtime == self._state_mtime:
+                return
+            target = (self._read_state() or {}).get("active")
+            if not target or target["version"] == self.active.version:
+                return
+            if self.previous is not None and self.previous.version == target["version"]:
+                self.rollback(write_state=False)
+            elif self.loading.get(target["version"], {}).get("status") != "loading":
+                self.load_in_background(target["version"], target["model_file"], write_state=False)
+        except Exception as e:
+            print(f"⚠️ Could not follow grade model change: {e}")
+        finally:
+            self._state_lock.release()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active.to_dict() if self.active else None,
+            "previous": self.previous.to_dict() if self.previous else None,
+            "loading": dict(self.loading),
+        }
+
+
+grade_models = GradeModelVersions()
@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "50000"))
+
+
+class PredictionCache:
+    """
+    LRU cache of grade probabilities keyed by (model id, encoded feature row).
+
+    Most features are coarse (0/0.5/1 scores, small counts, rubric points in
+    steps of 10), so far fewer distinct rows reach the model than there are
+    submissions. The key is the exact float32 row the model sees, so a hit
+    returns exactly what the model would have. Cached arrays are read-only.
+
+    Each loaded model gets its own id; invalidate(model_id) drops its
+    entries when a hot swap retires it.
+    """
+
+    def __init__(self, max_size: int = PREDICTION_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[Hashable, bytes], np.ndarray]" = OrderedDict()
+        self._sizes: Counter = Counter()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def make_key(model_id: Hashable, row: np.ndarray) -> Tuple[Hashable, bytes]:
+        return model_id, np.ascontiguousarray(row, dtype=np.float32).tobytes()
+
+    def get(self, key: Tuple[Hashable, bytes]) -> Optional[np.ndarray]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple[Hashable, bytes], value: np.ndarray) -> np.ndarray:
+        """Store a copy of value and return the cached (read-only) array."""
+        value = np.array(value, dtype=np.float32)
+        value.setflags(write=False)
+        if self.max_size <= 0:
+            return value
+        with self._lock:
+            if key not in self._entries:
+                self._sizes[key[0]] += 1
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                (model_id, _), _ = self._entries.popitem(last=False)
+                self._sizes[model_id] -= 1
+        return value
+
+    def invalidate(self, model_id: Hashable) -> int:
+        """Drop every entry of one model; returns how many were removed."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == model_id]
+            for key in stale:
+                del self._entries[key]
+            self._sizes.pop(model_id, None)
+            self.invalidated += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            row_bytes = len(next(iter(self._entries))[1]) if self._entries else 0
+            value_bytes = next(iter(self._entries.values())).nbytes if self._entries else 0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "invalidated": self.invalidated,
+                "payload_bytes": len(self._entries) * (row_bytes + value_bytes),
+                "entries_per_model": {str(model_id): n for model_id, n in self._sizes.items() if n},
+            }
+
+
+prediction_cache = PredictionCache()
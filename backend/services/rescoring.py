@@ -0,0 +1,148 @@
+import json
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from feature_extractor import feature_extractor
+from ml_utils import TEACHER_FEEDBACK_MODEL_VERSION
+from models import AI_Score, Homework, Homework_Submission, Scoring_Criteria, Student_Homework, Subject_Class_Level
+from services.feature_store import feature_row, save_features
+from services.model_versions import ModelVersion, grade_models
+from services.scoring_cache import scoring_cache
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _submission_rows_query(homework_id=None, class_level_id=None, date_from=None, date_to=None):
+    # One scoring criteria row per homework, the same one .first() picks on submit
+    criteria_ids = (
+        select(func.min(Scoring_Criteria.id).label("id"))
+        .where(Scoring_Criteria.homework_id.isnot(None))
+        .group_by(Scoring_Criteria.homework_id)
+        .subquery()
+    )
+
+    stmt = (
+        select(
+            Homework_Submission.id,
+            Homework_Submission.submission_text,
+            Homework.description,
+            Scoring_Criteria.topic,
+            Scoring_Criteria.difficulty_1to5,
+        )
+        .join(Student_Homework, Homework_Submission.student_homework_id == Student_Homework.id)
+        .join(Homework, Student_Homework.homework_id == Homework.id)
+        .join(Scoring_Criteria, Scoring_Criteria.homework_id == Homework.id)
+        .join(criteria_ids, criteria_ids.c.id == Scoring_Criteria.id)
+        .order_by(Homework_Submission.id)
+    )
+
+    if homework_id is not None:
+        stmt = stmt.where(Homework.id == homework_id)
+    if class_level_id is not None:
+        stmt = stmt.join(
+            Subject_Class_Level, Homework.subject_class_level_id == Subject_Class_Level.id
+        ).where(Subject_Class_Level.class_level_id == class_level_id)
+    if date_from is not None:
+        stmt = stmt.where(Homework_Submission.submission_date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(Homework_Submission.submission_date <= date_to)
+    return stmt
+
+
+def _score_chunk(chunk, served: ModelVersion):
+    """Features and grades for one chunk; cached rows skip extraction and prediction."""
+    keys = [
+        scoring_cache.submission_key(
+            text, description, topic, difficulty, served.version, TEACHER_FEEDBACK_MODEL_VERSION
+        )
+        for _, text, description, topic, difficulty in chunk
+    ]
+    cached = [scoring_cache.get(key) for key in keys]
+    features = [entry["features"] if entry else None for entry in cached]
+    grades = [entry["predicted_grade"] if entry else None for entry in cached]
+
+    missing = [i for i, entry in enumerate(cached) if entry is None]
+    for i in missing:
+        _, text, description, topic, difficulty = chunk[i]
+        features[i] = feature_extractor.extract(text, description, topic, difficulty)
+
+    predicted = served.predictor.predict_many([features[i] for i in missing])
+    for i, grade in zip(missing, predicted):
+        grades[i] = grade
+        # No feedback comment here; the submit path fills it in on a later hit
+        scoring_cache.put(keys[i], {"features": features[i], "predicted_grade": grade, "teacher_comment": None})
+
+    return features, grades
+
+
+def rescore_submissions(
+    db: Session,
+    homework_id: Optional[int] = None,
+    class_level_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    served: Optional[ModelVersion] = None,
+) -> dict:
+    """
+    Re-run grade prediction over existing submissions and add new AI_Score rows.
+
+    Rows are streamed from the DB in chunks of chunk_size; the rows of each
+    chunk not found in the scoring cache are encoded together and predicted
+    by the grade model version being served (grade_models.current() unless
+    given), through its inference backend and prediction cache, and the
+    chunk is written with one bulk INSERT into ai_scores and
+    submission_features. Writes go through a second session so the read
+    cursor stays open across commits.
+    """
+    served = served or grade_models.current()
+    model_version = served.version
+    started = time.perf_counter()
+    total_rows = 0
+    chunks = 0
+
+    stmt = _submission_rows_query(homework_id, class_level_id, date_from, date_to)
+    result = db.execute(stmt.execution_options(yield_per=chunk_size))
+
+    with Session(bind=db.get_bind()) as writer:
+        for chunk in result.partitions():
+            features, grades = _score_chunk(chunk, served)
+
+            predicted_at = datetime.now(timezone.utc)
+            writer.execute(
+                insert(AI_Score),
+                [
+                    {
+                        "homework_submission_id": row[0],
+                        "predicted_score": int(f["rubric_points"]),
+                        "predicted_band": grade,
+                        "prediction_model_version": model_version,
+                        "predicted_at": predicted_at,
+                        "confidence_level": Decimal("0.95"),
+                        "analysis_data": json.dumps(f, ensure_ascii=False),
+                    }
+                    for row, f, grade in zip(chunk, features, grades)
+                ],
+            )
+            save_features(
+                writer,
+                [feature_row(row[0], model_version, f) for row, f in zip(chunk, features)],
+            )
+            writer.commit()
+
+            total_rows += len(chunk)
+            chunks += 1
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": total_rows,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(total_rows / elapsed, 1) if elapsed > 0 else 0.0,
+        "model_version": model_version,
+    }
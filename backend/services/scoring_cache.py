@@ -0,0 +1,86 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+SCORING_CACHE_SIZE = int(os.getenv("SCORING_CACHE_SIZE", "10000"))
+
+
+class ScoringCache:
+    """
+    LRU cache of scoring results keyed by a content hash of
+    (submission text, homework scoring criteria, model version).
+
+    Each entry holds the extracted feature dict, the predicted grade and the
+    chosen feedback comment, so a resubmitted or re-scored text skips
+    feature extraction, prediction and the kNN lookup. Callers store the
+    feedback_generation() the comment was picked at and only reuse it
+    while that is unchanged; features and grade stay valid meanwhile.
+    """
+
+    def __init__(self, max_size: int = SCORING_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(submission_text: Optional[str], criteria: tuple, model_version: str) -> str:
+        digest = hashlib.sha256()
+        for part in (submission_text or "", *criteria, model_version):
+            encoded = str(part).encode("utf-8")
+            # Length prefix keeps ("ab", "c") and ("a", "bc") apart
+            digest.update(len(encoded).to_bytes(8, "little"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def submission_key(
+        self,
+        submission_text: Optional[str],
+        description: Optional[str],
+        topic: Optional[str],
+        difficulty: Optional[int],
+        model_version: str,
+        feedback_version: str,
+    ) -> str:
+        """Key for a homework submission: text + the homework's scoring criteria + model versions."""
+        return self.make_key(submission_text, (description, topic, difficulty, feedback_version), model_version)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+
+scoring_cache = ScoringCache()
@@ -0,0 +1,317 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from db_setup import SessionLocal
+
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "4"))
+SCORING_QUEUE_SIZE = int(os.getenv("SCORING_QUEUE_SIZE", "256"))
+# Unfinished jobs get their heartbeat_at refreshed this often by the process running them
+SCORING_JOB_HEARTBEAT_SECONDS = float(os.getenv("SCORING_JOB_HEARTBEAT_SECONDS", "10"))
+# An unfinished job whose heartbeat is older than this belongs to a process that stopped
+SCORING_JOB_STALE_SECONDS = float(os.getenv("SCORING_JOB_STALE_SECONDS", "60"))
+STALE_JOB_ERROR = "The process running this job stopped before it finished"
+# Finished jobs kept in memory; older ones are read back from the scoring_jobs table
+FINISHED_JOBS_KEPT = 5000
+
+# Stage name -> reported progress
+STAGES = {
+    "queued": 0.0,
+    "extracting_features": 0.2,
+    "predicting": 0.4,
+    "generating_feedback": 0.6,
+    "saving": 0.8,
+    "rescoring": 0.5,  # /admin/rescore jobs: the whole run is one stage
+    "done": 1.0,
+}
+
+
+class ScoringJob:
+    """Status of one background scoring run: a homework submission, or a bulk re-score (kind "rescore")."""
+
+    def __init__(self, submission_id: Optional[int], user_id: Optional[int],
+                 on_change: Callable[["ScoringJob"], None] = None, kind: str = "submission"):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.submission_id = submission_id
+        self.user_id = user_id
+        self.status = "queued"
+        self.stage = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.heartbeat_at: Optional[datetime] = None
+        self._on_change = on_change
+
+    @classmethod
+    def from_row(cls, row) -> "ScoringJob":
+        """Snapshot of a job from its scoring_jobs row."""
+        job = cls(row.homework_submission_id, row.user_id, kind=row.kind)
+        job.id = row.id
+        job.status = row.status
+        job.stage = row.stage
+        job.result = json.loads(row.result) if row.result else None
+        job.error = row.error
+        job.created_at = row.created_at
+        job.started_at = row.started_at
+        job.finished_at = row.finished_at
+        job.heartbeat_at = row.heartbeat_at
+        return job
+
+    def is_stale(self, stale_seconds: float, now: Optional[datetime] = None) -> bool:
+        """Unfinished, and not heard from for stale_seconds (its process is gone)."""
+        if self.status not in ("queued", "running"):
+            return False
+        last = self.heartbeat_at or self.created_at
+        if last.tzinfo is None:  # SQLite hands back naive UTC
+            last = last.replace(tzinfo=timezone.utc)
+        return ((now or datetime.now(timezone.utc)) - last).total_seconds() > stale_seconds
+
+    def set_stage(self, stage: str):
+        self.stage = stage
+        if self._on_change is not None:
+            self._on_change(self)
+
+    def to_row(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "homework_submission_id": self.submission_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "stage": self.stage,
+            "result": json.dumps(self.result, ensure_ascii=False, default=str) if self.result is not None else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "heartbeat_at": self.heartbeat_at,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "submission_id": self.submission_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": STAGES.get(self.stage, 0.0),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class ScoringJobQueue:
+    """
+    Bounded worker pool for scoring submissions after they are acknowledged.
+
+    At most `max_workers` jobs run at once and at most `max_pending` are
+    queued or running; submit() returns None when the queue is full so the
+    caller can fall back to scoring inline.
+
+    Jobs run in the process that accepted them. With a session_factory,
+    every status and stage change is also written to the scoring_jobs
+    table, so get() answers for jobs of other worker processes and after a
+    restart. While a job is unfinished a heartbeat thread refreshes its
+    heartbeat_at; get() reports a job not heard from for stale_seconds as
+    failed, and fail_stale() (run at startup) records that in the table.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = SCORING_WORKERS,
+        max_pending: int = SCORING_QUEUE_SIZE,
+        session_factory: Optional[Callable[[], Any]] = None,
+        max_kept: int = FINISHED_JOBS_KEPT,
+        heartbeat_seconds: float = SCORING_JOB_HEARTBEAT_SECONDS,
+        stale_seconds: float = SCORING_JOB_STALE_SECONDS,
+    ):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scoring")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs: "OrderedDict[str, ScoringJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.session_factory = session_factory
+        self.max_kept = max_kept
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def _save(self, job: ScoringJob):
+        """Write the job's current state to the scoring_jobs table; the job carries on if that fails."""
+        if self.session_factory is None:
+            return
+        from models import Scoring_Job
+
+        job.heartbeat_at = datetime.now(timezone.utc)
+        db = None
+        try:
+            db = self.session_factory()
+            db.merge(Scoring_Job(**job.to_row()))
+            db.commit()
+        except Exception as e:
+            if db is not None:
+                db.rollback()
+            print(f"⚠️ Could not save scoring job {job.id}: {e}")
+        finally:
+            if db is not None:
+                db.close()
+
+    def _ensure_heartbeat(self):
+        if self.session_factory is not None and self._heartbeat is None:
+            with self._lock:
+                if self._heartbeat is None:
+                    self._heartbeat = threading.Thread(target=self._beat, name="scoring-heartbeat", daemon=True)
+                    self._heartbeat.start()
+
+    def _beat(self):
+        """Refresh heartbeat_at of this process's unfinished jobs with one UPDATE per interval."""
+        from sqlalchemy import update
+
+        from models import Scoring_Job
+
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                ids = [job.id for job in self._jobs.values() if job.finished_at is None]
+            if not ids:
+                continue
+            db = None
+            try:
+                db = self.session_factory()
+                db.execute(
+                    update(Scoring_Job)
+                    .where(Scoring_Job.id.in_(ids), Scoring_Job.finished_at.is_(None))
+                    .values(heartbeat_at=datetime.now(timezone.utc))
+                )
+                db.commit()
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                print(f"⚠️ Could not refresh scoring job heartbeats: {e}")
+            finally:
+                if db is not None:
+                    db.close()
+
+    def fail_stale(self) -> int:
+        """Mark unfinished jobs whose heartbeat stopped as failed. Returns how many were marked."""
+        if self.session_factory is None:
+            return 0
+        from sqlalchemy import and_, or_, update
+
+        from models import Scoring_Job
+
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=self.stale_seconds)
+        db = None
+        try:
+            db = self.session_factory()
+            result = db.execute(
+                update(Scoring_Job)
+                .where(
+                    Scoring_Job.status.in_(("queued", "running")),
+                    or_(
+                        Scoring_Job.heartbeat_at < cutoff,
+                        and_(Scoring_Job.heartbeat_at.is_(None), Scoring_Job.created_at < cutoff),
+                    ),
+                )
+                .values(status="failed", error=STALE_JOB_ERROR, finished_at=now)
+            )
+            db.commit()
+            return result.rowcount
+        except Exception as e:
+            if db is not None:
+                db.rollback()
+            print(f"⚠️ Could not clean up stale scoring jobs: {e}")
+            return 0
+        finally:
+            if db is not None:
+                db.close()
+
+    def submit(
+        self,
+        submission_id: Optional[int],
+        fn: Callable[[ScoringJob], Dict[str, Any]],
+        user_id: Optional[int] = None,
+        kind: str = "submission",
+    ) -> Optional[ScoringJob]:
+        if not self._slots.acquire(blocking=False):
+            return None
+
+        job = ScoringJob(submission_id, user_id, on_change=self._save, kind=kind)
+        self._save(job)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_kept:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.finished_at is None:
+                    break
+                self._jobs.popitem(last=False)
+
+        self._ensure_heartbeat()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: ScoringJob, fn: Callable[[ScoringJob], Dict[str, Any]]):
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        self._save(job)
+        try:
+            job.result = fn(job)
+            job.stage = "done"
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"❌ Scoring job {job.id} failed: {e}")
+            traceback.print_exc()
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            self._save(job)
+            self._slots.release()
+
+    def get(self, job_id: str) -> Optional[ScoringJob]:
+        """
+        The job if this process runs (or recently ran) it, else its last
+        saved state; an unfinished job whose heartbeat stopped is reported
+        as failed.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self.session_factory is None:
+            return job
+        from models import Scoring_Job
+
+        db = self.session_factory()
+        try:
+            row = db.get(Scoring_Job, job_id)
+        finally:
+            db.close()
+        if row is None:
+            return None
+        job = ScoringJob.from_row(row)
+        if job.is_stale(self.stale_seconds):
+            job.status, job.error = "failed", STALE_JOB_ERROR
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+
+scoring_jobs = ScoringJobQueue(session_factory=SessionLocal)
@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+# 0 runs scoring inline in the calling thread (handy for tests and dev)
+SCORING_PROCESSES = int(os.getenv("SCORING_PROCESSES", "2"))
+# Processes for ScoringService.score_many (POST /ml/score/batch); one per core by default, 1 runs inline
+SCORE_BATCH_PROCESSES = int(os.getenv("SCORE_BATCH_PROCESSES") or os.cpu_count() or 1)
+
+DEFAULT_FEEDBACK = "Bra försök! Fortsätt öva på att motivera varje steg tydligare."
+
+
+def _load_feedback_models():
+    from services.model_registry import model_registry
+
+    # FeedbackIndex answers the same queries as the sklearn kNN model with one sparse product;
+    # the segmented index adds the comments graded since (services/feedback_segments.py)
+    return model_registry.try_get("feedback_segments"), model_registry.try_get("feedback_vectorizer")
+
+
+def _warm_up() -> int:
+    import feature_extractor  # noqa: F401
+
+    _load_feedback_models()
+    return os.getpid()
+
+
+def _warm_up_heuristic_scorer() -> int:
+    import ml_service  # noqa: F401
+
+    return os.getpid()
+
+
+def compute_feedback(submission_text: str) -> Dict[str, Any]:
+    """Nearest teacher comment for a text. Falls back to a generic comment on failure."""
+    import ml_utils
+    from services.feedback_corpus import feedback_corpus
+
+    feedback_model, feedback_vectorizer = _load_feedback_models()
+    if not (feedback_model and feedback_vectorizer):
+        return {"teacher_comment": DEFAULT_FEEDBACK, "feedback_ok": True}
+    try:
+        comment = ml_utils.generate_teacher_feedback(
+            feedback_model, feedback_vectorizer, feedback_model.comments(feedback_corpus), submission_text
+        )
+        return {"teacher_comment": comment, "feedback_ok": True}
+    except Exception as e:
+        print(f"⚠️ Feedback generation failed: {e}")
+        return {"teacher_comment": DEFAULT_FEEDBACK, "feedback_ok": False}
+
+
+def compute_scoring(
+    submission_text: str,
+    description: str,
+    topic: str,
+    difficulty: int,
+    with_feedback: bool = True,
+) -> Dict[str, Any]:
+    """
+    Features and (optionally) teacher feedback for one submission. The grade
+    is predicted by the caller, where the inference dispatcher can batch
+    it with other requests.
+    """
+    from feature_extractor import feature_extractor
+
+    features = feature_extractor.extract(submission_text, description, topic, difficulty)
+    result = {"features": features}
+    if with_feedback:
+        result.update(compute_feedback(submission_text))
+    return result
+
+
+class ScoringPool:
+    """
+    Process pool for the CPU-bound part of scoring (feature extraction
+    and the kNN feedback lookup), so it neither holds the GIL in the web
+    process nor stalls the event loop.
+
+    Workers are spawned lazily and load the models once each (warm_up
+    runs in each of them on start()). With processes=0, or if the pool
+    breaks, calls run inline instead, and with processes=0 start() warms
+    up this process, the one that will use the models.
+    """
+
+    def __init__(self, processes: int = SCORING_PROCESSES, warm_up: Callable[[], int] = _warm_up):
+        self.processes = processes
+        self.warm_up = warm_up
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.processes <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        print("⚠️ Scoring process pool broke, restarting it and scoring inline")
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _call(self, fn, *args):
+        executor = self._get_executor()
+        if executor is None:
+            return fn(*args)
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            self._discard(executor)
+            return fn(*args)
+
+    def map(self, fn, *iterables) -> List[Any]:
+        """fn over the items spread across the workers; results in input order."""
+        args = list(zip(*iterables))
+        executor = self._get_executor() if args else None
+        if executor is None:
+            return [fn(*a) for a in args]
+        try:
+            return list(executor.map(fn, *zip(*args)))
+        except BrokenProcessPool:
+            self._discard(executor)
+            return [fn(*a) for a in args]
+
+    def start(self):
+        """Spawn the workers and load their models ahead of the first request."""
+        executor = self._get_executor()
+        if executor is None:
+            self.warm_up()
+        else:
+            for future in [executor.submit(self.warm_up) for _ in range(self.processes)]:
+                future.result()
+
+    def score(self, submission_text, description, topic, difficulty, with_feedback=True) -> Dict[str, Any]:
+        return self._call(compute_scoring, submission_text, description, topic, difficulty, with_feedback)
+
+    def feedback(self, submission_text) -> Dict[str, Any]:
+        return self._call(compute_feedback, submission_text)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+scoring_pool = ScoringPool()
+score_batch_pool = ScoringPool(SCORE_BATCH_PROCESSES, warm_up=_warm_up_heuristic_scorer)
@@ -0,0 +1,266 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Candidate grade model file in model/ to run next to the active model; empty turns shadow mode off
+SHADOW_MODEL_FILE = os.getenv("SHADOW_MODEL_FILE", "")
+# Label stored in Shadow_Metric.model_name (defaults to the file name without extension)
+SHADOW_MODEL_VERSION = os.getenv("SHADOW_MODEL_VERSION", "")
+# Share of scored submissions that are also sent to the candidate
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "1.0"))
+# Observations waiting for the shadow worker; beyond this they are dropped, never waited for
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+# A metrics window is written after this many comparisons or seconds, whichever comes first
+SHADOW_WINDOW_SIZE = int(os.getenv("SHADOW_WINDOW_SIZE", "500"))
+SHADOW_WINDOW_SECONDS = float(os.getenv("SHADOW_WINDOW_SECONDS", "300"))
+
+_STOP = object()
+
+
+def _load_candidate(model_file: str):
+    from ml_utils import GradePredictor
+    from services.inference_backends import make_backend
+    from services.model_registry import MODEL_DIR, _load_xgb_classifier, model_registry
+
+    path = MODEL_DIR / model_file
+    if Path(model_file).name != model_file or not path.exists():
+        raise FileNotFoundError(f"Shadow model file {model_file} not found in {MODEL_DIR}")
+    model = _load_xgb_classifier(path)
+    feature_order = model_registry.get("feature_order")
+    return GradePredictor(
+        model,
+        feature_order,
+        model_registry.get("grade_encoder"),
+        model_registry.get("topic_encoder"),
+        backend=make_backend(model, len(feature_order), model_path=path),  # same backend as the active model
+    )
+
+
+class _Window:
+    """Comparisons since the last write to shadow_metrics."""
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.monotonic()
+        self.primary_version: Optional[str] = None
+        self.count = 0
+        self.agreements = 0
+        self.pairs: Counter = Counter()
+        self.primary_ms: List[float] = []
+        self.shadow_ms: List[float] = []
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4)}
+
+
+class ShadowEvaluator:
+    """
+    Runs a candidate grade model on live traffic without touching the
+    response.
+
+    The scoring path calls observe() after it has its grade, with the time
+    the active model took to give it; that only puts them on a bounded
+    queue (or drops them when it is full). A worker thread times the
+    candidate on the same features, compares its grade with the one the
+    user got, and every window writes one Shadow_Metric row per model with
+    the agreement rate and latency percentiles.
+    """
+
+    def __init__(
+        self,
+        model_file: str = SHADOW_MODEL_FILE,
+        version: str = SHADOW_MODEL_VERSION,
+        sample_rate: float = SHADOW_SAMPLE_RATE,
+        queue_size: int = SHADOW_QUEUE_SIZE,
+        window_size: int = SHADOW_WINDOW_SIZE,
+        window_seconds: float = SHADOW_WINDOW_SECONDS,
+        load_candidate: Callable[[str], Any] = _load_candidate,
+        session_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self.model_file = model_file
+        self.version = version or os.path.splitext(model_file)[0]
+        self.sample_rate = sample_rate
+        self.window_size = window_size
+        self.window_seconds = window_seconds
+        self._load_candidate = load_candidate
+        self._session_factory = session_factory
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max(1, queue_size))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._window = _Window()
+        self.candidate = None
+        self.error: Optional[str] = None
+        self.observed = 0
+        self.dropped = 0
+        self.compared = 0
+        self.agreements = 0
+        self.windows_written = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.model_file) and self.error is None
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="shadow-model", daemon=True)
+                    self._thread.start()
+
+    def observe(self, served, features: Dict[str, Any], predicted_grade: str, primary_ms: float):
+        """Hand one live prediction and its served latency (ms) to the shadow worker; never blocks."""
+        if not self.enabled or predicted_grade == "N/A":
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((served, dict(features), predicted_grade, primary_ms))
+            self.observed += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        try:
+            self.candidate = self._load_candidate(self.model_file)
+            print(f"✅ Shadow model {self.version} loaded from {self.model_file}")
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ Shadow model {self.model_file} could not be loaded: {e}")
+            return
+
+        while True:
+            timeout = max(0.1, self.window_seconds - (time.monotonic() - self._window.started))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self.flush()
+                return
+            if item is not None:
+                try:
+                    self._compare(*item)
+                except Exception as e:
+                    print(f"⚠️ Shadow comparison failed: {e}")
+            window = self._window
+            if window.count and (
+                window.count >= self.window_size or time.monotonic() - window.started >= self.window_seconds
+            ):
+                self.flush()
+
+    def _compare(self, served, features: Dict[str, Any], predicted_grade: str, primary_ms: float):
+        candidate = self.candidate
+        started = time.perf_counter()
+        proba = candidate.predict_proba_batch(candidate.encode(features))
+        shadow_ms = (time.perf_counter() - started) * 1000
+        shadow_grade = candidate.grades[int(np.argmax(proba[0]))]
+
+        agree = shadow_grade == predicted_grade
+        window = self._window
+        if window.primary_version not in (None, served.version):
+            self.flush()  # the active model changed: start a new comparison
+            window = self._window
+        window.primary_version = served.version
+        window.count += 1
+        window.agreements += agree
+        window.pairs[f"{predicted_grade}->{shadow_grade}"] += 1
+        window.primary_ms.append(primary_ms)
+        window.shadow_ms.append(shadow_ms)
+        self.compared += 1
+        self.agreements += agree
+
+    def stop(self, timeout: float = 5.0):
+        """Compare what is queued, write the last window and stop the worker."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def flush(self):
+        """Write the current window to shadow_metrics and start a new one (worker thread only)."""
+        window, self._window = self._window, _Window()
+        if not window.count:
+            return
+        rows = self._metric_rows(window)
+        try:
+            session_factory = self._session_factory
+            if session_factory is None:
+                from db_setup import SessionLocal as session_factory
+            from models import Shadow_Metric
+
+            with session_factory() as db:
+                db.add_all([Shadow_Metric(**row) for row in rows])
+                db.commit()
+            self.windows_written += 1
+        except Exception as e:
+            print(f"⚠️ Could not store shadow metrics: {e}")
+
+    def _metric_rows(self, window: _Window) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        agreement = round(window.agreements / window.count, 4)
+        details = json.dumps({
+            "agreements": window.agreements,
+            "pairs": dict(window.pairs),  # "served grade->shadow grade": count
+            "dropped_total": self.dropped,
+        })
+        rows = []
+        for evaluation, name, other, latencies in (
+            ("primary", window.primary_version, self.version, window.primary_ms),
+            ("shadow", self.version, window.primary_version, window.shadow_ms),
+        ):
+            p = _percentiles(latencies)
+            rows.append({
+                "model_name": name,
+                "evaluation": evaluation,
+                "compared_to": other,
+                "total_predictions": window.count,
+                "agreement_rate": agreement,
+                "latency_p50_ms": p["p50"],
+                "latency_p95_ms": p["p95"],
+                "latency_p99_ms": p["p99"],
+                "window_started_at": window.started_at,
+                "details": details,
+                "created_at": now,
+            })
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        window = self._window
+        return {
+            "enabled": self.enabled,
+            "model": self.version or None,
+            "error": self.error,
+            "sample_rate": self.sample_rate,
+            "observed": self.observed,
+            "dropped": self.dropped,
+            "compared": self.compared,
+            "agreement_rate": round(self.agreements / self.compared, 4) if self.compared else None,
+            "queue_depth": self._queue.qsize(),
+            "windows_written": self.windows_written,
+            "current_window": {
+                "count": window.count,
+                "primary_ms": _percentiles(list(window.primary_ms)),
+                "shadow_ms": _percentiles(list(window.shadow_ms)),
+            },
+        }
+
+
+shadow_evaluator = ShadowEvaluator()
@@ -0,0 +1,247 @@
+"""
+One-pass indicator scan for the heuristic ScoringService.
+
+The analyzers in ml_service used to run every indicator pattern over the
+submission on its own: 40+ passes per text, most of them with
+re.IGNORECASE. Here each indicator is a tuple of hit names (any of them
+counts), and scan_submission() records every hit at once:
+
+- keywords (lowercase names, matched case-insensitively anywhere in the
+  text) and the few patterns that need context (steps, numbers, powers,
+  informal words) are one trie-shaped alternation. It sits in a lookahead,
+  so every position is tried, and runs over the case-folded text, where
+  literals are fast to match. Each distinct match is classified once;
+- single-character classes are tested on the text's distinct characters;
+- the rest (lowercase a)-d), the cased "därför"/"så", a digit operation)
+  are cheap checks on the original text.
+
+Folding maps İ, ı and ſ first: they are the only characters for which
+re.IGNORECASE and str.lower() disagree on the letters used here. Hits
+are exactly those of the original re.search(pattern, text, flags) calls.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+# Hit names other than keywords are uppercase
+STEP_NUMBER = "STEP_NUMBER"          # steg 2 / step 2 (any case)
+NUMBER_PAREN = "NUMBER_PAREN"        # 2)
+DECIMAL = "DECIMAL"                  # 2.5 / 2,5
+SECTION = "SECTION"                  # 1. 2. 3. 4.
+POWER = "POWER"                      # x2, x^2, x², x³, y², y³ (any case)
+PART = "PART"                        # a) b) c) d), lowercase only
+DIGIT_OPERATION = "DIGIT_OPERATION"  # a digit, then ×, * or +, then a digit, on one line
+CASED_THEREFORE = "CASED_THEREFORE"  # "därför", lowercase only
+CASED_SO = "CASED_SO"                # "så", lowercase only
+
+# Single-character classes, with the flags the analyzers used them with
+CHARACTER_CLASSES: Dict[str, "re.Pattern"] = {
+    "COMPARISON": re.compile(r'[=≠<>≤≥≈]', re.IGNORECASE),
+    "OPERATOR": re.compile(r'[+\-×÷*/^]', re.IGNORECASE),
+    "CALCULUS": re.compile(r'∫|∑|∏|√|∆|∂', re.IGNORECASE),
+    "GREEK": re.compile(r'[αβγδεθλμπσφψω]', re.IGNORECASE),
+    "DIGIT": re.compile(r'\d'),
+    "VARIABLE": re.compile(r'[xyz]', re.IGNORECASE),
+    "ARROW": re.compile(r'→|⇒'),
+    "TIMES": re.compile(r'×'),
+    "PLUS": re.compile(r'\+'),
+    "EQUALS": re.compile(r'='),
+    "PUNCTUATION": re.compile(r'[.!?]'),
+}
+
+# --- Indicator tables (one entry per original pattern) ---
+
+DEPTH_INDICATORS = (
+    ("därför", "therefore", "således", "hence", "consequently"),
+    ("eftersom", "because", "due to", "på grund av"),
+    ("exempelvis", "till exempel", "for example", "such as"),
+    ("kontroll", "verification", "check", "verifi"),
+    ("analys", "analysis", "undersök", "investigate"),
+    ("steg", "step"),
+    ("lösning", "solution"),
+    ("given", "givet"),
+    ("slutsats", "conclusion"),
+    ("identifiera", "identify"),
+)
+
+MATH_SYMBOLS = (
+    ("COMPARISON",),
+    ("OPERATOR",),
+    ("CALCULUS",),
+    ("GREEK",),
+    ("sin", "cos", "tan", "log", "ln", "exp", "lim"),
+    (DECIMAL,),
+    (POWER,),
+    ("DIGIT",),
+    ("VARIABLE",),
+    ("ARROW",),
+)
+
+MATH_STRUCTURES = (
+    ("lösning", "solution", "svar", "answer"),
+    ("bevis", "proof", "visa", "show"),
+    ("given", "givet", "antag", "assume"),
+    ("därför", "therefore", "thus", "så"),
+    (STEP_NUMBER, NUMBER_PAREN),
+    ("ekvation", "equation"),
+    ("faktor", "factor"),
+    ("andragrad", "quadratic"),
+    ("standardform", "standard form"),
+    ("nollprodukt", "zero product"),
+)
+
+# (indicator, score added when present)
+PROBLEM_SOLVING = (
+    (("kontroll", "check", "verifi"), 0.08),
+    (("substitution", "insättning", "ersätt"), 0.04),
+    (("multipliceras", "adderas", "TIMES", "PLUS"), 0.04),
+    (("nollprodukt", "zero product"), 0.04),
+)
+
+SECTIONS = ((PART,), (SECTION,))
+
+TECH_TERMS = ("ekvation", "funktion", "derivata", "integral", "gränsvärde", "asymptot", "koefficient")
+
+INFORMAL_WORDS = ("typ", "liksom", "asså", "kanske")
+
+MATH_TOPICS = (
+    ("algebra", "geometri", "trigonometri", "kalkyl", "statistik"),
+    ("ekvation", "funktion", "graf", "koordinat"),
+    ("sannolikhet", "frekvens", "medelvärde"),
+    ("derivata", "integral", "gränsvärde"),
+    ("vektor", "matris", "determinant"),
+    ("andragrad", "kvadrat", "faktor"),
+    (DIGIT_OPERATION,),
+    ("lösning", "solution", "svar"),
+    ("multipliceras", "adderas"),
+)
+
+CONCLUSION = ("svar:", "answer:", "slutsats:", "conclusion:", "resultat:", "result:")
+
+SHOWS_WORK = ("EQUALS", "ARROW", CASED_THEREFORE, CASED_SO)
+
+_CASED_KEYWORDS = {CASED_THEREFORE: "därför", CASED_SO: "så"}
+
+
+def _keywords(*tables) -> Tuple[str, ...]:
+    names = set()
+    for table in tables:
+        for entry in table:
+            entry = entry[0] if isinstance(entry[-1], float) else entry
+            names.update((entry,) if isinstance(entry, str) else entry)
+    return tuple(sorted(name for name in names if not name.isupper()))
+
+
+KEYWORDS = _keywords(DEPTH_INDICATORS, MATH_SYMBOLS, MATH_STRUCTURES, PROBLEM_SOLVING,
+                     (TECH_TERMS,), MATH_TOPICS, (CONCLUSION,))
+
+# Keyword -> keywords it contains (itself included): a hit on one is a hit on all
+_CONTAINED = {k: tuple(other for other in KEYWORDS if other in k) for k in KEYWORDS}
+
+
+def _trie_pattern(words: Iterable[Tuple[str, ...]]) -> str:
+    """
+    Alternation of words, given as tuples of regex atoms, as a prefix trie.
+    Atoms leaving a node match different characters, so at any position
+    the pattern matches the longest word.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for atom in word:
+            node = node.setdefault(atom, {})
+        node[""] = {}
+    def build(node) -> str:
+        branches = [atom + build(child) for atom, child in sorted(node.items()) if atom]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + pattern + ")?" if "" in node else pattern
+    return build(trie)
+
+
+# Keywords plus the patterns that need context, as one trie over the folded text. The
+# informal words are the only zero-width branch (\b...\b); no keyword starts where one
+# of them does. "steg 2" also counts as "steg".
+_SCANNER = re.compile("(?=(" + _trie_pattern(
+    [tuple(map(re.escape, keyword)) for keyword in KEYWORDS]
+    + [(r"(?<!\w)", *word, r"(?!\w)") for word in INFORMAL_WORDS]
+    + [("s", "t", "e", letter, " ", r"\d") for letter in "gp"]
+    + [("x", r"\d"), ("x", r"\^", r"\d"), ("x", "²"), ("x", "³"), ("y", "²"), ("y", "³")]
+    + [(r"\d", "[.,)]"), (r"\d", "[.,)]", r"\d")]
+) + "))")
+_UNFOLDED = re.compile("[İıſ]")
+_FOLD = str.maketrans({"İ": "i", "ı": "i", "ſ": "s"})
+_PART = re.compile(r'[abcd]\)')
+_DIGIT = re.compile(r'\d')
+_LAST_DIGIT = re.compile(r'.*\d')
+_OPERATION_SIGN = re.compile(r'[×*+]')
+_SENTENCE_END = re.compile(r'[.!?]+')
+_WORD = re.compile(r'\b\w+\b')
+
+
+@dataclass(frozen=True)
+class SubmissionScan:
+    hits: FrozenSet[str]
+    step_count: int       # non-overlapping "steg N" / "step N", any case
+    informal_count: int   # whole informal words, any case
+    sentences: List[str]  # re.split(r'[.!?]+', text)
+    has_many_words: bool  # more than 20 \b\w+\b words
+
+    def has(self, indicator: Iterable[str]) -> bool:
+        return not self.hits.isdisjoint(indicator)
+
+    def count(self, indicators) -> int:
+        return sum(1 for indicator in indicators if not self.hits.isdisjoint(indicator))
+
+
+def _has_digit_operation(text: str) -> bool:
+    """re.search(r'(\\d+.*[×\\*].*\\d+|\\d+.*\\+.*\\d+)', text) in linear time."""
+    for line in text.split("\n"):
+        first = _DIGIT.search(line)
+        if first is not None and _OPERATION_SIGN.search(line, first.end(), _LAST_DIGIT.match(line).end() - 1):
+            return True
+    return False
+
+
+def scan_submission(text: str) -> SubmissionScan:
+    """Every indicator hit in text, in one scan of the case-folded text."""
+    folded = (text.translate(_FOLD) if _UNFOLDED.search(text) else text).lower()
+    hits = set()
+    step_count = informal_count = 0
+    for match, n in Counter(_SCANNER.findall(folded)).items():
+        if match in _CONTAINED:
+            hits.update(_CONTAINED[match])
+        elif match in INFORMAL_WORDS:
+            informal_count += n
+        elif match[0].isdecimal():  # \d[.,)]\d?
+            if match[1] == ")":
+                hits.add(NUMBER_PAREN)
+            if match[1] in ".," and len(match) == 3:
+                hits.add(DECIMAL)
+            if match[1] == "." and match[0] in "1234":
+                hits.add(SECTION)
+        elif match[0] in "xy":
+            hits.add(POWER)
+        else:  # steg 2 / step 2
+            hits.add(STEP_NUMBER)
+            hits.update(_CONTAINED[match[:4]])
+            step_count += n
+
+    characters = "".join(set(text))
+    hits.update(name for name, pattern in CHARACTER_CLASSES.items() if pattern.search(characters))
+    hits.update(name for name, word in _CASED_KEYWORDS.items() if word in text)
+    if _PART.search(text):
+        hits.add(PART)
+    if _has_digit_operation(text):
+        hits.add(DIGIT_OPERATION)
+
+    return SubmissionScan(
+        hits=frozenset(hits),
+        step_count=step_count,
+        informal_count=informal_count,
+        sentences=_SENTENCE_END.split(text),
+        has_many_words=sum(1 for _ in islice(_WORD.finditer(text), 21)) > 20,
+    )
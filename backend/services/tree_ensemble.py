@@ -0,0 +1,215 @@
+"""
+Pure-NumPy evaluator for the XGBoost grade model.
+
+export_tree_ensemble() flattens trained_model.json into NumPy arrays (one
+entry per node: feature index, threshold, first child, default direction,
+leaf value) and TreeEnsemble walks every tree for a whole
+batch at once with fancy indexing, one tree level per step.
+
+Export from backend/:
+    python -m services.tree_ensemble model/trained_model.json model/trained_model_trees.npz
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+SUPPORTED_OBJECTIVES = ("multi:softprob", "multi:softmax")
+
+
+def _parse_base_score(value, num_class: int) -> np.ndarray:
+    # "5E-1" in most versions, "[5E-1,5E-1,...]" when stored per class
+    if isinstance(value, str) and value.startswith("["):
+        scores = np.array(json.loads(value), dtype=np.float64)
+    else:
+        scores = np.full(num_class, float(value), dtype=np.float64)
+    return np.broadcast_to(scores, (num_class,)).copy()
+
+
+def _flatten_tree(tree: dict):
+    """
+    Renumbers one XGBoost tree breadth-first so both children of a node sit
+    next to each other: right child == left child + 1. Returns the node
+    arrays (child ids local to the tree) and the tree depth.
+    """
+    left, right = tree["left_children"], tree["right_children"]
+    order, depth_of = [0], {0: 0}
+    for node in order:
+        if left[node] != -1:
+            order += [left[node], right[node]]
+            depth_of[left[node]] = depth_of[right[node]] = depth_of[node] + 1
+    new_id = {node: i for i, node in enumerate(order)}
+
+    feature, threshold, child, default_left, value = [], [], [], [], []
+    for node in order:
+        if left[node] == -1:
+            feature.append(0)
+            threshold.append(np.nan)  # x >= NaN is always False: leaves stay put
+            child.append(new_id[node])
+            default_left.append(True)
+            value.append(tree["split_conditions"][node])
+        else:
+            feature.append(tree["split_indices"][node])
+            threshold.append(tree["split_conditions"][node])
+            child.append(new_id[left[node]])
+            default_left.append(bool(tree["default_left"][node]))
+            value.append(0.0)
+    return (feature, threshold, child, default_left, value), max(depth_of.values())
+
+
+class TreeEnsemble:
+    """
+    Flattened multi-class tree ensemble.
+
+    Every node stores its first child; the walk moves a row to
+    child + (x >= threshold), and leaves point to themselves, so all rows
+    can take the same number of steps. Trees are stored deepest first: at
+    step d only the first active[d] trees can still be on an internal node.
+    Single-leaf trees are folded into the per-class bias.
+    """
+
+    ARRAYS = ("feature", "threshold", "child", "default_left", "value",
+              "roots", "tree_class", "active", "bias")
+
+    def __init__(self, feature, threshold, child, default_left, value,
+                 roots, tree_class, active, bias, objective="multi:softprob"):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.child = np.asarray(child, dtype=np.intp)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.tree_class = np.asarray(tree_class, dtype=np.intp)
+        self.active = np.asarray(active, dtype=np.intp)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.objective = str(objective)
+        self.num_class = len(self.bias)
+
+        # The first step is the same node for every row: gather whole features
+        self._root_feature = self.feature[self.roots]
+        self._root_threshold = self.threshold[self.roots]
+        self._root_child = self.child[self.roots]
+        self._root_default_left = self.default_left[self.roots]
+        # (trees, classes) one-hot so per-class sums are one matmul
+        self._class_matrix = np.zeros((len(self.roots), self.num_class), dtype=np.float32)
+        self._class_matrix[np.arange(len(self.roots)), self.tree_class] = 1.0
+
+    @property
+    def max_depth(self) -> int:
+        return len(self.active)
+
+    @classmethod
+    def from_xgboost_json(cls, model_json: dict) -> "TreeEnsemble":
+        learner = model_json["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective {objective}")
+        booster = learner["gradient_booster"]
+        if booster["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster {booster['name']}")
+        num_class = int(learner["learner_model_param"]["num_class"])
+        bias = _parse_base_score(learner["learner_model_param"]["base_score"], num_class)
+
+        kept = []
+        for tree, tree_class in zip(booster["model"]["trees"], booster["model"]["tree_info"]):
+            if any(split_type != 0 for split_type in tree.get("split_type", [])):
+                raise ValueError("Categorical splits are not supported")
+            if tree["left_children"][0] == -1:
+                bias[tree_class] += tree["split_conditions"][0]
+            else:
+                kept.append((tree, tree_class))
+
+        flattened = [_flatten_tree(tree) for tree, _ in kept]
+        depths = [depth for _, depth in flattened]
+        feature, threshold, child, default_left, value = [], [], [], [], []
+        roots, tree_classes = [], []
+        for i in sorted(range(len(kept)), key=lambda i: -depths[i]):
+            (tree_feature, tree_threshold, tree_child, tree_default_left, tree_value), _ = flattened[i]
+            offset = len(feature)
+            roots.append(offset)
+            tree_classes.append(kept[i][1])
+            feature += tree_feature
+            threshold += tree_threshold
+            child += [offset + c for c in tree_child]
+            default_left += tree_default_left
+            value += tree_value
+
+        max_depth = max(depths, default=0)
+        active = [sum(1 for depth in depths if depth > d) for d in range(max_depth)]
+        return cls(feature, threshold, child, default_left, value,
+                   roots, tree_classes, active, bias, objective)
+
+    @classmethod
+    def from_json(cls, path: Union[str, Path]) -> "TreeEnsemble":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_xgboost_json(json.load(f))
+
+    def save(self, path: Union[str, Path]):
+        np.savez(path, objective=np.array(self.objective), **{name: getattr(self, name) for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TreeEnsemble":
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in cls.ARRAYS}, objective=str(data["objective"]))
+
+    def predict_margin(self, X) -> np.ndarray:
+        """Raw per-class scores, shape (n_rows, num_class)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n = len(X)
+        has_missing = bool(np.isnan(X).any())
+        # Trees along axis 0, rows along axis 1: the trees still walking at
+        # each step are one contiguous block nodes[:k]
+        XT = np.ascontiguousarray(X.T)
+
+        x = np.take(XT, self._root_feature, axis=0)
+        go_right = x >= self._root_threshold[:, None]
+        if has_missing:
+            go_right |= np.isnan(x) & ~self._root_default_left[:, None]
+        nodes = self._root_child[:, None] + go_right
+
+        XT_flat = XT.reshape(-1)
+        column = np.arange(n)[None, :]
+        for k in self.active[1:]:
+            current = nodes[:k]
+            x = np.take(XT_flat, np.take(self.feature, current) * n + column)
+            go_right = x >= np.take(self.threshold, current)
+            if has_missing:
+                go_right |= np.isnan(x) & ~np.take(self.default_left, current)
+            nodes[:k] = np.take(self.child, current) + go_right
+
+        margin = (self._class_matrix.T @ np.take(self.value, nodes)).T
+        return margin + self.bias
+
+    def predict_proba(self, X) -> np.ndarray:
+        margin = self.predict_margin(X)
+        margin -= margin.max(axis=1, keepdims=True)
+        np.exp(margin, out=margin)
+        margin /= margin.sum(axis=1, keepdims=True)
+        return margin.astype(np.float32)
+
+    def predict(self, X) -> np.ndarray:
+        return np.argmax(self.predict_margin(X), axis=1)
+
+
+def export_tree_ensemble(json_path: Union[str, Path], out_path: Union[str, Path]) -> TreeEnsemble:
+    ensemble = TreeEnsemble.from_json(json_path)
+    ensemble.save(out_path)
+    return ensemble
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flatten an XGBoost JSON model into NumPy arrays")
+    parser.add_argument("json_path")
+    parser.add_argument("out_path")
+    args = parser.parse_args()
+    ensemble = export_tree_ensemble(args.json_path, args.out_path)
+    print(f"✅ Exported {len(ensemble.roots)} trees ({len(ensemble.feature)} nodes, "
+          f"depth {ensemble.max_depth}) to {args.out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+
+class WarmUp:
+    """
+    Runs the slow startup steps (model loading, scoring workers) in a
+    background thread so the API can answer liveness checks right away.
+    Readiness waits for it to finish.
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def ok(self) -> bool:
+        return self.done and all(step["status"] == "ok" for step in self.steps.values())
+
+    def start(self, steps: Dict[str, Callable[[], Any]]):
+        if self._thread is not None:
+            return
+        self.steps = {name: {"status": "pending"} for name in steps}
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(steps,), name="warm-up", daemon=True)
+        self._thread.start()
+
+    def _run(self, steps: Dict[str, Callable[[], Any]]):
+        for name, step in steps.items():
+            started = time.perf_counter()
+            try:
+                step()
+                self.steps[name] = {"status": "ok"}
+            except Exception as e:
+                self.steps[name] = {"status": "failed", "error": str(e)}
+                print(f"❌ Warm-up step {name} failed: {e}")
+                traceback.print_exc()
+            self.steps[name]["seconds"] = round(time.perf_counter() - started, 3)
+        self.finished_at = time.perf_counter()
+        print(f"✅ Warm-up finished in {self.finished_at - self.started_at:.2f} s")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "done": self.done,
+            "seconds": round((self.finished_at or time.perf_counter()) - self.started_at, 3) if self.started_at else None,
+            "steps": self.steps,
+        }
+
+
+warm_up = WarmUp()
@@ -0,0 +1,59 @@
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_utils import calculate_submission_features
+from feature_extractor import FeatureExtractor, SUBMISSION_KEYWORDS
+
+DESCRIPTIONS = [
+    "Lös ekvationen 2x + 5 = 11",
+    "Räkna ut 10% av 50 kr",
+    "Beräkna arean av en triangel",
+    "Beräkna medelvärdet av talen 2, 4, 6",
+    "Rita grafen till funktionen y = 2x + 1",
+    "Problemlösning med procent och Pythagoras",
+]
+
+TOPICS = ["Algebra", "Ekvationer", "Procent", "Geometri", "Funktioner", "Unknown"]
+
+SAMPLE_TEXTS = [
+    "",
+    "   \n  ",
+    "x = 3",
+    "2x + 5 = 11\n2x = 6\nx = 3",
+    "Först flyttar jag 5, sedan dividerar jag med 2. Därför blir x = 3 eftersom 2*3 = 6",
+    "I used a diagram and a table, but it was unclear.\nThen I convert cm to m.\nSolve: 7 * 8 = 54",
+    "Perfect solution, no mistakes, optimal and complex.",
+    "Wrong formula and wrong method, misapplied rule. Used Pythagoras incorrectly.",
+    "10% av 200 = 20 procent\nmedelvärde = (1+2+3) / 3 = 2",
+    "We add, subtract and multiply because the equation needs it.\nThe variable is isolated.\nFinally we simplify.",
+]
+
+
+def _random_text(rng):
+    words = list(SUBMISSION_KEYWORDS) + ["jag", "talet", "svar", "12", "3 + 4 = 7", "6 - 2 = 5", "?", "!", "."]
+    lines = []
+    for _ in range(rng.randint(1, 12)):
+        lines.append(" ".join(rng.choice(words) for _ in range(rng.randint(1, 14))))
+    return "\n".join(lines)
+
+
+def test_feature_extractor_matches_individual_functions():
+    extractor = FeatureExtractor()
+    rng = random.Random(42)
+    texts = SAMPLE_TEXTS + [_random_text(rng) for _ in range(500)]
+
+    for i, text in enumerate(texts):
+        description = DESCRIPTIONS[i % len(DESCRIPTIONS)]
+        topic = TOPICS[i % len(TOPICS)]
+        difficulty = 1 + i % 5
+
+        expected = calculate_submission_features(text, description, topic, difficulty)
+        actual = extractor.extract(text, description, topic, difficulty)
+        assert actual == expected, f"Mismatch for text {i}: {text!r}"
+
+
+if __name__ == "__main__":
+    test_feature_extractor_matches_individual_functions()
+    print("✅ FeatureExtractor matches ml_utils")
@@ -0,0 +1,84 @@
+import math
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from feature_extractor import feature_extractor
+from models import Submission_Feature
+from services.feature_store import FEATURE_COLUMNS, export_arrow, export_numpy, feature_row, save_features
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Submission_Feature.__table__.create(engine)
+    return Session(engine)
+
+
+def sample_features(text):
+    return feature_extractor.extract(text, "Lös ekvationen 2x + 5 = 11", "Ekvationer", 2)
+
+
+def test_export_numpy_matches_features():
+    db = make_session()
+    texts = ["2x = 6\nx = 3", "Först adderar jag, sedan dividerar jag. Därför x = 3.", ""]
+    features = [sample_features(t) for t in texts]
+    save_features(db, [feature_row(i + 1, "v1", f) for i, f in enumerate(features)])
+    save_features(db, [feature_row(1, "v2", features[0])])
+    db.commit()
+
+    data = export_numpy(db, model_version="v1")
+    assert data["homework_submission_id"].tolist() == [1, 2, 3]
+    assert data["topic"].tolist() == ["Ekvationer"] * 3
+    for name in FEATURE_COLUMNS:
+        assert data[name].dtype.name == "float32"
+        for value, f in zip(data[name], features):
+            assert math.isclose(value, float(f[name]), rel_tol=1e-6)
+
+    assert len(export_numpy(db)["homework_submission_id"]) == 4
+
+
+def test_save_features_overwrites_same_version():
+    db = make_session()
+    save_features(db, [feature_row(7, "v1", sample_features("x = 3"))])
+    updated = sample_features("Först 2x = 6, sedan x = 3. Därför stämmer det.")
+    save_features(db, [feature_row(7, "v1", updated)])
+    db.commit()
+
+    data = export_numpy(db)
+    assert data["homework_submission_id"].tolist() == [7]
+    assert math.isclose(data["reasoning_quality"][0], updated["reasoning_quality"], rel_tol=1e-6)
+
+
+def test_missing_values_export_as_nan():
+    db = make_session()
+    save_features(db, [feature_row(1, "v1", {"topic": "Algebra", "rubric_points": 3})])
+    db.commit()
+
+    data = export_numpy(db)
+    assert data["rubric_points"][0] == 3.0
+    assert math.isnan(data["steps_count"][0])
+
+
+def test_export_arrow():
+    pytest.importorskip("pyarrow")
+    db = make_session()
+    save_features(db, [feature_row(i, "v1", sample_features("x = %d" % i)) for i in range(1, 6)])
+    db.commit()
+
+    table = export_arrow(db)
+    assert table.num_rows == 5
+    assert table.column_names[:3] == ["homework_submission_id", "model_version", "topic"]
+    assert str(table.schema.field("rubric_points").type) == "float"
+
+
+if __name__ == "__main__":
+    test_export_numpy_matches_features()
+    test_save_features_overwrites_same_version()
+    test_missing_values_export_as_nan()
+    test_export_arrow()
+    print("✅ All feature store tests passed")
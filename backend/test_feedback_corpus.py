@@ -0,0 +1,99 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from services.feedback_corpus import FeedbackCorpus, cache_path_for
+
+
+def write_corpus(path, comments, mtime):
+    lines = ["student_text,teacher_comment_sv"] + [f"text {i},{c}" for i, c in enumerate(comments)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_lookup_by_row(tmp_path):
+    path = tmp_path / "corpus.csv"
+    write_corpus(path, ["Bra jobbat!", "", "Kontrollera räkningen – steg 2.", '"Tydligt, snyggt."'], 1_000_000)
+    corpus = FeedbackCorpus(path)
+    assert len(corpus) == 4
+    assert corpus[0] == "Bra jobbat!"
+    assert corpus[1] == ""  # an empty cell is read as NaN
+    assert corpus[2] == "Kontrollera räkningen – steg 2."
+    assert corpus[3] == corpus[-1] == "Tydligt, snyggt."
+    with pytest.raises(IndexError):
+        corpus[4]
+
+
+def test_reloads_when_mtime_changes(tmp_path):
+    path = tmp_path / "corpus.csv"
+    write_corpus(path, ["Första"], 1_000_000)
+    corpus = FeedbackCorpus(path, check_seconds=0)
+    assert corpus[0] == "Första"
+    assert not corpus.refresh()
+
+    write_corpus(path, ["Andra", "Tredje"], 1_000_100)
+    assert len(corpus) == 2 and corpus[0] == "Andra"
+    assert not corpus.refresh()
+
+
+def test_mtime_check_is_throttled(tmp_path):
+    path = tmp_path / "corpus.csv"
+    write_corpus(path, ["Första"], 1_000_000)
+    corpus = FeedbackCorpus(path, check_seconds=3600)
+    assert corpus[0] == "Första"
+
+    write_corpus(path, ["Andra"], 1_000_100)
+    assert corpus[0] == "Första"  # not checked again yet
+    corpus._next_check = 0.0
+    assert corpus[0] == "Andra"
+
+    write_corpus(path, ["Tredje"], 1_000_200)
+    assert corpus.refresh() and corpus[0] == "Tredje"  # an explicit refresh always checks
+
+
+class CountingCorpus(FeedbackCorpus):
+    parsed = 0
+
+    def _read_comments(self):
+        CountingCorpus.parsed += 1
+        return super()._read_comments()
+
+
+def test_second_process_maps_the_cached_comments(tmp_path):
+    path = tmp_path / "corpus.csv"
+    write_corpus(path, ["Bra jobbat!", "Kontrollera räkningen – steg 2."], 1_000_000)
+    CountingCorpus.parsed = 0
+    first = CountingCorpus(path)
+    assert first[1] == "Kontrollera räkningen – steg 2." and first.shared
+    assert cache_path_for(path).exists()
+
+    # Another worker opening the same CSV maps the cache instead of parsing it
+    second = CountingCorpus(path)
+    assert [second[i] for i in range(len(second))] == ["Bra jobbat!", "Kontrollera räkningen – steg 2."]
+    assert second.shared and CountingCorpus.parsed == 1
+
+    # A changed CSV rebuilds the cache
+    write_corpus(path, ["Ny kommentar"], 1_000_100)
+    assert CountingCorpus(path)[0] == "Ny kommentar" and CountingCorpus.parsed == 2
+
+
+def test_falls_back_to_memory_without_a_writable_cache(tmp_path):
+    path = tmp_path / "corpus.csv"
+    write_corpus(path, ["Bra jobbat!"], 1_000_000)
+    corpus = FeedbackCorpus(path, cache_path=tmp_path / "missing" / "corpus.bin")
+    assert corpus[0] == "Bra jobbat!" and len(corpus) == 1
+    assert not corpus.shared
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    for test in (test_lookup_by_row, test_reloads_when_mtime_changes, test_mtime_check_is_throttled,
+                 test_second_process_maps_the_cached_comments, test_falls_back_to_memory_without_a_writable_cache):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    print("✅ All feedback corpus tests passed")
@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import ml_utils
+from services.feedback_hashing import (
+    HashingFeedbackVectorizer,
+    hashing_path,
+    load_hashed_corpus,
+    save_hashed_feedback,
+    tfidf_stop_words,
+)
+from services.feedback_index import FeedbackIndex, load_feedback_index
+from services.feedback_lsh import LSHFeedbackIndex, lsh_path
+from services.model_registry import MODEL_DIR
+
+STOP_WORDS = tfidf_stop_words(MODEL_DIR / "teacher_feedback_vectorizer.pkl")
+SYLLABLES = ["be", "rä", "kn", "ing", "st", "eg", "lös", "ni", "ta", "bel", "met", "od", "tyd", "lig", "for", "mel"]
+
+
+def synthetic_comments(n, n_words=2000, seed=0, min_words=6, max_words=25):
+    """
+    Comment-like texts over n_words made-up words with Zipf frequencies,
+    plus stop words, so the vocabulary grows with the corpus as real text does.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(["".join(rng.choice(SYLLABLES, size=rng.integers(2, 5))) + str(i % 7) for i in range(n_words)])
+    weights = 1.0 / np.arange(1, n_words + 1)
+    weights /= weights.sum()
+    texts = []
+    for length in rng.integers(min_words, max_words + 1, size=n):
+        picked = list(rng.choice(words, size=length, p=weights)) + list(rng.choice(STOP_WORDS, size=length // 3))
+        rng.shuffle(picked)
+        texts.append(" ".join(picked))
+    return texts
+
+
+def test_hashing_matches_tfidf_without_collisions():
+    comments = synthetic_comments(300, n_words=400)
+    tfidf = TfidfVectorizer(max_features=3000, stop_words=STOP_WORDS).fit(comments)
+    hashing = HashingFeedbackVectorizer(20, STOP_WORDS).fit(comments)
+    assert len(hashing.idf_buckets) == len(tfidf.vocabulary_)  # no two terms share a bucket
+
+    # Queries also use words the corpus never saw; both vectorizers drop them
+    queries = synthetic_comments(100, n_words=800, seed=2)
+    expected = (tfidf.transform(queries) @ tfidf.transform(comments).T).toarray()
+    similarities = (hashing.transform(queries) @ hashing.transform(comments).T).toarray()
+    assert np.allclose(similarities, expected, atol=1e-6)
+    assert hashing.transform(["helt okända ord"]).nnz == 0
+
+
+def test_index_dtypes():
+    comments = synthetic_comments(2000)
+    hashing = HashingFeedbackVectorizer(16, STOP_WORDS).fit(comments)
+    corpus = hashing.transform(comments)
+    Q = hashing.transform(synthetic_comments(300, seed=3))
+    exact = FeedbackIndex(corpus, "float64")
+    expected, nearest = exact.search(Q, k=1)
+
+    sizes = {}
+    for dtype, tolerance in (("float32", 1e-6), ("int8", 2e-2)):
+        index = FeedbackIndex(corpus, dtype)
+        distances, indices = index.search(Q, k=1)
+        assert np.allclose(distances, expected, atol=tolerance)
+        # A different nearest row is only ever a near tie
+        true = np.take_along_axis(1.0 - exact.similarities(Q), indices, axis=1)
+        assert np.allclose(true, expected, atol=2 * tolerance)
+        sizes[dtype] = index.matrix.data.nbytes
+    assert sizes["int8"] * 4 == sizes["float32"] == exact.matrix.data.nbytes // 2
+
+    # Appending keeps the dtype and leaves the existing quantized rows as they were
+    quantized = FeedbackIndex(corpus[:1500], "int8")
+    extended = quantized.extended(corpus[1500:])
+    assert extended.dtype == "int8" and len(extended) == 2000
+    assert np.array_equal(extended.matrix[:1500].toarray(), quantized.matrix.toarray())
+    assert np.allclose(extended.scales[:1500], quantized.scales)
+
+
+def test_saved_hashed_corpus_serves_feedback():
+    comments = synthetic_comments(500, seed=4)
+    model_path = Path(tempfile.mkdtemp()) / "teacher_feedback_model.pkl"
+    hashing = HashingFeedbackVectorizer(14, STOP_WORDS)
+    save_hashed_feedback(hashing_path(model_path), hashing, hashing.fit_transform(comments))
+
+    loaded = HashingFeedbackVectorizer.load(hashing_path(model_path))
+    assert (loaded.transform(comments[:50]) != hashing.transform(comments[:50])).nnz == 0
+    assert load_hashed_corpus(hashing_path(model_path)).dtype == np.float32
+
+    for kind in ("exact", "lsh"):
+        index = load_feedback_index(model_path, kind=kind, vectorizer="hashing")
+        assert len(index) == 500
+        assert ml_utils.generate_teacher_feedback(index, loaded, comments, comments[42]) == comments[42]
+    assert isinstance(index, LSHFeedbackIndex) and lsh_path(hashing_path(model_path)).exists()
+
+
+if __name__ == "__main__":
+    test_hashing_matches_tfidf_without_collisions()
+    test_index_dtypes()
+    test_saved_hashed_corpus_serves_feedback()
+    print("✅ All feedback hashing tests passed")
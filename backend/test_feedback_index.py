@@ -0,0 +1,72 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_distances
+
+import ml_utils
+from services.feedback_index import FeedbackIndex
+from services.model_registry import model_registry
+
+FILLER = ["jag", "x", "svar", "och", "därför", "2x + 5 = 11"]
+
+
+def make_texts(n=500, seed=3, max_words=30):
+    """Submission-like texts over the feedback vocabulary (some share no word with it)."""
+    vectorizer = model_registry.get("feedback_vectorizer")
+    words = list(vectorizer.get_feature_names_out()) + FILLER
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(0, max_words))) for _ in range(n)]
+
+
+def test_search_matches_sklearn_kneighbors():
+    model = model_registry.get("feedback_model")
+    vectorizer = model_registry.get("feedback_vectorizer")
+    index = FeedbackIndex.from_model(model)
+    Q = vectorizer.transform(make_texts())
+
+    expected_distances, _ = model.kneighbors(Q, 5)
+    distances, indices = index.search(Q, k=5)
+    assert distances.shape == indices.shape == (Q.shape[0], 5)
+    assert np.allclose(distances, expected_distances, atol=1e-12)
+    # Ties may pick another row, but every returned row is really that close
+    true_distances = np.take_along_axis(cosine_distances(Q, model._fit_X), indices, axis=1)
+    assert np.allclose(np.clip(true_distances, 0, 2), distances, atol=1e-12)
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+
+def test_batch_feedback_matches_single_text_feedback():
+    model = model_registry.get("feedback_model")
+    vectorizer = model_registry.get("feedback_vectorizer")
+    index = FeedbackIndex.from_model(model)
+    comments = [f"kommentar {i}" for i in range(len(index))]
+    texts = make_texts(200, seed=7) + ["", "helt orelaterad text"]
+
+    batch = ml_utils.generate_teacher_feedback_batch(index, vectorizer, comments, texts)
+    assert batch == [ml_utils.generate_teacher_feedback(index, vectorizer, comments, t) for t in texts]
+    assert batch[-1] == ml_utils.FEEDBACK_FALLBACK  # no shared words: distance 1
+    assert ml_utils.generate_teacher_feedback_batch(index, vectorizer, comments, []) == []
+
+
+def test_small_corpus_and_zero_rows():
+    index = FeedbackIndex(np.array([[3.0, 4.0, 0.0], [0.0, 0.0, 0.0], [0.0, 2.0, 0.0]]))
+    assert np.allclose(index.matrix.toarray()[0], [0.6, 0.8, 0.0])
+    distances, indices = index.search(np.array([[0.0, 1.0, 0.0], [0.0, 0.0, 0.0]]), k=10)
+    assert indices.shape == (2, 3)
+    assert indices[0].tolist() == [2, 0, 1]
+    assert np.allclose(distances[0], [0.0, 0.2, 1.0])
+    assert np.allclose(distances[1], 1.0)
+
+    # Equal distances: the nearest neighbour is the lowest row
+    index = FeedbackIndex(np.array([[0.0, 1.0], [1.0, 0.0], [1.0, 0.0], [2.0, 0.0]]))
+    assert index.kneighbors(np.array([[1.0, 0.0]]))[1].tolist() == [[1]]
+
+
+if __name__ == "__main__":
+    test_search_matches_sklearn_kneighbors()
+    test_batch_feedback_matches_single_text_feedback()
+    test_small_corpus_and_zero_rows()
+    print("✅ All feedback index tests passed")
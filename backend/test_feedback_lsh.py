@@ -0,0 +1,132 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import scipy.sparse as sp
+
+import ml_utils
+from services.feedback_index import FeedbackIndex, load_feedback_index
+from services.feedback_lsh import LSHFeedbackIndex, lsh_path
+from services.model_registry import MODEL_DIR, model_registry
+from test_feedback_index import make_texts
+
+
+def synthetic_corpus(n, n_terms=3000, seed=0, terms_per_row=16):
+    """
+    TF-IDF-like rows for a corpus larger than the real one: each comment
+    takes most of its terms from one of n // 50 topics, plus a few random ones.
+    """
+    rng = np.random.default_rng(seed)
+    n_topics = max(10, n // 50)
+    topic_terms = rng.integers(0, n_terms, size=(n_topics, 40))
+    from_topic = terms_per_row * 3 // 4
+    columns = np.concatenate([
+        topic_terms[rng.integers(0, n_topics, size=n)[:, None], rng.integers(0, 40, size=(n, from_topic))],
+        rng.integers(0, n_terms, size=(n, terms_per_row - from_topic)),
+    ], axis=1)
+    data = rng.random((n, terms_per_row)) + 0.1
+    indptr = np.arange(0, n * terms_per_row + 1, terms_per_row)
+    matrix = sp.csr_matrix((data.ravel(), columns.ravel(), indptr), shape=(n, n_terms))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def near_queries(matrix, n, seed=1, noise=0.3):
+    """Corpus rows with jittered weights and a few extra terms, like new submissions on old topics."""
+    rng = np.random.default_rng(seed)
+    rows = matrix[rng.integers(0, matrix.shape[0], size=n)].tocoo()
+    data = rows.data * (1 + noise * rng.standard_normal(len(rows.data))).clip(0.05)
+    extra_rows = np.repeat(np.arange(n), 2)
+    extra_columns = rng.integers(0, matrix.shape[1], size=2 * n)
+    return sp.csr_matrix(
+        (np.concatenate([data, rng.random(2 * n) * noise]),
+         (np.concatenate([rows.row, extra_rows]), np.concatenate([rows.col, extra_columns]))),
+        shape=(n, matrix.shape[1]),
+    )
+
+
+class OppositeVectorizer:
+    """Maps every text to [-1, 0]: opposite to a corpus holding only [1, 0]."""
+
+    def transform(self, texts):
+        return sp.csr_matrix(np.tile([-1.0, 0.0], (len(texts), 1)))
+
+
+def recall_at_1(index, exact, Q, **kwargs) -> float:
+    """Share of queries whose approximate nearest row is as close as the exact one."""
+    expected, _ = exact.search(Q, k=1)
+    distances, _ = index.search(Q, k=1, **kwargs)
+    return float(np.mean(np.isclose(distances[:, 0], expected[:, 0], atol=1e-9)))
+
+
+def test_recall_is_tunable_and_distances_exact():
+    corpus = synthetic_corpus(5000)
+    Q = near_queries(corpus, 200)
+    exact = FeedbackIndex(corpus)
+    index = LSHFeedbackIndex.build(corpus, n_tables=8)
+
+    recalls = [recall_at_1(index, exact, Q, n_probes=p) for p in (0, 2, 8)]
+    assert recalls == sorted(recalls)
+    assert recalls[-1] >= 0.95
+
+    # Candidates are re-ranked exactly: every returned distance is the true one
+    distances, indices = index.search(Q, k=3)
+    found = indices >= 0
+    true = 1.0 - np.take_along_axis(exact.similarities(Q), np.where(found, indices, 0), axis=1)
+    assert np.allclose(distances[found], true[found], atol=1e-9)
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+
+def test_feedback_model_index_and_fallback():
+    model = model_registry.get("feedback_model")
+    vectorizer = model_registry.get("feedback_vectorizer")
+    index = LSHFeedbackIndex.from_model(model)
+    exact = FeedbackIndex.from_model(model)
+    assert recall_at_1(index, exact, vectorizer.transform(make_texts())) >= 0.95
+
+    comments = [f"kommentar {i}" for i in range(len(index))]
+    texts = make_texts(50, seed=9)
+    assert len(ml_utils.generate_teacher_feedback_batch(index, vectorizer, comments, texts)) == 50
+
+    # A query sharing no bucket gets no candidate, hence the generic comment
+    lonely = LSHFeedbackIndex.build(sp.csr_matrix([[1.0, 0.0]]), n_tables=2, n_bits=4, n_probes=0)
+    distances, indices = lonely.search(sp.csr_matrix([[-1.0, 0.0]]))
+    assert indices.tolist() == [[-1]] and np.isinf(distances[0, 0])
+    opposite = OppositeVectorizer()
+    assert ml_utils.generate_teacher_feedback(lonely, opposite, ["x"], "text") == ml_utils.FEEDBACK_FALLBACK
+    assert ml_utils.generate_teacher_feedback_batch(lonely, opposite, ["x"], ["a", "b"]) == [ml_utils.FEEDBACK_FALLBACK] * 2
+
+
+def test_index_is_saved_next_to_model_and_reused():
+    model_dir = Path(tempfile.mkdtemp())
+    model_path = model_dir / "teacher_feedback_model.pkl"
+    shutil.copy(MODEL_DIR / "teacher_feedback_model.pkl", model_path)
+    Q = model_registry.get("feedback_vectorizer").transform(make_texts(100))
+
+    built = load_feedback_index(model_path, kind="lsh")
+    saved = lsh_path(model_path)
+    assert saved.exists()
+    saved_at = saved.stat().st_mtime_ns
+    loaded = load_feedback_index(model_path, kind="lsh")
+    assert saved.stat().st_mtime_ns == saved_at  # loaded, not rebuilt
+    for a, b in zip(built.search(Q, k=2), loaded.search(Q, k=2)):
+        assert np.array_equal(a, b)
+
+    # A newer model file makes the saved index stale
+    time.sleep(0.01)
+    model_path.touch()
+    load_feedback_index(model_path, kind="lsh")
+    assert saved.stat().st_mtime_ns != saved_at
+
+
+if __name__ == "__main__":
+    test_recall_is_tunable_and_distances_exact()
+    test_feedback_model_index_and_fallback()
+    test_index_is_saved_next_to_model_and_reused()
+    print("✅ All feedback LSH tests passed")
@@ -0,0 +1,146 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import scipy.sparse as sp
+
+import ml_utils
+from services.feedback_index import FeedbackIndex
+from services.feedback_lsh import LSHFeedbackIndex
+from services.feedback_segments import SegmentedFeedbackIndex, record_feedback
+from services.model_registry import model_registry
+from test_feedback_index import make_texts
+from test_feedback_lsh import near_queries, synthetic_corpus
+
+
+def _segmented(delta_rows=256):
+    log_path = Path(tempfile.mkdtemp()) / "teacher_feedback_log.jsonl"
+    base = FeedbackIndex.from_model(model_registry.get("feedback_model"))
+    vectorizer = model_registry.get("feedback_vectorizer")
+    return SegmentedFeedbackIndex(base, vectorizer, log_path, delta_rows=delta_rows), base, vectorizer, log_path
+
+
+def _assert_same_results(index, reference, Q, k=3):
+    distances, indices = index.search(Q, k=k)
+    expected_distances, _ = reference.search(Q, k=k)
+    assert np.allclose(distances, expected_distances, atol=1e-12)
+    # Every returned row really is that close
+    true = 1.0 - np.take_along_axis(reference.similarities(Q), indices, axis=1)
+    assert np.allclose(np.clip(true, 0, 2), distances, atol=1e-12)
+
+
+def test_recorded_comment_is_matched_right_away():
+    index, base, vectorizer, log_path = _segmented()
+    comment = "Tabell och diagram passar, pröva enheter igen: räknefel."
+    text = "diagram tabell enheter räknefel pröva passar diagram"
+    distances, indices = index.search(vectorizer.transform([text]))
+    assert indices[0, 0] < len(base) and distances[0, 0] > 1e-6
+
+    assert record_feedback("x = 3, se tabellen", comment, log_path)
+    assert not record_feedback(text, "   ", log_path)
+    assert not record_feedback("", "Bra!", log_path)
+
+    # Matched by the words of the comment, as the base corpus is
+    comments = index.comments([f"kommentar {i}" for i in range(len(base))])
+    assert ml_utils.generate_teacher_feedback(index, vectorizer, comments, text) == comment
+    assert len(index) == len(comments) == len(base) + 1
+    # Base rows keep their ids and comments
+    assert comments[0] == "kommentar 0"
+
+
+def test_search_over_segments_matches_one_index_over_all_rows():
+    index, base, vectorizer, log_path = _segmented(delta_rows=8)
+    texts = make_texts(30, seed=11)
+    for text in texts[:5]:
+        record_feedback("inlämning", text or "tom", log_path)
+    Q = vectorizer.transform(make_texts(200, seed=12))
+    logged = vectorizer.transform([t or "tom" for t in texts[:5]])
+    _assert_same_results(index, base.extended(logged), Q)
+    assert index.stats()["segments"] == 1  # just the delta
+
+    for text in texts[5:]:
+        record_feedback("inlämning", text or "tom", log_path)
+    index.refresh()
+    index.wait_for_compaction(10)
+    index.compact()
+    stats = index.stats()
+    assert stats["logged_rows"] == 30 and stats["base_rows"] >= len(base) + 24 and stats["compactions"] >= 1
+    logged = vectorizer.transform([t or "tom" for t in texts])
+    _assert_same_results(index, base.extended(logged), Q)
+
+
+def test_partial_and_bad_log_lines():
+    index, base, vectorizer, log_path = _segmented()
+    with open(log_path, "wb") as f:
+        f.write(b'not json\n{"text": "x + 1 = 2", "comment": "Bra"}\n{"text": "halv')
+    assert index.refresh() == 1  # the bad line is skipped, the half-written one waits
+    with open(log_path, "ab") as f:
+        f.write(' rad", "comment": "Klar"}\n'.encode("utf-8"))
+    assert index.refresh() == 1
+    assert index.comments([])[len(base) + 1] == "Klar"
+
+
+class CountingVectorizer:
+    def __init__(self, vectorizer):
+        self.vectorizer = vectorizer
+        self.texts = 0
+
+    def transform(self, texts):
+        self.texts += len(texts)
+        return self.vectorizer.transform(texts)
+
+
+def test_restart_loads_the_compacted_base_and_reads_the_rest_of_the_log():
+    index, base, vectorizer, log_path = _segmented(delta_rows=8)
+    texts = [t or "tom" for t in make_texts(20, seed=13)]
+    for i, text in enumerate(texts, 1):
+        record_feedback("inlämning", text, log_path)
+        if i % 8 == 0 or i == len(texts):
+            index.refresh()  # two full segments and a delta of 4
+    index.wait_for_compaction(10)
+    index.compact()
+    assert index.snapshot_path.exists()
+    Q = vectorizer.transform(make_texts(100, seed=14))
+
+    counting = CountingVectorizer(vectorizer)
+    restarted = SegmentedFeedbackIndex(base, counting, log_path, delta_rows=8)
+    assert counting.texts == 20 - 16  # only what was logged after the last sealed segment
+    assert restarted.stats()["base_rows"] == len(base) + 16 and len(restarted) == len(base) + 20
+    comments = restarted.comments([""] * len(base))
+    assert [comments[len(base) + i] for i in range(20)] == texts
+    _assert_same_results(restarted, base.extended(vectorizer.transform(texts)), Q)
+
+    # Another base index, or a log that was replaced, rebuilds from the whole log
+    counting = CountingVectorizer(vectorizer)
+    SegmentedFeedbackIndex(base, counting, log_path, delta_rows=8, base_id="teacher_feedback_model.pkl:2")
+    assert counting.texts == 20
+    log_path.write_text("", encoding="utf-8")
+    record_feedback("inlämning", "Ny logg", log_path)
+    counting = CountingVectorizer(vectorizer)
+    assert len(SegmentedFeedbackIndex(base, counting, log_path, delta_rows=8)) == len(base) + 1
+    assert counting.texts == 1
+
+
+def test_lsh_extended_matches_build_over_all_rows():
+    corpus = synthetic_corpus(3000)
+    more = synthetic_corpus(500, seed=5)
+    extended = LSHFeedbackIndex.build(corpus, n_tables=4).extended(more)
+    rebuilt = LSHFeedbackIndex.build(sp.vstack([corpus, more]), n_tables=4)
+    assert np.array_equal(extended.keys, rebuilt.keys)
+    assert np.array_equal(extended.rows, rebuilt.rows)
+    Q = near_queries(sp.vstack([corpus, more]).tocsr(), 100)
+    for a, b in zip(extended.search(Q, k=2), rebuilt.search(Q, k=2)):
+        assert np.allclose(a, b)
+
+
+if __name__ == "__main__":
+    test_recorded_comment_is_matched_right_away()
+    test_search_over_segments_matches_one_index_over_all_rows()
+    test_partial_and_bad_log_lines()
+    test_restart_loads_the_compacted_base_and_reads_the_rest_of_the_log()
+    test_lsh_extended_matches_build_over_all_rows()
+    print("✅ All feedback segment tests passed")
@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import ml_utils
+from ml_utils import GradePredictor, predict_grade
+
+
+def random_features(rng):
+    features = {
+        "topic": rng.choice(list(ml_utils.topic_encoder.classes_) + ["Okänt ämne"]),
+        "difficulty_1to5": rng.randint(1, 5),
+        "steps_count": rng.randint(0, 12),
+        "steps_completeness": round(rng.random(), 2),
+        "reasoning_quality": rng.choice([0.0, 0.3, 0.6, 0.9, 1.0]),
+        "method_appropriateness": rng.choice([0.0, 0.3, 0.5, 1.0]),
+        "representation_use": rng.choice([0.0, 0.5, 1.0]),
+        "explanation_clarity": rng.choice([0.0, 0.5, 1.0]),
+        "units_handling": rng.choice([0.0, 0.5, 1.0]),
+        "language_quality": rng.choice([0.0, 0.5, 1.0]),
+        "computational_errors": rng.randint(0, 4),
+        "conceptual_errors": rng.randint(0, 2),
+        "correctness_pct": rng.choice([0, 50, 100]),
+        "originality_score": rng.choice([0.0, 0.5, 1.0]),
+        "rubric_points": rng.randint(0, 100),
+        "time_minutes": rng.randint(5, 90),
+        "external_aid_suspected": rng.choice([0.0, 0.5, 1.0]),
+    }
+    # Missing, None and string values go through the same numeric coercion
+    for name in rng.sample(sorted(features), 2):
+        choice = rng.random()
+        if choice < 0.3:
+            del features[name]
+        elif choice < 0.6:
+            features[name] = None
+        else:
+            features[name] = str(features[name])
+    return features
+
+
+def encode_rows(rows, predictor=None):
+    """Feature dicts as one float32 matrix, encoded the way GradePredictor.predict_many does it."""
+    predictor = predictor or GradePredictor(
+        ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder
+    )
+    columns = {name: [row.get(name, 0) for row in rows] for name in predictor.feature_order}
+    return predictor.encode_columns(columns, len(rows))
+
+
+def test_predictor_matches_predict_grade():
+    predictor = GradePredictor(ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder)
+    rng = random.Random(9)
+    for _ in range(1000):
+        features = random_features(rng)
+        expected = predict_grade(
+            ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder, features
+        )
+        assert predictor.predict(features) == expected, features
+
+
+def test_encode_reuses_row_and_resets_it():
+    predictor = GradePredictor(ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder)
+    first = predictor.encode({"topic": ml_utils.topic_encoder.classes_[1], "rubric_points": 40})
+    assert first.dtype.name == "float32" and first.shape == (1, len(ml_utils.feature_order))
+    assert first[0, predictor.column_index["topic"]] == 1
+    second = predictor.encode({"topic": "Okänt ämne"})
+    assert second is first
+    assert second[0, predictor.column_index["topic"]] == -1
+    assert second[0, predictor.column_index["rubric_points"]] == 0
+
+
+if __name__ == "__main__":
+    test_predictor_matches_predict_grade()
+    test_encode_reuses_row_and_resets_it()
+    print("✅ All grade predictor tests passed")
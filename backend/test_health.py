@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app as app_module
+from benchmarks.bench_startup import bench_env, measure_import
+from services.warm_up import WarmUp
+
+SessionLocal = sessionmaker(bind=create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool))
+client = TestClient(app_module.app)
+
+
+def ready_with(warm_up, session_factory=SessionLocal):
+    originals = app_module.warm_up, app_module.SessionLocal
+    app_module.warm_up, app_module.SessionLocal = warm_up, session_factory
+    try:
+        return client.get("/health/ready")
+    finally:
+        app_module.warm_up, app_module.SessionLocal = originals
+
+
+def test_ready_only_after_warm_up():
+    loaded = threading.Event()
+    warm_up = WarmUp()
+    warm_up.start({"grade_model": lambda: loaded.wait(5), "scoring_pool": lambda: None})
+
+    response = ready_with(warm_up)
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "not_ready" and body["checks"]["database"] == "ok"
+    assert body["checks"]["warm_up"]["done"] is False
+    assert client.get("/health/live").json() == {"status": "alive"}
+
+    loaded.set()
+    assert warm_up.wait(5)
+    response = ready_with(warm_up)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert {name: step["status"] for name, step in body["checks"]["warm_up"]["steps"].items()} == {
+        "grade_model": "ok", "scoring_pool": "ok",
+    }
+
+
+def test_not_ready_when_a_step_fails_or_the_database_is_down():
+    def fail():
+        raise RuntimeError("model file missing")
+
+    warm_up = WarmUp()
+    warm_up.start({"grade_model": fail})
+    assert warm_up.wait(5)
+    response = ready_with(warm_up)
+    assert response.status_code == 503
+    assert response.json()["checks"]["warm_up"]["steps"]["grade_model"]["error"] == "model file missing"
+
+    warm_up = WarmUp()
+    warm_up.start({"grade_model": lambda: None})
+    assert warm_up.wait(5)
+    unreachable = sessionmaker(bind=create_engine("sqlite:////nonexistent/dir/teachmate.db"))
+    response = ready_with(warm_up, unreachable)
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"].startswith("error:")
+
+
+def test_importing_the_app_loads_no_heavy_ml_modules():
+    # In a fresh interpreter: this one already has them from other tests
+    assert measure_import(bench_env())["heavy"] == []
+
+
+if __name__ == "__main__":
+    test_ready_only_after_warm_up()
+    test_not_ready_when_a_step_fails_or_the_database_is_down()
+    test_importing_the_app_loads_no_heavy_ml_modules()
+    print("✅ All health check tests passed")
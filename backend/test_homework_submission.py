@@ -0,0 +1,95 @@
+import os
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import app as app_module
+from db_setup import get_db
+from models import AI_Feedback, AI_Score, Homework_Submission, Scoring_Criteria, Submission_Feature
+from test_scoring_cache import TEXT, CountingPool, make_scoring_db
+
+
+@contextmanager
+def submission_client(SessionLocal, user_id=1):
+    """TestClient for the app on the given database, logged in as user_id, scoring inline."""
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    original_pool = app_module.scoring_pool
+    app_module.scoring_pool = CountingPool("Bra jobbat!")
+    app_module.app.dependency_overrides[get_db] = override_get_db
+    app_module.app.dependency_overrides[app_module.get_current_user] = lambda: SimpleNamespace(id=user_id)
+    app_module.scoring_cache.clear()
+    try:
+        yield TestClient(app_module.app)
+    finally:
+        app_module.scoring_pool = original_pool
+        app_module.app.dependency_overrides.clear()
+        app_module.scoring_cache.clear()
+
+
+def row_counts(SessionLocal):
+    db = SessionLocal()
+    try:
+        return {model.__tablename__: db.query(model).count() for model in (Homework_Submission, AI_Feedback, AI_Score, Submission_Feature)}
+    finally:
+        db.close()
+
+
+def test_resubmit_updates_the_same_row():
+    SessionLocal, (student_homework_id,) = make_scoring_db()
+    payload = {"student_homework_id": student_homework_id, "submission_text": TEXT, "submission_date": "2025-01-01T10:00:00"}
+    with submission_client(SessionLocal) as client:
+        first = client.post("/homework_submissions/", json=payload)
+        assert first.status_code == 200, first.text
+        second = client.post("/homework_submissions/", json={**payload, "submission_text": "x = 3", "is_late": "Yes"})
+        assert second.status_code == 200, second.text
+        assert second.json()["id"] == first.json()["id"]
+        assert second.json()["is_late"] == "Yes"
+
+    db = SessionLocal()
+    (submission,) = db.query(Homework_Submission).all()
+    assert (submission.submission_text, submission.is_late) == ("x = 3", "Yes")
+    assert submission.submission_date.isoformat() == "2025-01-01T10:00:00"
+    db.close()
+    # Each submit adds its own AI rows; the feature row is per submission and model version
+    assert row_counts(SessionLocal) == {"homework_submission": 1, "ai_feedback": 2, "ai_scores": 2, "submission_features": 1}
+
+
+def test_submission_and_ai_rows_commit_together():
+    SessionLocal, (student_homework_id,) = make_scoring_db()
+    commits = []
+    event.listen(SessionLocal, "after_commit", lambda session: commits.append(session))
+    payload = {"student_homework_id": student_homework_id, "submission_text": TEXT, "submission_date": "2025-01-01"}
+    with submission_client(SessionLocal) as client:
+        assert client.post("/homework_submissions/", json=payload).status_code == 200
+    assert len(commits) == 1
+    assert row_counts(SessionLocal) == {"homework_submission": 1, "ai_feedback": 1, "ai_scores": 1, "submission_features": 1}
+
+    # Scoring fails (no scoring criteria): the submission is rolled back with it
+    SessionLocal, (student_homework_id,) = make_scoring_db()
+    db = SessionLocal()
+    db.query(Scoring_Criteria).delete()
+    db.commit()
+    db.close()
+    with submission_client(SessionLocal) as client:
+        response = client.post("/homework_submissions/", json={**payload, "student_homework_id": student_homework_id})
+        assert response.status_code == 500
+        assert "Scoring criteria not found" in response.json()["detail"]
+    assert row_counts(SessionLocal) == {"homework_submission": 0, "ai_feedback": 0, "ai_scores": 0, "submission_features": 0}
+
+
+if __name__ == "__main__":
+    test_resubmit_updates_the_same_row()
+    test_submission_and_ai_rows_commit_together()
+    print("✅ All homework submission tests passed")
@@ -0,0 +1,101 @@
+import importlib.util
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import ml_utils
+from services.inference_backends import (
+    BACKENDS,
+    OnnxBackend,
+    XGBoostBackend,
+    make_backend,
+    onnx_path,
+)
+from services.model_registry import MODEL_DIR
+from services.model_versions import GradeModelVersions
+from test_grade_predictor import random_features
+from test_tree_ensemble import random_matrix, realistic_matrix
+
+HAS_ONNX = all(importlib.util.find_spec(name) for name in ("onnxruntime", "onnxmltools"))
+N_FEATURES = len(ml_utils.feature_order)
+
+
+def backends():
+    return {name: make_backend(ml_utils.model, N_FEATURES, name) for name in BACKENDS}
+
+
+def test_backends_match_xgboost():
+    built = backends()
+    assert built["numpy"].name == "numpy"
+    # Without onnxruntime the onnx switch falls back to xgboost instead of failing
+    assert built["onnx"].name == ("onnx" if HAS_ONNX else "xgboost")
+
+    for X in (realistic_matrix(), random_matrix()):
+        expected = ml_utils.model.predict_proba(X)
+        for name, backend in built.items():
+            actual = np.asarray(backend.predict_proba(X))
+            assert actual.shape == expected.shape, name
+            assert np.abs(actual - expected).max() < 1e-5, name
+            assert (actual.argmax(axis=1) == expected.argmax(axis=1)).all(), name
+
+
+def test_grade_models_serve_through_configured_backend():
+    model_dir = Path(tempfile.mkdtemp())
+    shutil.copy(MODEL_DIR / "trained_model.json", model_dir / "trained_model_v2.json")
+    rng = random.Random(4)
+    rows = [random_features(rng) for _ in range(50)]
+    expected = [ml_utils.get_grade_predictor().predict(row) for row in rows]
+
+    # Start on the copy so nothing (e.g. an onnx export) is written to the real model dir
+    state_path = model_dir / "active.json"
+    state_path.write_text(json.dumps({"active": {"version": "v2", "model_file": "trained_model_v2.json"}}))
+    for name in BACKENDS:
+        versions = GradeModelVersions(model_dir, state_path, 60.0, backend=name)
+        served = versions.current()
+        assert served.version == "v2"
+        assert versions.status()["active"]["backend"] == served.predictor.backend.name
+        assert [served.predictor.predict(row) for row in rows] == expected, name
+
+
+def test_onnx_export_is_kept_next_to_model_file():
+    model_dir = Path(tempfile.mkdtemp())
+    model_path = model_dir / "trained_model.json"
+    shutil.copy(MODEL_DIR / "trained_model.json", model_path)
+    if not HAS_ONNX:
+        assert isinstance(make_backend(ml_utils.model, N_FEATURES, "onnx", model_path), XGBoostBackend)
+        assert not onnx_path(model_path).exists()
+        return
+
+    first = OnnxBackend.from_model(ml_utils.model, N_FEATURES, model_path)
+    exported = onnx_path(model_path)
+    assert exported.exists()
+    exported_at = exported.stat().st_mtime_ns
+    second = OnnxBackend.from_model(ml_utils.model, N_FEATURES, model_path)
+    assert exported.stat().st_mtime_ns == exported_at  # reused, not exported again
+    X = realistic_matrix(100)
+    assert np.array_equal(first.predict_proba(X), second.predict_proba(X))
+
+
+def test_unknown_backend_is_rejected():
+    try:
+        make_backend(ml_utils.model, N_FEATURES, "tensorrt")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    test_backends_match_xgboost()
+    test_grade_models_serve_through_configured_backend()
+    test_onnx_export_is_kept_next_to_model_file()
+    test_unknown_backend_is_rejected()
+    print("✅ All inference backend tests passed")
@@ -0,0 +1,135 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import ml_utils
+from services.inference_dispatcher import InferenceDispatcher
+
+
+class RecordingModel:
+    """Returns each row's first value doubled and remembers the batch sizes."""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.release = threading.Event()
+
+    def __call__(self, X):
+        self.release.wait(5)
+        self.batch_sizes.append(len(X))
+        return X[:, :1] * 2
+
+
+def run_concurrently(dispatcher, n):
+    results = [None] * n
+
+    def call(i):
+        results[i] = dispatcher.predict(np.array([i, 0], dtype=np.float32))
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def test_concurrent_rows_share_batches():
+    model = RecordingModel()
+    dispatcher = InferenceDispatcher(model, max_batch_size=8, max_wait_ms=20)
+    threads, results = run_concurrently(dispatcher, 20)
+    model.release.set()
+    for t in threads:
+        t.join()
+
+    assert [float(r[0]) for r in results] == [2.0 * i for i in range(20)]
+    assert sum(model.batch_sizes) == 20
+    assert max(model.batch_sizes) <= 8
+    assert len(model.batch_sizes) < 20
+
+    stats = dispatcher.stats()
+    assert stats["batch_size"]["count"] == len(model.batch_sizes)
+    assert stats["queue_depth"] == 0
+
+
+def test_rows_a_few_ms_apart_share_a_batch():
+    model = RecordingModel()
+    model.release.set()
+    dispatcher = InferenceDispatcher(model, max_batch_size=8, max_wait_ms=200)
+    first = dispatcher.submit(np.array([1, 0], dtype=np.float32))
+    time.sleep(0.005)
+    second = dispatcher.submit(np.array([2, 0], dtype=np.float32))
+    assert [float(first.result()[0]), float(second.result()[0])] == [2.0, 4.0]
+    assert model.batch_sizes == [2]
+
+
+def test_lone_row_waits_at_most_the_window():
+    model = RecordingModel()
+    model.release.set()
+    dispatcher = InferenceDispatcher(model, max_batch_size=8, max_wait_ms=20)
+    started = time.perf_counter()
+    assert float(dispatcher.predict(np.array([3, 0], dtype=np.float32))[0]) == 6.0
+    assert time.perf_counter() - started < 1.0
+    assert model.batch_sizes == [1]
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    def broken(X):
+        raise ValueError("boom")
+
+    dispatcher = InferenceDispatcher(broken, max_batch_size=4, max_wait_ms=1)
+    try:
+        dispatcher.predict(np.zeros(3, dtype=np.float32))
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert str(e) == "boom"
+    # The worker keeps running after a failed batch
+    dispatcher.predict_batch = lambda X: X + 1
+    assert dispatcher.predict(np.zeros(3, dtype=np.float32)).tolist() == [1, 1, 1]
+
+
+def test_batch_size_one_calls_model_directly():
+    model = RecordingModel()
+    model.release.set()
+    dispatcher = InferenceDispatcher(model, max_batch_size=1)
+    assert float(dispatcher.predict(np.array([3, 0], dtype=np.float32))[0]) == 6.0
+    assert dispatcher._thread is None
+
+
+def test_grade_predictor_batched_matches_predict_grade():
+    predictor = ml_utils.GradePredictor(
+        ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder
+    )
+    rows = [
+        {"topic": topic, "difficulty_1to5": d, "rubric_points": points, "reasoning_quality": points / 100}
+        for topic in ml_utils.topic_encoder.classes_
+        for d in (1, 3, 5)
+        for points in (0, 40, 80)
+    ]
+    expected = [
+        ml_utils.predict_grade(ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder, r)
+        for r in rows
+    ]
+    results = [None] * len(rows)
+
+    def call(i):
+        results[i] = predictor.predict(rows[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(rows))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == expected
+
+
+if __name__ == "__main__":
+    test_concurrent_rows_share_batches()
+    test_rows_a_few_ms_apart_share_a_batch()
+    test_lone_row_waits_at_most_the_window()
+    test_errors_reach_every_caller_in_the_batch()
+    test_batch_size_one_calls_model_directly()
+    test_grade_predictor_batched_matches_predict_grade()
+    print("✅ All inference dispatcher tests passed")
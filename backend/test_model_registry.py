@@ -0,0 +1,100 @@
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from services.model_registry import ModelRegistry, model_registry
+
+
+def make_registry(calls):
+    model_dir = Path(tempfile.mkdtemp())
+    (model_dir / "weights.bin").write_bytes(b"x" * 64)
+
+    def load(path):
+        calls.append(path.name)
+        return {"weights": np.ones(1000, dtype=np.float64)}
+
+    return ModelRegistry(model_dir, {"weights": (("weights.npz", "weights.bin"), load)})
+
+
+def test_artefact_is_loaded_lazily_and_once():
+    calls = []
+    registry = make_registry(calls)
+    assert not registry.is_loaded("weights")
+    assert registry.memory_report()["artefacts"]["weights"]["loaded"] is False
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("weights"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # First existing candidate file is used, and every caller shares one object
+    assert calls == ["weights.bin"]
+    assert all(r is results[0] for r in results)
+
+
+def test_memory_report_counts_array_bytes():
+    registry = make_registry([])
+    registry.get("weights")
+    info = registry.memory_report()["artefacts"]["weights"]
+    assert info["loaded"] is True
+    assert info["file_bytes"] == 64
+    assert info["object_bytes"] >= 8000
+
+
+def test_unknown_and_failing_artefacts():
+    registry = make_registry([])
+    try:
+        registry.get("nope")
+        assert False, "expected KeyError"
+    except KeyError:
+        pass
+
+    registry.artefacts["broken"] = (("missing.pkl",), lambda path: open(path, "rb"))
+    registry._locks["broken"] = threading.Lock()
+    assert registry.try_get("broken") is None
+    assert registry.memory_report()["artefacts"]["broken"]["error"]
+
+
+def test_failed_load_is_not_retried_on_every_call():
+    attempts = []
+
+    def load(path):
+        attempts.append(path.name)
+        raise FileNotFoundError(path.name)
+
+    model_dir = Path(tempfile.mkdtemp())
+    registry = ModelRegistry(model_dir, {"broken": (("model.pkl",), load)}, retry_seconds=3600)
+    assert [registry.try_get("broken") for _ in range(5)] == [None] * 5
+    assert attempts == ["model.pkl"]
+
+    # Once the retry interval has passed the load is tried again
+    (model_dir / "model.pkl").write_bytes(b"ok")
+    registry.artefacts["broken"] = (("model.pkl",), lambda path: path.read_bytes())
+    registry._retry_at["broken"] = 0.0
+    assert registry.try_get("broken") == b"ok"
+    assert registry.is_loaded("broken") and "broken" not in registry._retry_at
+
+
+def test_shared_registry_serves_the_grade_model():
+    import ml_utils
+
+    assert ml_utils.model is model_registry.get("grade_model")
+    assert ml_utils.get_grade_predictor().model is ml_utils.model
+    assert list(ml_utils.model.classes_) == [0, 1, 2, 3]
+
+
+if __name__ == "__main__":
+    test_artefact_is_loaded_lazily_and_once()
+    test_memory_report_counts_array_bytes()
+    test_unknown_and_failing_artefacts()
+    test_failed_load_is_not_retried_on_every_call()
+    test_shared_registry_serves_the_grade_model()
+    print("✅ All model registry tests passed")
@@ -0,0 +1,146 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import ml_utils
+from ml_utils import GRADE_MODEL_VERSION
+from services.model_registry import MODEL_DIR
+from services.model_versions import GradeModelVersions
+from services.prediction_cache import prediction_cache
+
+FEATURES = {"topic": "Ekvationer", "difficulty_1to5": 3, "steps_count": 4, "rubric_points": 55}
+
+
+def make_versions(check_seconds=60.0):
+    model_dir = Path(tempfile.mkdtemp())
+    shutil.copy(MODEL_DIR / "trained_model.json", model_dir / "trained_model.json")
+    shutil.copy(MODEL_DIR / "trained_model.json", model_dir / "trained_model_v2.json")
+    return GradeModelVersions(model_dir, model_dir / "active.json", check_seconds)
+
+
+def test_default_version_uses_registry_model():
+    versions = make_versions()
+    served = versions.current()
+    assert served.version == GRADE_MODEL_VERSION
+    assert served.predictor.model is ml_utils.model
+    assert versions.previous is None
+
+
+def test_load_swaps_and_old_version_keeps_serving():
+    versions = make_versions()
+    old = versions.current()
+    expected = old.predictor.predict(FEATURES)
+
+    new = versions.load("v2", "trained_model_v2.json")
+    assert versions.current() is new and versions.previous is old
+    assert new.warm_up_ms is not None
+    # A request that took the old version before the swap finishes on it
+    assert old.predictor.predict(FEATURES) == expected
+    assert new.predictor.predict(FEATURES) == expected
+
+    state = json.loads(versions.state_path.read_text())
+    assert state["active"] == {"version": "v2", "model_file": "trained_model_v2.json"}
+    assert state["previous"]["version"] == GRADE_MODEL_VERSION
+
+
+def test_rollback_is_instant_and_persisted():
+    versions = make_versions()
+    old = versions.current()
+    new = versions.load("v2", "trained_model_v2.json")
+    assert versions.rollback() is old
+    assert versions.previous is new
+    assert json.loads(versions.state_path.read_text())["active"]["version"] == GRADE_MODEL_VERSION
+
+
+def test_rejects_bad_model_files():
+    versions = make_versions()
+    for model_file, error in (("../trained_model.json", ValueError), ("missing.json", FileNotFoundError)):
+        try:
+            versions.load_in_background("bad", model_file)
+        except error:
+            pass
+        else:
+            raise AssertionError(f"{model_file} was accepted")
+    assert versions.current().version == GRADE_MODEL_VERSION
+    try:
+        versions.rollback()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("rollback without a previous version")
+
+
+def test_failed_load_keeps_active_version():
+    versions = make_versions()
+    (versions.model_dir / "broken.json").write_text("{}")
+    try:
+        versions.load("broken", "broken.json")
+    except Exception:
+        pass
+    assert versions.current().version == GRADE_MODEL_VERSION
+    assert versions.loading["broken"]["status"] == "failed"
+
+
+def wait_for_version(versions, version, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if versions.current().version == version:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_other_process_follows_state_file():
+    versions = make_versions()
+    follower = GradeModelVersions(versions.model_dir, versions.state_path, check_seconds=0.0)
+    original = follower.current()
+
+    versions.load("v2", "trained_model_v2.json")
+    assert wait_for_version(follower, "v2")  # loaded in the background, then swapped
+
+    versions.rollback()
+    os.utime(versions.state_path, (1, 1))  # mtime must differ even on coarse clocks
+    assert follower.current() is original  # still loaded: swapped back at once
+
+
+def test_swap_invalidates_retired_model_only():
+    versions = make_versions()
+    first = versions.current()
+    first.predictor.predict(FEATURES)
+    second = versions.load("v2", "trained_model_v2.json")
+    second.predictor.predict(FEATURES)
+    entries = prediction_cache.stats()["entries_per_model"]
+    assert entries.get(first.cache_id) and entries.get(second.cache_id)
+
+    versions.load("v3", "trained_model.json")  # first falls out of the two slots
+    entries = prediction_cache.stats()["entries_per_model"]
+    assert first.cache_id not in entries and entries.get(second.cache_id)
+
+
+def test_closed_dispatcher_still_predicts():
+    versions = make_versions()
+    served = versions.current()
+    row = served.predictor.encode(FEATURES)[0].copy()
+    expected = served.predictor.dispatcher.predict(row)
+    served.predictor.dispatcher.close()
+    assert np.allclose(served.predictor.dispatcher.predict(row), expected)
+
+
+if __name__ == "__main__":
+    test_default_version_uses_registry_model()
+    test_load_swaps_and_old_version_keeps_serving()
+    test_rollback_is_instant_and_persisted()
+    test_rejects_bad_model_files()
+    test_failed_load_keeps_active_version()
+    test_other_process_follows_state_file()
+    test_swap_invalidates_retired_model_only()
+    test_closed_dispatcher_still_predicts()
+    print("✅ All model version tests passed")
@@ -0,0 +1,116 @@
+import io
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.predict as predict_router
+from routers.predict import Features
+
+app = FastAPI()
+app.include_router(predict_router.router)
+client = TestClient(app)
+
+TOPICS = ["Algebra", "Ekvationer", "Funktioner", "Geometri", "Procent", "Okänt ämne"]
+
+
+def make_row(rng):
+    row = {}
+    for name, field in Features.model_fields.items():
+        if field.annotation is str:
+            row[name] = rng.choice(TOPICS)
+        elif field.annotation is int:
+            row[name] = rng.randint(0, 10)
+        else:
+            row[name] = round(rng.random() * (100 if name in ("rubric_points", "correctness_pct") else 1), 2)
+    return row
+
+
+def make_rows(n=50, seed=3):
+    rng = random.Random(seed)
+    return [make_row(rng) for _ in range(n)]
+
+
+def assert_matches_single(result, row):
+    single = client.post("/predict", json=row).json()
+    assert result["prediction"] == single["prediction"]
+    for cls, p in single["probabilities"].items():
+        assert abs(result["probabilities"][cls] - p) < 1e-6
+
+
+def test_row_list_matches_single_predictions_in_order():
+    rows = make_rows()
+    body = client.post("/predict/batch", json=rows).json()
+    assert body["rows"] == body["predicted"] == len(rows) and body["failed"] == 0
+    assert [r["index"] for r in body["results"]] == list(range(len(rows)))
+    for result, row in zip(body["results"][:10], rows):
+        assert_matches_single(result, row)
+
+
+def test_columnar_json_and_arrow_match_row_list():
+    import pyarrow as pa
+
+    rows = make_rows()
+    expected = client.post("/predict/batch", json=rows).json()["results"]
+    columns = {name: [row[name] for row in rows] for name in Features.model_fields}
+    assert client.post("/predict/batch", json=columns).json()["results"] == expected
+
+    table = pa.table(columns)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post(
+        "/predict/batch", content=sink.getvalue(), headers={"content-type": "application/vnd.apache.arrow.stream"}
+    )
+    assert response.json()["results"] == expected
+
+
+def test_invalid_rows_are_reported_per_row():
+    rows = make_rows(4)
+    del rows[1]["topic"]
+    rows[2]["steps_count"] = "many"
+    body = client.post("/predict/batch", json=rows).json()
+    assert body["predicted"] == 2 and body["failed"] == 2
+    assert body["results"][1]["errors"][0]["loc"] == ["topic"]
+    assert body["results"][2]["errors"][0]["loc"] == ["steps_count"]
+    assert_matches_single(body["results"][3], rows[3])
+
+    columns = {name: [row.get(name) for row in make_rows(3)] for name in Features.model_fields}
+    columns["conceptual_errors"][0] = 1.5
+    columns["reasoning_quality"][2] = None
+    body = client.post("/predict/batch", json=columns).json()
+    assert [("errors" in r) for r in body["results"]] == [True, False, True]
+    assert body["results"][0]["errors"][0]["type"] == "int_from_float"
+
+
+def test_malformed_batches_are_rejected():
+    assert client.post("/predict/batch", json={"topic": ["Algebra"]}).status_code == 422
+    columns = {name: [row[name] for row in make_rows(2)] for name in Features.model_fields}
+    columns["topic"].append("Algebra")
+    assert client.post("/predict/batch", json=columns).status_code == 422
+    assert client.post("/predict/batch", content=b"{", headers={"content-type": "application/json"}).status_code == 400
+
+    limit = predict_router.PREDICT_BATCH_MAX_ROWS
+    predict_router.PREDICT_BATCH_MAX_ROWS = 3
+    try:
+        assert client.post("/predict/batch", json=make_rows(4)).status_code == 413
+    finally:
+        predict_router.PREDICT_BATCH_MAX_ROWS = limit
+
+
+def test_empty_batch():
+    body = client.post("/predict/batch", json=[]).json()
+    assert body["rows"] == 0 and body["results"] == []
+
+
+if __name__ == "__main__":
+    test_row_list_matches_single_predictions_in_order()
+    test_columnar_json_and_arrow_match_row_list()
+    test_invalid_rows_are_reported_per_row()
+    test_malformed_batches_are_rejected()
+    test_empty_batch()
+    print("✅ All predict router tests passed")
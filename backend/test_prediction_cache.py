@@ -0,0 +1,101 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import ml_utils
+from ml_utils import GradePredictor
+from services.prediction_cache import PredictionCache
+from test_grade_predictor import encode_rows, random_features
+
+
+class CountingModel:
+    """Wraps the grade model and counts the rows it is asked to predict."""
+
+    def __init__(self, model):
+        self.model = model
+        self.classes_ = model.classes_
+        self.rows = 0
+
+    def predict_proba(self, X):
+        self.rows += len(X)
+        return self.model.predict_proba(X)
+
+
+def make_predictor(cache, cache_id="m#1"):
+    model = CountingModel(ml_utils.model)
+    predictor = GradePredictor(
+        model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder,
+        cache=cache, cache_id=cache_id,
+    )
+    predictor.dispatcher.max_batch_size = 1
+    return predictor, model
+
+
+def test_lru_bound_and_invalidation():
+    cache = PredictionCache(max_size=3)
+    rows = [np.full(4, i, dtype=np.float32) for i in range(4)]
+    for i, row in enumerate(rows[:3]):
+        cache.put(cache.make_key("a", row), [i, 0])
+    assert cache.get(cache.make_key("a", rows[0])) is not None  # 0 is now most recent
+    cache.put(cache.make_key("b", rows[3]), [3, 0])
+    assert cache.get(cache.make_key("a", rows[1])) is None  # least recently used went first
+    assert cache.stats()["entries_per_model"] == {"a": 2, "b": 1}
+
+    assert cache.invalidate("a") == 2
+    assert cache.get(cache.make_key("a", rows[0])) is None
+    assert cache.get(cache.make_key("b", rows[3])) is not None
+    stats = cache.stats()
+    assert stats["size"] == 1 and stats["invalidated"] == 2
+    assert stats["hits"] == 2 and stats["misses"] == 2
+
+
+def test_cached_values_are_read_only_copies():
+    cache = PredictionCache()
+    value = np.array([0.25, 0.75], dtype=np.float32)
+    stored = cache.put(cache.make_key("a", value), value)
+    value[0] = 1.0
+    assert stored[0] == 0.25 and not stored.flags.writeable
+
+
+def test_predictor_skips_model_for_seen_rows():
+    cache = PredictionCache()
+    predictor, model = make_predictor(cache)
+    plain = GradePredictor(ml_utils.model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder)
+    rng = random.Random(5)
+    rows = [random_features(rng) for _ in range(20)]
+
+    first = [predictor.predict(features) for features in rows]
+    assert model.rows == 20
+    assert [predictor.predict(features) for features in rows] == first == [plain.predict(f) for f in rows]
+    assert model.rows == 20
+    assert cache.stats()["hits"] == 20
+
+    # Same row under another model id is a different entry
+    other, other_model = make_predictor(cache, "m#2")
+    other.predict(rows[0])
+    assert other_model.rows == 1
+
+
+def test_batch_only_predicts_missing_rows():
+    cache = PredictionCache()
+    predictor, model = make_predictor(cache)
+    rng = random.Random(6)
+    X = encode_rows([random_features(rng) for _ in range(40)], predictor)
+    expected = ml_utils.model.predict_proba(X)
+
+    assert np.allclose(predictor.predict_proba_many(X[:25]), expected[:25])
+    assert model.rows == 25
+    assert np.allclose(predictor.predict_proba_many(X), expected)
+    assert model.rows == 40
+
+
+if __name__ == "__main__":
+    test_lru_bound_and_invalidation()
+    test_cached_values_are_read_only_copies()
+    test_predictor_skips_model_for_seen_rows()
+    test_batch_only_predicts_missing_rows()
+    print("✅ All prediction cache tests passed")
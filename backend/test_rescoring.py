@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import app as app_module
+from models import AI_Score, Homework_Submission, Scoring_Job, Submission_Feature
+from services.model_versions import grade_models
+from services.rescoring import rescore_submissions
+from services.scoring_cache import scoring_cache
+from services.scoring_jobs import ScoringJobQueue
+from test_score_batch import make_submissions
+from test_scoring_cache import make_scoring_db
+from test_scoring_jobs import wait
+from test_shadow import AlwaysLastClass, make_predictor
+
+
+def make_rescoring_db(n):
+    SessionLocal, ids = make_scoring_db(homeworks=n)
+    db = SessionLocal()
+    for student_homework_id, text in zip(ids, make_submissions(n, seed=21)):
+        db.add(Homework_Submission(student_homework_id=student_homework_id, submission_text=text))
+    db.commit()
+    db.close()
+    return SessionLocal
+
+
+def count_inserts(engine, table):
+    """List that grows by one for every INSERT statement (a bulk insert is one) into table."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(f"INSERT INTO {table} "):
+            statements.append(len(parameters) if executemany else 1)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def test_rescore_in_chunks_with_bulk_inserts():
+    SessionLocal = make_rescoring_db(7)
+    engine = SessionLocal.kw["bind"]
+    inserts = count_inserts(engine, "ai_scores")
+    scoring_cache.clear()
+    db = SessionLocal()
+    try:
+        report = rescore_submissions(db, chunk_size=3)
+    finally:
+        db.close()
+
+    served = grade_models.current()
+    assert (report["rows"], report["chunks"], report["model_version"]) == (7, 3, served.version)
+    assert inserts == [3, 3, 1]  # one bulk INSERT per chunk
+
+    db = SessionLocal()
+    scores = db.query(AI_Score).order_by(AI_Score.homework_submission_id).all()
+    assert [s.homework_submission_id for s in scores] == list(range(1, 8))
+    assert {s.prediction_model_version for s in scores} == {served.version}
+    features = {f.homework_submission_id: f for f in db.query(Submission_Feature).all()}
+    assert len(features) == 7 and {f.model_version for f in features.values()} == {served.version}
+    for score in scores:
+        assert score.predicted_band == served.predictor.predict(json.loads(score.analysis_data))
+    db.close()
+    scoring_cache.clear()
+
+
+def test_rescore_uses_the_served_version():
+    SessionLocal = make_rescoring_db(4)
+    served = SimpleNamespace(version="EduMate_Candidate_v9", predictor=make_predictor(AlwaysLastClass()))
+    scoring_cache.clear()
+    db = SessionLocal()
+    try:
+        report = rescore_submissions(db, chunk_size=500, served=served)
+    finally:
+        db.close()
+    scoring_cache.clear()
+
+    assert (report["rows"], report["chunks"], report["model_version"]) == (4, 1, "EduMate_Candidate_v9")
+    db = SessionLocal()
+    scores = db.query(AI_Score).all()
+    assert {(s.predicted_band, s.prediction_model_version) for s in scores} == {(served.predictor.grades[-1], "EduMate_Candidate_v9")}
+    db.close()
+
+
+def test_admin_rescore_runs_as_a_job():
+    SessionLocal = make_rescoring_db(3)
+    Scoring_Job.__table__.create(SessionLocal.kw["bind"])
+    queue = ScoringJobQueue(max_workers=1, max_pending=1, session_factory=SessionLocal)
+    originals = app_module.scoring_jobs, app_module.SessionLocal
+    app_module.scoring_jobs, app_module.SessionLocal = queue, SessionLocal
+    admin = SimpleNamespace(id=1, role=SimpleNamespace(name="Admin"))
+    app_module.app.dependency_overrides[app_module.get_current_user] = lambda: admin
+    scoring_cache.clear()
+    try:
+        client = TestClient(app_module.app)
+        response = client.post("/admin/rescore", json={"chunk_size": 2})
+        assert response.status_code == 202, response.text
+        body = response.json()
+        assert (body["kind"], body["submission_id"]) == ("rescore", None)
+
+        wait(queue.get(body["id"]))
+        job = client.get(f"/scoring_jobs/{body['id']}").json()
+        assert (job["status"], job["stage"]) == ("completed", "done"), job["error"]
+        assert (job["result"]["rows"], job["result"]["chunks"]) == (3, 2)
+
+        admin.role.name = "Teacher"
+        assert client.post("/admin/rescore", json={}).status_code == 403
+    finally:
+        app_module.scoring_jobs, app_module.SessionLocal = originals
+        app_module.app.dependency_overrides.clear()
+        scoring_cache.clear()
+
+    db = SessionLocal()
+    assert db.query(AI_Score).count() == 3
+    db.close()
+
+
+if __name__ == "__main__":
+    test_rescore_in_chunks_with_bulk_inserts()
+    test_rescore_uses_the_served_version()
+    test_admin_rescore_runs_as_a_job()
+    print("✅ All rescoring tests passed")
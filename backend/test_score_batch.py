@@ -0,0 +1,119 @@
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.score as score_router
+from auth import get_current_user
+from ml_service import scoring_service
+from services.scoring_pool import ScoringPool, _warm_up_heuristic_scorer
+
+app = FastAPI()
+app.include_router(score_router.router)
+app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, role=SimpleNamespace(name="Teacher"))
+client = TestClient(app)
+
+SENTENCES = [
+    "Steg {n}: Vi löser ekvationen 2x + {a} = {b} genom att subtrahera {a} från båda sidor.",
+    "Därför blir x = {c}, och kontroll: 2 · {c} + {a} = {b} stämmer.",
+    "Eftersom funktionen är en andragradsfunktion använder vi nollproduktmetoden.",
+    "Faktorisera: x² - {a}x = x(x - {a}), så x = 0 eller x = {a}.",
+    "Till exempel ger insättning av x = {c} resultatet {b}.",
+    "Jag tror typ att svaret kanske är {b}, asså ungefär.",
+    "Sannolikheten blir {a}/{b} ≈ 0,{c} enligt frekvenstabellen.",
+    "a) Arean är {a} · {b} = {c} cm². b) Omkretsen är 2({a} + {b}).",
+    "Slutsats: metoden fungerar och derivata f'(x) = {a}x visar lutningen.",
+    "Svar: x = {c}",
+]
+
+
+def make_submissions(n=200, seed=5, min_chars=0, max_chars=1500):
+    """Math homework-like texts in Swedish, between min_chars and max_chars long (some too short to score)."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        target = rng.randint(min_chars, max_chars)
+        parts = []
+        while sum(len(p) + 1 for p in parts) < target:
+            a, b = rng.randint(1, 20), rng.randint(21, 99)
+            sentence = rng.choice(SENTENCES).format(n=len(parts) + 1, a=a, b=b, c=rng.randint(1, 9))
+            parts.append(sentence + ("\n\n" if rng.random() < 0.2 else " "))
+        texts.append("".join(parts).strip())
+    return texts
+
+
+def comparable(prediction):
+    """Everything but the timing."""
+    return prediction.score, prediction.band, prediction.confidence, prediction.reason, prediction.analysis_data
+
+
+def test_score_many_matches_single_in_order():
+    texts = make_submissions(100)
+    texts[3], texts[50] = "", "Svar: x = 4"  # too short to score
+    expected = [comparable(scoring_service.score_submission(t, "mathematics")) for t in texts]
+    before = scoring_service.stage_latency.snapshot()
+    pool = ScoringPool(2, warm_up=_warm_up_heuristic_scorer)
+    try:
+        results = scoring_service.score_many(texts, "mathematics", pool=pool)
+    finally:
+        pool.shutdown()
+    assert [comparable(p) for p in results] == expected
+    assert any(p.score is None for p in results) and any(p.score is not None for p in results)
+
+    # The workers' stage laps come back with the results and are recorded in this process
+    after = scoring_service.stage_latency.snapshot()
+    assert after["total"]["count"] == before["total"]["count"] + len(texts)
+    assert after["scan"]["count"] == before["scan"]["count"] + sum("scan" in p.stage_ms for p in results)
+
+
+def test_small_batches_run_inline():
+    inline = ScoringPool(0)
+    assert scoring_service.score_many([], pool=inline) == []
+    texts = make_submissions(5, seed=6)
+    results = scoring_service.score_many(texts, "physics", pool=ScoringPool(4))  # one chunk: no workers spawned
+    assert [comparable(p) for p in results] == [comparable(scoring_service.score_submission(t, "physics")) for t in texts]
+
+
+def test_batch_endpoint():
+    texts = make_submissions(30, seed=7)
+    response = client.post("/ml/score/batch", json={"texts": texts})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["texts"] == 30 and [r["index"] for r in body["results"]] == list(range(30))
+    for result, text in zip(body["results"], texts):
+        single = scoring_service.score_submission(text, "mathematics")
+        assert (result["predicted_score"], result["predicted_band"], result["reason"]) == \
+            (single.score, single.band, single.reason)
+    assert body["scored"] == sum(r["predicted_score"] is not None for r in body["results"])
+
+    limit = score_router.SCORE_BATCH_MAX_TEXTS
+    score_router.SCORE_BATCH_MAX_TEXTS = 2
+    try:
+        assert client.post("/ml/score/batch", json={"texts": texts[:3]}).status_code == 413
+    finally:
+        score_router.SCORE_BATCH_MAX_TEXTS = limit
+    assert client.post("/ml/score/batch", json={"texts": "inte en lista"}).status_code == 422
+
+
+def test_batch_endpoint_needs_a_teacher_or_admin():
+    texts = make_submissions(2, seed=8)
+    try:
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=2, role=SimpleNamespace(name="Student"))
+        assert client.post("/ml/score/batch", json={"texts": texts}).status_code == 403
+        del app.dependency_overrides[get_current_user]
+        assert client.post("/ml/score/batch", json={"texts": texts}).status_code in (401, 403)  # no bearer token
+    finally:
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, role=SimpleNamespace(name="Teacher"))
+
+
+if __name__ == "__main__":
+    test_score_many_matches_single_in_order()
+    test_small_batches_run_inline()
+    test_batch_endpoint()
+    test_batch_endpoint_needs_a_teacher_or_admin()
+    print("✅ All batch scoring tests passed")
@@ -0,0 +1,143 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import ml_service
+import routers.score as score_router
+from auth import get_current_user
+from db_setup import get_db
+from models import AI_Score, Homework_Submission
+from services.metrics import StageLatency
+from test_score_batch import make_submissions
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+Homework_Submission.__table__.create(engine)
+AI_Score.__table__.create(engine)
+SessionLocal = sessionmaker(bind=engine)
+
+
+def override_get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+app = FastAPI()
+app.include_router(score_router.router)
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, role=SimpleNamespace(name="Teacher"))
+client = TestClient(app)
+
+TEXT = make_submissions(1, seed=13, min_chars=800, max_chars=800)[0]
+SCORING_STAGES = {"scan", "analysis", "score", "explanation"}
+
+
+def test_scores_text_with_stage_times():
+    before = ml_service.scoring_service.stage_latency.snapshot().get("scan", {}).get("count", 0)
+    response = client.post("/ml/score", json={"text": TEXT})
+    assert response.status_code == 200
+    body = response.json()
+    expected = ml_service.scoring_service.score_submission(TEXT)
+    assert (body["predicted_score"], body["predicted_band"], body["reason"]) == (expected.score, expected.band, expected.reason)
+    assert set(body["stage_times_ms"]) == SCORING_STAGES
+    assert 0 < sum(body["stage_times_ms"].values()) <= body["processing_time_ms"]
+
+    stages = ml_service.scoring_service.stage_latency.snapshot()
+    assert stages["scan"]["count"] == before + 2 and stages["total"]["count"] >= 2
+    assert sum(stages["analysis"]["buckets"].values()) == stages["analysis"]["count"]
+
+
+def test_stores_ai_score_for_submission():
+    db = SessionLocal()
+    submission = Homework_Submission(student_homework_id=1, submission_text=TEXT)
+    db.add(submission)
+    db.commit()
+
+    for payload in ({"submission_id": submission.id, "text": TEXT}, {"submission_id": submission.id}):
+        response = client.post("/ml/score", json=payload)
+        assert response.status_code == 200
+        body = response.json()
+        assert set(body["stage_times_ms"]) == SCORING_STAGES | {"persist"}
+
+    rows = db.query(AI_Score).filter(AI_Score.homework_submission_id == submission.id).all()
+    assert len(rows) == 2
+    row = rows[-1]
+    assert row.predicted_score == round(body["predicted_score"]) and row.predicted_band == body["predicted_band"]
+    assert float(row.confidence_level) == body["confidence"] and row.prediction_explainer == body["reason"]
+    assert row.model_used == row.prediction_model_version == "EduMate_Scorer_v1"
+    assert json.loads(row.analysis_data)["word_count"] == len(TEXT.split())
+    db.close()
+
+    assert client.post("/ml/score", json={"submission_id": 9999}).status_code == 404
+    assert client.post("/ml/score", json={"subject": "mathematics"}).status_code == 422
+
+
+def test_text_with_unknown_submission_is_not_stored():
+    db = SessionLocal()
+    rows = db.query(AI_Score).count()
+    response = client.post("/ml/score", json={"submission_id": 9999, "text": TEXT})
+    assert response.status_code == 404
+    assert db.query(AI_Score).count() == rows
+    db.close()
+
+
+def test_needs_a_teacher_or_admin():
+    db = SessionLocal()
+    submission = Homework_Submission(student_homework_id=2, submission_text=TEXT)
+    db.add(submission)
+    db.commit()
+    try:
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=2, role=SimpleNamespace(name="Student"))
+        assert client.post("/ml/score", json={"submission_id": submission.id}).status_code == 403
+        del app.dependency_overrides[get_current_user]
+        assert client.post("/ml/score", json={"submission_id": submission.id}).status_code in (401, 403)  # no bearer token
+    finally:
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, role=SimpleNamespace(name="Teacher"))
+    assert db.query(AI_Score).filter(AI_Score.homework_submission_id == submission.id).count() == 0
+    db.close()
+
+
+def test_uses_the_warm_scorer():
+    created = []
+    original = ml_service.ScoringService.__init__
+    ml_service.ScoringService.__init__ = lambda self: created.append(self) or original(self)
+    try:
+        assert client.post("/ml/score", json={"text": TEXT}).status_code == 200
+    finally:
+        ml_service.ScoringService.__init__ = original
+    assert created == [] and score_router.scoring_service is ml_service.scoring_service
+
+    # Warming up doesn't count towards the histogram
+    count = ml_service.scoring_service.stage_latency.snapshot()["total"]["count"]
+    assert ml_service.scoring_service.warm_up() > 0
+    assert ml_service.scoring_service.stage_latency.snapshot()["total"]["count"] == count
+
+
+def test_stage_latency_buckets():
+    latency = StageLatency(bounds=(1, 10))
+    latency.observe({"scan": 0.5, "persist": 12})
+    latency.observe({"scan": 5})
+    snapshot = latency.snapshot()
+    assert snapshot["scan"] == {"count": 2, "mean": 2.75, "buckets": {"<=1": 1, "<=10": 1, ">10": 0}}
+    assert snapshot["persist"]["buckets"] == {"<=1": 0, "<=10": 0, ">10": 1}
+
+
+if __name__ == "__main__":
+    test_scores_text_with_stage_times()
+    test_stores_ai_score_for_submission()
+    test_text_with_unknown_submission_is_not_stored()
+    test_needs_a_teacher_or_admin()
+    test_uses_the_warm_scorer()
+    test_stage_latency_buckets()
+    print("✅ All score endpoint tests passed")
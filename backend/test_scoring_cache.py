@@ -0,0 +1,154 @@
+import os
+import sys
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app as app_module
+from feature_extractor import feature_extractor
+from models import (
+    AI_Feedback, AI_Score, Homework, Homework_Submission, Scoring_Criteria, Student, Student_Homework, Submission_Feature,
+)
+from services import feedback_segments
+from services.scoring_cache import ScoringCache
+
+TEXT = "Steg 1: 2x + 5 = 11\nSteg 2: 2x = 6\nSvar: x = 3, därför att 2 * 3 + 5 = 11."
+DESCRIPTION = "Lös ekvationen 2x + 5 = 11"
+
+
+def make_scoring_db(homeworks=1):
+    """
+    In-memory database with the tables scoring writes to, and one homework
+    (with scoring criteria) and student per student homework; student i+1
+    belongs to user i+1. Returns the session factory and the student
+    homework ids.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    for model in (Student, Homework, Student_Homework, Homework_Submission, Scoring_Criteria, AI_Feedback, AI_Score, Submission_Feature):
+        model.__table__.create(engine)
+    SessionLocal = sessionmaker(bind=engine)
+
+    db = SessionLocal()
+    ids = []
+    for i in range(homeworks):
+        homework = Homework(title=f"Ekvationer {i}", description=DESCRIPTION, due_date=date(2025, 1, 1), subject_class_level_id=1)
+        db.add(homework)
+        db.flush()
+        db.add(Scoring_Criteria(homework_id=homework.id, topic="Ekvationer", difficulty_1to5=2))
+        db.add(Student(id=i + 1, user_id=i + 1, date_of_birth=date(2010, 1, 1)))
+        student_homework = Student_Homework(student_id=i + 1, homework_id=homework.id)
+        db.add(student_homework)
+        db.flush()
+        ids.append(student_homework.id)
+    db.commit()
+    db.close()
+    return SessionLocal, ids
+
+
+class CountingPool:
+    """Scores inline, counting calls; the teacher comment is whatever `comment` is set to."""
+
+    def __init__(self, comment):
+        self.comment = comment
+        self.scored = self.feedback_lookups = 0
+
+    def score(self, submission_text, description, topic, difficulty, with_feedback=True):
+        self.scored += 1
+        result = {"features": feature_extractor.extract(submission_text, description, topic, difficulty)}
+        if with_feedback:
+            result.update(self.feedback(submission_text))
+        return result
+
+    def feedback(self, submission_text):
+        self.feedback_lookups += 1
+        return {"teacher_comment": self.comment, "feedback_ok": True}
+
+
+def test_lru_eviction():
+    cache = ScoringCache(max_size=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}  # "b" is now the least recently used
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1} and cache.get("c") == {"n": 3}
+    assert cache.stats() == {"hits": 3, "misses": 1, "hit_rate": 0.75, "size": 2, "max_size": 2}
+
+    disabled = ScoringCache(max_size=0)
+    disabled.put("a", {"n": 1})
+    assert disabled.get("a") is None and disabled.stats()["size"] == 0
+
+
+def test_key_fields():
+    cache = ScoringCache()
+    fields = (TEXT, DESCRIPTION, "Ekvationer", 2, "EduMate_XGB_v1", "EduMate_TeacherFeedback_v2")
+    key = cache.submission_key(*fields)
+    assert key == cache.submission_key(*fields)
+    for i, changed in enumerate((TEXT + " ", "Annan uppgift", "Algebra", 3, "EduMate_XGB_v2", "v3")):
+        assert cache.submission_key(*fields[:i], changed, *fields[i + 1:]) != key, i
+    # Parts are length-prefixed, so moving text from one field to the next changes the key
+    assert cache.make_key("ab", ("c",), "v") != cache.make_key("a", ("bc",), "v")
+    assert cache.make_key(None, (), "v") == cache.make_key("", (), "v")
+
+
+def test_feedback_generation_follows_corpus_and_log(tmp_path):
+    corpus, log = tmp_path / "corpus.csv", tmp_path / "log.jsonl"
+    corpus.write_text("teacher_comment_sv\nBra!\n")
+    generation = feedback_segments.feedback_generation(log, corpus)
+    assert feedback_segments.feedback_generation(log, corpus) == generation
+
+    feedback_segments.record_feedback(TEXT, "Snyggt löst.", log_path=log)
+    after_insert = feedback_segments.feedback_generation(log, corpus)
+    assert after_insert != generation
+
+    corpus.write_text("teacher_comment_sv\nBra!\nMycket bra!\n")
+    assert feedback_segments.feedback_generation(log, corpus) != after_insert
+
+
+def test_stale_teacher_comment_is_looked_up_again():
+    SessionLocal, (student_homework_id,) = make_scoring_db()
+    db = SessionLocal()
+    submission = Homework_Submission(student_homework_id=student_homework_id, submission_text=TEXT)
+    db.add(submission)
+    db.commit()
+
+    pool = CountingPool("Första kommentaren")
+    generation = ["g1"]
+    original_pool, original_generation = app_module.scoring_pool, app_module.feedback_generation
+    app_module.scoring_pool, app_module.feedback_generation = pool, lambda: generation[0]
+    app_module.scoring_cache.clear()
+    try:
+        first = app_module._score_submission(db, submission.id)
+        again = app_module._score_submission(db, submission.id)
+        assert (pool.scored, pool.feedback_lookups) == (1, 1)
+        assert again["ai_teacher_feedback"] == first["ai_teacher_feedback"] == "Första kommentaren"
+
+        # The feedback index changed: features and grade come from the cache, the comment is picked again
+        generation[0], pool.comment = "g2", "Ny kommentar"
+        changed = app_module._score_submission(db, submission.id)
+        assert (pool.scored, pool.feedback_lookups) == (1, 2)
+        assert changed["ai_teacher_feedback"] == "Ny kommentar"
+        assert changed["predicted_grade"] == first["predicted_grade"]
+
+        app_module._score_submission(db, submission.id)
+        assert (pool.scored, pool.feedback_lookups) == (1, 2)
+    finally:
+        app_module.scoring_pool, app_module.feedback_generation = original_pool, original_generation
+        app_module.scoring_cache.clear()
+        db.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    test_lru_eviction()
+    test_key_fields()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_feedback_generation_follows_corpus_and_log(Path(tmp))
+    test_stale_teacher_comment_is_looked_up_again()
+    print("✅ All scoring cache tests passed")
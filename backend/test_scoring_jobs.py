@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+from db_setup import get_db
+from models import AI_Score, Homework_Submission, Scoring_Job
+from services.scoring_jobs import STALE_JOB_ERROR, ScoringJobQueue
+from test_scoring_cache import TEXT, CountingPool, make_scoring_db
+
+
+def make_job_db():
+    SessionLocal, ids = make_scoring_db()
+    Scoring_Job.__table__.create(SessionLocal.kw["bind"])
+    return SessionLocal, ids
+
+
+def wait(job, timeout=5):
+    """Block until a job submitted to a queue has finished."""
+    for _ in range(int(timeout / 0.01)):
+        if job.finished_at is not None:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"Scoring job {job.id} did not finish")
+
+
+def test_status_transitions_are_saved():
+    SessionLocal, _ = make_job_db()
+    queue = ScoringJobQueue(max_workers=1, max_pending=2, session_factory=SessionLocal)
+    # Another worker process: same table, none of the jobs in memory
+    other = ScoringJobQueue(max_workers=1, max_pending=1, session_factory=SessionLocal)
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def score(job):
+        seen.append(other.get(job.id).status)  # "running" is saved before the job starts
+        job.set_stage("predicting")
+        started.set()
+        release.wait(5)
+        return {"predicted_grade": "B"}
+
+    job = queue.submit(7, score, user_id=3)
+    assert job.status in ("queued", "running")
+    started.wait(5)
+    polled = other.get(job.id)
+    assert (polled.status, polled.stage, polled.submission_id, polled.user_id) == ("running", "predicting", 7, 3)
+    assert polled.to_dict()["progress"] == 0.4
+
+    release.set()
+    wait(job)
+    assert seen == ["running"]
+    done = other.get(job.id).to_dict()
+    assert (done["status"], done["stage"], done["progress"], done["result"]) == ("completed", "done", 1.0, {"predicted_grade": "B"})
+    assert done["started_at"] and done["finished_at"]
+
+    def fail(job):
+        raise ValueError("no scoring criteria")
+
+    failed = wait(queue.submit(8, fail))
+    row = other.get(failed.id)
+    assert (row.status, row.error, row.result) == ("failed", "no scoring criteria", None)
+    assert other.get("missing") is None
+    assert queue.stats() == {"queued": 0, "running": 0, "completed": 1, "failed": 1}
+
+
+def test_full_queue_returns_none():
+    queue = ScoringJobQueue(max_workers=1, max_pending=1)
+    release = threading.Event()
+    job = queue.submit(1, lambda job: release.wait(5))
+    assert queue.submit(2, lambda job: {}) is None
+    release.set()
+    wait(job)
+    assert wait(queue.submit(3, lambda job: {})).status == "completed"
+
+
+def test_finished_jobs_are_evicted_from_memory():
+    SessionLocal, _ = make_job_db()
+    queue = ScoringJobQueue(max_workers=2, max_pending=4, session_factory=SessionLocal, max_kept=2)
+    first, second = wait(queue.submit(1, lambda job: {})), wait(queue.submit(2, lambda job: {}))
+    third = wait(queue.submit(3, lambda job: {}))
+    assert queue.stats()["completed"] == 2
+    assert queue._jobs.keys() == {second.id, third.id}
+    assert queue.get(first.id).status == "completed"  # read back from the table
+
+    # A job that has not finished is never evicted
+    release = threading.Event()
+    running = queue.submit(4, lambda job: release.wait(5))
+    queue.submit(5, lambda job: {})
+    assert running.id in queue._jobs
+    release.set()
+    wait(running)
+
+    in_memory_only = ScoringJobQueue(max_workers=1, max_pending=2, max_kept=1)
+    old = wait(in_memory_only.submit(1, lambda job: {}))
+    wait(in_memory_only.submit(2, lambda job: {}))
+    assert in_memory_only.get(old.id) is None
+
+
+def test_jobs_of_a_stopped_process_are_reported_failed():
+    SessionLocal, _ = make_job_db()
+    long_ago = datetime.now(timezone.utc) - timedelta(minutes=5)
+    db = SessionLocal()
+    db.add(Scoring_Job(id="dead", homework_submission_id=1, status="running", stage="predicting",
+                       created_at=long_ago, started_at=long_ago, heartbeat_at=long_ago))
+    db.add(Scoring_Job(id="alive", homework_submission_id=1, status="running", stage="predicting",
+                       created_at=long_ago, heartbeat_at=datetime.now(timezone.utc)))
+    db.commit()
+    db.close()
+
+    queue = ScoringJobQueue(max_workers=1, max_pending=1, session_factory=SessionLocal, stale_seconds=60)
+    dead = queue.get("dead")
+    assert (dead.status, dead.error) == ("failed", STALE_JOB_ERROR)
+    assert queue.get("alive").status == "running"
+
+    assert queue.fail_stale() == 1
+    db = SessionLocal()
+    assert db.get(Scoring_Job, "dead").status == "failed" and db.get(Scoring_Job, "dead").finished_at is not None
+    assert db.get(Scoring_Job, "alive").status == "running"
+    db.close()
+
+
+def test_heartbeat_keeps_a_long_job_alive():
+    SessionLocal, _ = make_job_db()
+    queue = ScoringJobQueue(max_workers=1, max_pending=1, session_factory=SessionLocal,
+                            heartbeat_seconds=0.05, stale_seconds=0.3)
+    other = ScoringJobQueue(max_workers=1, max_pending=1, session_factory=SessionLocal, stale_seconds=0.3)
+    release = threading.Event()
+    job = queue.submit(1, lambda job: release.wait(5))
+    time.sleep(0.6)
+    assert other.get(job.id).status == "running"  # no stage change for 0.6 s, but the heartbeat ran
+    assert other.fail_stale() == 0
+    release.set()
+    assert wait(job).status == "completed"
+
+
+def test_save_failures_do_not_stop_the_job():
+    def unreachable():
+        raise ConnectionError("database is down")
+
+    queue = ScoringJobQueue(max_workers=1, max_pending=1, session_factory=unreachable)
+    assert wait(queue.submit(1, lambda job: {"ok": True})).result == {"ok": True}
+    assert queue.fail_stale() == 0
+
+
+def test_full_queue_scores_inline():
+    SessionLocal, (student_homework_id,) = make_job_db()
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    queue = ScoringJobQueue(max_workers=1, max_pending=1, session_factory=SessionLocal)
+    release = threading.Event()
+    blocker = queue.submit(0, lambda job: release.wait(5))
+
+    pool = CountingPool("Bra jobbat!")
+    originals = app_module.scoring_jobs, app_module.scoring_pool, app_module.SessionLocal
+    app_module.scoring_jobs, app_module.scoring_pool, app_module.SessionLocal = queue, pool, SessionLocal
+    app_module.app.dependency_overrides[get_db] = override_get_db
+    app_module.app.dependency_overrides[app_module.get_current_user] = lambda: SimpleNamespace(id=1)
+    try:
+        client = TestClient(app_module.app)
+        payload = {"student_homework_id": student_homework_id, "submission_text": TEXT, "submission_date": "2025-01-01"}
+        response = client.post("/homework_submissions/?async_scoring=true", json=payload)
+        assert response.status_code == 200, response.text
+        assert response.json()["scoring_job_id"] is None
+        db = SessionLocal()
+        assert db.query(AI_Score).count() == 1 and pool.scored == 1  # scored before the response
+        db.close()
+
+        release.set()
+        wait(blocker)
+        response = client.post("/homework_submissions/?async_scoring=true", json=payload)
+        job = wait(queue.get(response.json()["scoring_job_id"]))
+        assert job.status == "completed", job.error
+    finally:
+        release.set()
+        app_module.scoring_jobs, app_module.scoring_pool, app_module.SessionLocal = originals
+        app_module.app.dependency_overrides.clear()
+
+    db = SessionLocal()
+    assert db.query(Homework_Submission).count() == 1
+    assert db.query(AI_Score).count() == 2
+    db.close()
+
+
+if __name__ == "__main__":
+    test_status_transitions_are_saved()
+    test_full_queue_returns_none()
+    test_finished_jobs_are_evicted_from_memory()
+    test_jobs_of_a_stopped_process_are_reported_failed()
+    test_heartbeat_keeps_a_long_job_alive()
+    test_save_failures_do_not_stop_the_job()
+    test_full_queue_scores_inline()
+    print("✅ All scoring job tests passed")
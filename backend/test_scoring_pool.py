@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.scoring_pool import ScoringPool, compute_scoring
+
+
+def worker_pid(_=None) -> int:
+    return os.getpid()
+
+
+def die_in_worker(_=None) -> str:
+    """Kills a pool worker; run inline (in the main process) it just answers."""
+    if multiprocessing.current_process().name != "MainProcess":
+        os._exit(1)
+    return "inline"
+
+
+def test_processes_0_runs_inline():
+    pool = ScoringPool(0)
+    assert pool._call(worker_pid) == os.getpid()
+    assert pool.map(worker_pid, range(3)) == [os.getpid()] * 3
+    pool.start()  # nothing to spawn
+    assert pool._executor is None
+
+    result = pool.score("Steg 1: 2x = 6\nSvar: x = 3", "Lös 2x = 6", "Ekvationer", 2, with_feedback=False)
+    assert result == compute_scoring("Steg 1: 2x = 6\nSvar: x = 3", "Lös 2x = 6", "Ekvationer", 2, with_feedback=False)
+
+
+def test_recovers_from_a_broken_pool():
+    pool = ScoringPool(1, warm_up=worker_pid)
+    try:
+        assert pool._call(worker_pid) != os.getpid()
+        broken = pool._executor
+
+        # The worker dies: this call is answered inline and the pool is dropped
+        assert pool._call(die_in_worker) == "inline"
+        assert pool._executor is None
+
+        # The next call spawns a fresh pool
+        assert pool._call(worker_pid) != os.getpid()
+        assert pool._executor is not None and pool._executor is not broken
+
+        assert pool.map(die_in_worker, range(3)) == ["inline"] * 3
+        assert pool._executor is None
+        assert all(pid != os.getpid() for pid in pool.map(worker_pid, range(3)))
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    test_processes_0_runs_inline()
+    test_recovers_from_a_broken_pool()
+    print("✅ All scoring pool tests passed")
@@ -0,0 +1,158 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import ml_utils
+from ml_utils import GradePredictor
+from models import Shadow_Metric
+from services.shadow import ShadowEvaluator
+from test_grade_predictor import random_features
+
+
+class AlwaysLastClass:
+    """Candidate that always predicts the last grade ("F")."""
+
+    classes_ = np.arange(4)
+
+    def predict_proba(self, X):
+        proba = np.zeros((len(X), 4), dtype=np.float32)
+        proba[:, -1] = 1.0
+        return proba
+
+
+def make_predictor(model):
+    return GradePredictor(model, ml_utils.feature_order, ml_utils.grade_encoder, ml_utils.topic_encoder)
+
+
+def make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Shadow_Metric.__table__.create(engine)
+    return sessionmaker(bind=engine)
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+SERVED = SimpleNamespace(version="primary_v1", predictor=make_predictor(ml_utils.model))
+
+
+def observe_many(shadow, n, seed=1, primary_ms=None):
+    rng = random.Random(seed)
+    grades = []
+    for _ in range(n):
+        features = random_features(rng)
+        started = time.perf_counter()
+        grade = SERVED.predictor.predict(features)
+        served_ms = (time.perf_counter() - started) * 1000 if primary_ms is None else primary_ms
+        grades.append(grade)
+        shadow.observe(SERVED, features, grade, served_ms)
+    return grades
+
+
+def test_window_is_stored_in_shadow_metrics():
+    Session = make_session_factory()
+    shadow = ShadowEvaluator(
+        "candidate.json", "candidate_v2", window_size=20, window_seconds=60,
+        load_candidate=lambda _: make_predictor(ml_utils.model), session_factory=Session,
+    )
+    observe_many(shadow, 20)
+    assert wait_until(lambda: shadow.windows_written == 1)
+
+    with Session() as db:
+        rows = {row.evaluation: row for row in db.query(Shadow_Metric).all()}
+    assert set(rows) == {"primary", "shadow"}
+    assert rows["primary"].model_name == "primary_v1" and rows["primary"].compared_to == "candidate_v2"
+    assert rows["shadow"].model_name == "candidate_v2" and rows["shadow"].compared_to == "primary_v1"
+    for row in rows.values():
+        assert row.total_predictions == 20
+        assert float(row.agreement_rate) == 1.0  # same model on both sides
+        assert 0 < row.latency_p50_ms <= row.latency_p95_ms <= row.latency_p99_ms
+        assert sum(json.loads(row.details)["pairs"].values()) == 20
+
+
+def test_primary_latency_is_the_served_latency():
+    Session = make_session_factory()
+    shadow = ShadowEvaluator(
+        "candidate.json", "candidate_v2", window_size=10, window_seconds=60,
+        load_candidate=lambda _: make_predictor(ml_utils.model), session_factory=Session,
+    )
+    observe_many(shadow, 10, seed=3, primary_ms=7.5)
+    assert wait_until(lambda: shadow.windows_written == 1)
+
+    with Session() as db:
+        rows = {row.evaluation: row for row in db.query(Shadow_Metric).all()}
+    assert rows["primary"].latency_p50_ms == rows["primary"].latency_p99_ms == 7.5  # not timed again
+    assert rows["shadow"].latency_p50_ms != 7.5
+
+
+def test_disagreement_is_counted_per_grade_pair():
+    shadow = ShadowEvaluator(
+        "candidate.json", window_size=1000, window_seconds=60,
+        load_candidate=lambda _: make_predictor(AlwaysLastClass()), session_factory=make_session_factory(),
+    )
+    grades = observe_many(shadow, 30, seed=2)
+    assert wait_until(lambda: shadow.compared == 30)
+    expected = sum(grade == "F" for grade in grades) / 30
+    assert shadow.stats()["agreement_rate"] == round(expected, 4)
+    assert set(shadow._window.pairs) == {f"{grade}->F" for grade in grades}
+
+
+def test_observe_never_waits_for_the_shadow_model():
+    release = threading.Event()
+
+    def slow_load(_):
+        release.wait(10)
+        return make_predictor(ml_utils.model)
+
+    shadow = ShadowEvaluator(
+        "candidate.json", queue_size=2, load_candidate=slow_load, session_factory=make_session_factory(),
+    )
+    started = time.perf_counter()
+    for _ in range(50):
+        shadow.observe(SERVED, {"topic": "Algebra"}, "C", 1.0)
+    assert time.perf_counter() - started < 0.5
+    assert shadow.observed == 2 and shadow.dropped == 48
+    release.set()
+    assert wait_until(lambda: shadow.compared == 2)
+    shadow.stop()
+
+
+def test_disabled_and_failed_candidates_do_nothing():
+    off = ShadowEvaluator("", session_factory=make_session_factory())
+    off.observe(SERVED, {}, "C", 1.0)
+    assert off._thread is None and not off.stats()["enabled"]
+
+    def broken(_):
+        raise FileNotFoundError("no such model")
+
+    failed = ShadowEvaluator("missing.json", load_candidate=broken, session_factory=make_session_factory())
+    failed.observe(SERVED, {}, "C", 1.0)
+    assert wait_until(lambda: failed.error is not None)
+    failed.observe(SERVED, {}, "C", 1.0)
+    assert failed.observed == 1 and not failed.stats()["enabled"]
+
+
+if __name__ == "__main__":
+    test_window_is_stored_in_shadow_metrics()
+    test_primary_latency_is_the_served_latency()
+    test_disagreement_is_counted_per_grade_pair()
+    test_observe_never_waits_for_the_shadow_model()
+    test_disabled_and_failed_candidates_do_nothing()
+    print("✅ All shadow evaluation tests passed")
@@ -0,0 +1,89 @@
+import os
+import random
+import re
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_service import scoring_service
+from services import submission_scan
+from services.submission_scan import KEYWORDS, scan_submission
+from test_score_batch import make_submissions
+
+# The patterns the analyzers ran one by one, for every hit name that is not a keyword
+REFERENCE_PATTERNS = {
+    submission_scan.STEP_NUMBER: (r'(steg \d+|step \d+)', re.IGNORECASE),
+    submission_scan.NUMBER_PAREN: (r'\d+\)', re.IGNORECASE),
+    submission_scan.DECIMAL: (r'\d+[\.,]\d+', re.IGNORECASE),
+    submission_scan.SECTION: (r'(1\.|2\.|3\.|4\.)', 0),
+    submission_scan.POWER: (r'x\^?\d+|x²|x³|y²|y³', re.IGNORECASE),
+    submission_scan.PART: (r'(a\)|b\)|c\)|d\))', 0),
+    submission_scan.DIGIT_OPERATION: (r'(\d+.*[×\*].*\d+|\d+.*\+.*\d+)', re.IGNORECASE),
+    submission_scan.CASED_THEREFORE: (r'därför', 0),
+    submission_scan.CASED_SO: (r'så', 0),
+    **{name: (pattern.pattern, pattern.flags) for name, pattern in submission_scan.CHARACTER_CLASSES.items()},
+}
+
+EXTRA_TOKENS = [
+    "steg 3", "STEG 12", "Step 4", "stegstep 1", "typ", "Liksom", "ASSÅ", "kanske", "typen", "x^2", "X2", "x²",
+    "Y³", "1.", "4.5", "2,5", "7)", "a)", "B)", "d)", "İdentify", "ıdentify", "ſvar:", "Svar:", "RESULTAT:",
+    "→", "⇒", "=", "≈", "×", "*", "+", "√", "Σ", "ς", "µ", "ϑ", "K", "Å", "3", "٣", "x", "Z", "så", "Så", "därför",
+]
+SEPARATORS = ["", " ", " ", "\n", "\n\n", ". ", "! ", "?", ")", ":", "-"]
+
+
+def reference_hits(text):
+    """Hit names found by running each original pattern on its own, and the two counts."""
+    hits = {k for k in KEYWORDS if re.search(re.escape(k), text, re.IGNORECASE)}
+    hits.update(name for name, (pattern, flags) in REFERENCE_PATTERNS.items() if re.search(pattern, text, flags))
+    step_count = len(re.findall(r'(steg \d+|step \d+)', text, re.IGNORECASE))
+    informal_count = len(re.findall(r'\b(typ|liksom|asså|kanske)\b', text, re.IGNORECASE))
+    return hits, step_count, informal_count
+
+
+def adversarial_texts(n=300, seed=0):
+    """Keywords in any case and with the odd folding characters, run together with context tokens."""
+    rng = random.Random(seed)
+    tokens = list(KEYWORDS) + EXTRA_TOKENS
+    texts = []
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(1, 40)):
+            token = rng.choice(tokens)
+            token = rng.choice([token, token.upper(), token.title(), token.replace("i", "ı"), token.replace("s", "ſ")])
+            parts.append(token + rng.choice(SEPARATORS))
+        texts.append("".join(parts))
+    return texts
+
+
+def test_scan_matches_per_pattern_search():
+    for text in adversarial_texts() + make_submissions(100, seed=3):
+        scan = scan_submission(text)
+        assert (set(scan.hits), scan.step_count, scan.informal_count) == reference_hits(text), text
+        assert scan.sentences == re.split(r'[.!?]+', text)
+        assert scan.has_many_words == (len(re.findall(r'\b\w+\b', text)) > 20)
+
+
+def test_digit_operation_is_linear():
+    # The original pattern backtracks quadratically on a long line of numbers without an operator
+    assert not submission_scan._has_digit_operation("12 " * 20000)
+    assert submission_scan._has_digit_operation("12 " * 20000 + "× 3")
+    assert not submission_scan._has_digit_operation("2 ×\n3")
+    assert submission_scan._has_digit_operation("a\nx 2 + y 3\n")
+
+
+def test_scores_unchanged():
+    # score_submission() results from the per-pattern analyzers, before the one-pass scan
+    texts = make_submissions(8, seed=11) + adversarial_texts(4, seed=12)
+    expected = [
+        (100.0, 0.74), (100.0, 0.77), (100.0, 0.68), (100.0, 0.63), (100.0, 0.66), (100.0, 0.65),
+        (57.8, 0.57), (100.0, 0.75), (97.8, 0.56), (76.4, 0.63), (86.4, 0.68), (98.9, 0.59),
+    ]
+    assert [(p.score, p.confidence) for p in (scoring_service.score_submission(t) for t in texts)] == expected
+
+
+if __name__ == "__main__":
+    test_scan_matches_per_pattern_search()
+    test_digit_operation_is_linear()
+    test_scores_unchanged()
+    print("✅ All submission scan tests passed")
@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import ml_utils
+from services.model_registry import MODEL_DIR
+from services.tree_ensemble import TreeEnsemble
+from test_grade_predictor import encode_rows, random_features
+
+MODEL_JSON = MODEL_DIR / "trained_model.json"
+
+
+def realistic_matrix(n=1000, seed=13):
+    rng = random.Random(seed)
+    rows = [random_features(rng) for _ in range(n)]
+    return encode_rows(rows)
+
+
+def random_matrix(n=2000, seed=13):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, len(ml_utils.feature_order))) * rng.choice([1, 10, 100], size=len(ml_utils.feature_order))
+    X[rng.random(X.shape) < 0.05] = np.nan  # missing values take the default branch
+    return X.astype(np.float32)
+
+
+def test_probabilities_match_xgboost():
+    ensemble = TreeEnsemble.from_json(MODEL_JSON)
+    for X in (realistic_matrix(), random_matrix()):
+        expected = ml_utils.model.predict_proba(X)
+        actual = ensemble.predict_proba(X)
+        assert actual.shape == expected.shape
+        assert np.abs(actual - expected).max() < 1e-5
+        assert (ensemble.predict(X) == expected.argmax(axis=1)).all()
+
+
+def test_margins_match_booster():
+    ensemble = TreeEnsemble.from_json(MODEL_JSON)
+    X = random_matrix(500)
+    expected = ml_utils.model.get_booster().inplace_predict(X, predict_type="margin")
+    assert np.abs(ensemble.predict_margin(X) - expected).max() < 1e-4
+
+
+def test_single_row_and_npz_round_trip():
+    ensemble = TreeEnsemble.from_json(MODEL_JSON)
+    X = realistic_matrix(50)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trees.npz")
+        ensemble.save(path)
+        loaded = TreeEnsemble.load(path)
+    assert loaded.objective == ensemble.objective
+    assert np.array_equal(loaded.predict_proba(X), ensemble.predict_proba(X))
+    assert np.array_equal(loaded.predict_proba(X[0]), ensemble.predict_proba(X[:1]))
+
+
+if __name__ == "__main__":
+    test_probabilities_match_xgboost()
+    test_margins_match_booster()
+    test_single_row_and_npz_round_trip()
+    print("✅ All tree ensemble tests passed")